@@ -150,27 +150,31 @@ elif st.session_state['page'] == 'upload':
         )
 
     if uploaded_files:
-        if "uploaded_files_bytes" not in st.session_state:
-            st.session_state["uploaded_files_bytes"] = {}
-
-        # Armazena os arquivos carregados em bytes no session_state para manter entre páginas
-        for f in uploaded_files:
-            if f.name not in st.session_state["uploaded_files_bytes"]:
-                st.session_state["uploaded_files_bytes"][f.name] = f.read()
-
-        # Cria a lista com nome e conteúdo dos arquivos para uso nas outras páginas
-        st.session_state["uploaded_files"] = [
-            {"name": nome, "content": conteudo}
-            for nome, conteudo in st.session_state["uploaded_files_bytes"].items()
-        ]
-
-        st.session_state["uploaded_files_names"] = list(st.session_state["uploaded_files_bytes"].keys())
+        from utils.registro import registrar_envios, pre_extrair
+
+        # Registra só os arquivos novos (por hash), abrindo os .zip, e já extrai o texto deles
+        adicionados, avisos = registrar_envios(uploaded_files)
+        for aviso in avisos:
+            st.warning(aviso)
+        if adicionados:
+            with st.spinner("Extraindo texto dos novos arquivos..."):
+                erros = pre_extrair(adicionados)
+            for nome, erro in erros.items():
+                st.warning(f"Não foi possível extrair o texto de **{nome}**: {erro}")
         st.session_state["arquivos_limpos"] = False
 
     # Mostra mensagem de sucesso com a quantidade de arquivos carregados
     if "uploaded_files_names" in st.session_state and st.session_state["uploaded_files_names"]:
         st.success(f"{len(st.session_state['uploaded_files_names'])} arquivo(s) carregado(s).")
 
+        # Permite remover arquivos específicos sem reprocessar os demais
+        with st.expander("Remover arquivos"):
+            nomes_remover = st.multiselect("Arquivos", st.session_state["uploaded_files_names"], label_visibility="collapsed")
+            if st.button("Remover selecionados") and nomes_remover:
+                from utils.registro import remover_arquivos
+                remover_arquivos(nomes_remover)
+                st.rerun()
+
     st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
 
     # Botões para limpar arquivos ou continuar para próxima página
@@ -178,10 +182,9 @@ elif st.session_state['page'] == 'upload':
 
     with col_btn1:
         if st.button("Limpar Arquivos"):
-            # Remove os arquivos da sessão e reinicia o uploader
-            st.session_state.pop("uploaded_files", None)
-            st.session_state.pop("uploaded_files_names", None)
-            st.session_state.pop("uploaded_files_bytes", None)
+            # Remove os arquivos da sessão (e os resultados derivados) e reinicia o uploader
+            from utils.registro import limpar_registro
+            limpar_registro()
             st.session_state["arquivos_limpos"] = True
             st.session_state["uploader_key"] += 1  # força o reset do uploader
             st.rerun()
@@ -0,0 +1,140 @@
+import argparse
+import os
+import sys
+import time
+import faiss
+import numpy as np
+from utils.indice_vetorial import (
+    DIRETORIO_INDICES, criar_indice_faiss, _ler_indice_faiss, buscar_com_filtro, parametros_busca
+)
+
+# ----- BENCHMARK DOS ÍNDICES VETORIAIS -----
+# Compara os tipos de índice do chat (exato, IVF-PQ e HNSW com SQ8) em
+# recall@k (contra a busca exata), latência por consulta e memória do índice:
+#   python benchmark_indice.py --chunks 50000
+#   python benchmark_indice.py --do-cache     (vetores dos documentos já indexados)
+# Para cada tipo, varia o parâmetro de busca (nprobe ou efSearch), que troca
+# latência por recall. Mede também as buscas com filtro (como "só este
+# documento" no chat): cada consulta é restrita a uma faixa de --filtro posições
+# em volta do trecho de origem, comparando só o seletor do FAISS ("seletor") com
+# buscar_com_filtro, usada pelo chat ("chat").
+
+PARAMETROS_BUSCA = {
+    "flat": [None],
+    "ivfpq": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+}
+
+
+def vetores_sinteticos(total, dimensao, semente=0, dimensao_intrinseca=32):
+    """
+    Vetores parecidos com embeddings: agrupados por assunto em um espaço de poucas
+    dimensões, projetados na dimensão pedida e normalizados.
+    """
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(max(total // 500, 8), dimensao_intrinseca))
+    pontos = centros[rng.integers(len(centros), size=total)] + 0.5 * rng.normal(size=(total, dimensao_intrinseca))
+    vetores = pontos @ rng.normal(size=(dimensao_intrinseca, dimensao)) + 0.1 * rng.normal(size=(total, dimensao))
+    return (vetores / np.linalg.norm(vetores, axis=1, keepdims=True)).astype(np.float32)
+
+def vetores_do_cache(diretorio=DIRETORIO_INDICES):
+    """Junta os vetores de todos os índices de documentos salvos no cache."""
+    partes = []
+    for nome in sorted(os.listdir(diretorio)):
+        caminho = os.path.join(diretorio, nome, "index.faiss")
+        if os.path.exists(caminho):
+            indice = _ler_indice_faiss(caminho)
+            partes.append(indice.reconstruct_n(0, indice.ntotal))
+    if not partes:
+        raise SystemExit(f"Nenhum índice encontrado em {diretorio}.")
+    return np.vstack(partes).astype(np.float32)
+
+def ajustar_busca(indice, parametro):
+    if parametro is None:
+        return
+    if isinstance(indice, faiss.IndexIVF):
+        indice.nprobe = parametro
+    elif isinstance(indice, faiss.IndexHNSW):
+        indice.hnsw.efSearch = parametro
+
+def medir(indice, consultas, k, vizinhos_exatos):
+    """Retorna (recall@k médio, latência média em ms, latência p95 em ms), uma consulta por vez como no chat."""
+    latencias, acertos = [], 0
+    for consulta, exatos in zip(consultas, vizinhos_exatos):
+        inicio = time.perf_counter()
+        _, encontrados = indice.search(consulta[None, :], k)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        acertos += len(set(encontrados[0]) & set(exatos))
+    return acertos / (k * len(consultas)), float(np.mean(latencias)), float(np.percentile(latencias, 95))
+
+def faixas_filtro(total, consultas_origem, tamanho):
+    """Para cada consulta, as posições de um "documento" de tamanho chunks que contém o trecho de origem."""
+    inicios = np.clip(consultas_origem - tamanho // 2, 0, max(total - tamanho, 0))
+    return [np.arange(inicio, min(inicio + tamanho, total), dtype=np.int64) for inicio in inicios]
+
+def medir_filtro(indice, consultas, k, faixas, vizinhos_exatos, so_seletor):
+    """Como medir, mas com cada consulta restrita à sua faixa de posições."""
+    latencias, acertos = [], 0
+    for consulta, faixa, exatos in zip(consultas, faixas, vizinhos_exatos):
+        inicio = time.perf_counter()
+        if so_seletor:
+            seletor = faiss.IDSelectorBatch(faixa)
+            _, encontrados = indice.search(consulta[None, :], k, params=parametros_busca(indice, seletor))
+            encontrados = encontrados[0]
+        else:
+            encontrados = buscar_com_filtro(indice, consulta[None, :], k, faixa)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        acertos += len(set(encontrados) & set(exatos))
+    return acertos / (k * len(consultas)), float(np.mean(latencias)), float(np.percentile(latencias, 95))
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede recall@k, latência e memória dos tipos de índice vetorial.")
+    parser.add_argument("--chunks", type=int, default=50000, help="quantidade de vetores sintéticos")
+    parser.add_argument("--dimensao", type=int, default=1536, help="dimensão dos vetores sintéticos")
+    parser.add_argument("--do-cache", action="store_true", help="usar os vetores dos índices salvos no cache")
+    parser.add_argument("--consultas", type=int, default=200, help="quantidade de consultas medidas")
+    parser.add_argument("--k", type=int, default=10, help="vizinhos por consulta (recall@k)")
+    parser.add_argument("--tipos", nargs="+", choices=list(PARAMETROS_BUSCA), default=list(PARAMETROS_BUSCA))
+    parser.add_argument("--filtro", type=int, default=200, help="chunks permitidos nas buscas com filtro (0 = não medir)")
+    args = parser.parse_args()
+
+    vetores = vetores_do_cache() if args.do_cache else vetores_sinteticos(args.chunks, args.dimensao)
+    # As consultas são vetores da base com ruído (perguntas parecidas com trechos existentes)
+    rng = np.random.default_rng(1)
+    origens = rng.integers(len(vetores), size=args.consultas)
+    consultas = vetores[origens]
+    consultas = (consultas + 0.02 * rng.normal(size=consultas.shape)).astype(np.float32)
+    print(f"{len(vetores)} vetores de dimensão {vetores.shape[1]}, {len(consultas)} consultas, k={args.k}")
+
+    exato = faiss.IndexFlatL2(vetores.shape[1])
+    exato.add(vetores)
+    _, vizinhos_exatos = exato.search(consultas, args.k)
+    if args.filtro:
+        faixas = faixas_filtro(len(vetores), origens, args.filtro)
+        vizinhos_filtrados = [
+            faixa[faiss.knn(consulta[None, :], vetores[faixa], args.k)[1][0]]
+            for consulta, faixa in zip(consultas, faixas)
+        ]
+
+    print(f"{'tipo':<7}{'parâmetro':>10}{'treino+adição (s)':>19}{'memória (MB)':>14}"
+          f"{f'recall@{args.k}':>11}{'média (ms)':>12}{'p95 (ms)':>10}")
+    for tipo in args.tipos:
+        inicio = time.perf_counter()
+        indice = criar_indice_faiss(vetores, tipo)
+        indice.add(vetores)
+        construcao = time.perf_counter() - inicio
+        memoria = faiss.serialize_index(indice).nbytes / 1024 / 1024
+        for parametro in PARAMETROS_BUSCA[tipo]:
+            ajustar_busca(indice, parametro)
+            recall, media, p95 = medir(indice, consultas, args.k, vizinhos_exatos)
+            print(f"{tipo:<7}{parametro if parametro is not None else '-':>10}{construcao:>19.2f}{memoria:>14.1f}"
+                  f"{recall:>11.3f}{media:>12.3f}{p95:>10.3f}")
+            if args.filtro:
+                for nome, so_seletor in (("seletor", True), ("chat", False)):
+                    recall, media, p95 = medir_filtro(indice, consultas, args.k, faixas, vizinhos_filtrados, so_seletor)
+                    print(f"{'  filtro ' + nome:<36}{'':>14}{recall:>11.3f}{media:>12.3f}{p95:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
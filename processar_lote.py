@@ -0,0 +1,45 @@
+import argparse
+import sys
+import time
+from utils.pipeline import ETAPAS, executar_lote
+from utils.config import PIPELINE_DOCUMENTOS_SIMULTANEOS
+
+# ----- PROCESSAMENTO EM LOTE (LINHA DE COMANDO) -----
+# Processa um diretório ou um .zip sem o Streamlit:
+#   python processar_lote.py documentos/ saida/
+#   python processar_lote.py pacote.zip saida/ --etapas classificacao prazos
+# Rodar de novo com a mesma saída retoma de onde parou.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrai, classifica, resume e encontra prazos de um lote de documentos.")
+    parser.add_argument("entrada", help="diretório (com subpastas) ou arquivo .zip")
+    parser.add_argument("saida", help="diretório dos resultados e checkpoints")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS[1:], default=list(ETAPAS[1:]),
+                        help="etapas após a extração (padrão: todas)")
+    parser.add_argument("--simultaneos", type=int, default=PIPELINE_DOCUMENTOS_SIMULTANEOS,
+                        help="documentos processados ao mesmo tempo")
+    parser.add_argument("--modelo", default="gpt-3.5-turbo", help="modelo usado nos resumos e prazos")
+    args = parser.parse_args()
+
+    inicio = time.time()
+    contagem = {"ok": 0, "erro": 0}
+
+    def ao_concluir(resultado):
+        situacao = "erro" if resultado.get("erro") else "ok"
+        contagem[situacao] += 1
+        detalhe = resultado.get("erro") or resultado.get("tipo", "")
+        print(f"[{contagem['ok'] + contagem['erro']}] {resultado['nome']}: {situacao} {detalhe}", flush=True)
+
+    avisos = executar_lote(
+        args.entrada, args.saida, etapas=("extracao", *args.etapas),
+        max_simultaneos=args.simultaneos, modelo=args.modelo, ao_concluir=ao_concluir
+    )
+    for aviso in avisos:
+        print(f"Aviso: {aviso}", file=sys.stderr)
+    print(f"{contagem['ok']} documento(s) concluído(s), {contagem['erro']} com erro, em {time.time() - inicio:.1f}s.")
+    return 1 if contagem["erro"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
+# Incrementar sempre que os prompts mudarem, para não reaproveitar respostas antigas do cache
+PROMPTS_VERSAO = "1"
+
 PROMPTS_PADRONIZADOS = {
     "Contrato": """
 Você é um assistente especializado em contratos de projetos públicos e concessões. Gere um resumo técnico e padronizado com base no conteúdo abaixo.
@@ -224,3 +227,20 @@ Se não houver nenhum prazo claro, escreva:
 Texto:
 \"\"\"{parte}\"\"\"
 """
+
+PROMPT_CHAT_CONDENSAR = """
+Dada a conversa abaixo e uma pergunta de acompanhamento, reescreva a pergunta de acompanhamento como uma pergunta independente, no mesmo idioma, com todo o contexto necessário para buscar a resposta nos documentos.
+
+Conversa:
+{historico}
+
+Pergunta de acompanhamento: {pergunta}
+Pergunta independente:"""
+
+PROMPT_CHAT_RESPOSTA = """
+Use os trechos de documentos abaixo para responder à pergunta no final. Se a resposta não estiver nos trechos, diga que não sabe, sem inventar. Cada trecho começa com o documento e a página de origem; quando possível, cite-os na resposta.
+
+{contexto}
+
+Pergunta: {pergunta}
+Resposta:"""
@@ -1,24 +1,46 @@
 import streamlit as st
 from io import BytesIO
+from itertools import chain
 from utils.classificar import classificar_com_cache, normalizar_tipo_documento, mostrar_classificacao_final
-from utils.extrair_texto import extrair_texto
-from utils.llm import gerar_resumo_padronizado
+from utils.extrair_texto import extrair_paginas, calcular_hash
+from utils.llm import gerar_resumo_em_stream
+from utils.tarefas import fila_tarefas, desenhar_com_atualizacao, ERRO, CANCELADA
 
-@st.cache_data(show_spinner="Gerando resumo...")
-def gerar_resumo_com_cache(nome_arquivo, texto, tipo):
+AVISO_TEXTO_VAZIO = "⚠️ Texto vazio ou não extraído para este documento."
+
+
+def gerar_resumo_tarefa(tarefa, conteudo, nome, tipo):
     """
-    Gera um resumo padronizado do texto, com cache para melhorar performance.
-    Retorna aviso se texto estiver vazio.
+    Extrai o texto e gera o resumo de um documento em streaming, deixando o texto
+    parcial em tarefa.parcial. Roda como tarefa em segundo plano: continua mesmo
+    se o usuário recarregar a página ou navegar para outra, e pode ser cancelada
+    entre um pedaço e outro. O resumo completo fica como resultado da tarefa.
     """
-    if not texto or len(texto.strip()) == 0:
-        return "⚠️ Texto vazio ou não extraído para este documento."
-    return gerar_resumo_padronizado(texto, tipo)
+    # Lê as páginas sob demanda; só as primeiras são lidas aqui, para saber se há texto
+    paginas = extrair_paginas(BytesIO(conteudo), nome)
+    lidas = []
+    for pagina in paginas:
+        lidas.append(pagina)
+        if pagina[1].strip():
+            break
+    else:
+        tarefa.parcial = AVISO_TEXTO_VAZIO
+        return AVISO_TEXTO_VAZIO
+
+    tarefa.parcial = ""
+    for pedaco in gerar_resumo_em_stream(chain(lidas, paginas), tipo, doc_hash=calcular_hash(conteudo), tarefa=tarefa):
+        tarefa.verificar_cancelamento()
+        tarefa.parcial += pedaco
+    return tarefa.parcial
 
 
 def mostrar_resumo_tipo():
     """
     Exibe resumos para os documentos filtrados pelo tipo confirmado na sessão.
-    Usa cache para texto e resumo para evitar múltiplas chamadas à API.
+    Cada resumo é gerado por uma tarefa em segundo plano (no máximo uma por
+    documento e tipo, mesmo com reruns) e aparece na página à medida que o texto
+    é gerado. O resumo pronto fica na tarefa enquanto ela é mantida na fila; depois
+    disso, gerá-lo de novo usa as respostas do modelo já guardadas em disco.
     """
     tipo = st.session_state.get("tipo_para_resumir", None)
     if not tipo:
@@ -33,10 +55,6 @@ def mostrar_resumo_tipo():
         st.info(f"Nenhum documento do tipo **{tipo}** foi encontrado.")
         return
 
-    # Inicializar cache de textos se ainda não existir
-    if "textos_cache" not in st.session_state:
-        st.session_state["textos_cache"] = {}
-
     # Cabeçalho da seção de resumo
     st.markdown(f"""
         <div style="
@@ -50,22 +68,45 @@ def mostrar_resumo_tipo():
         </div>
     """, unsafe_allow_html=True)
 
-    # Para cada arquivo filtrado, gerar e mostrar resumo
+    # Agenda (ou reencontra) a tarefa de cada documento
+    fila = fila_tarefas()
+    tarefas = {}
     for file in arquivos_selecionados:
-        st.markdown("---")
-        st.markdown(f"### 📎 {file['nome']}")
-
-        # Usar texto do cache ou extrair se não existir
-        if file["nome"] not in st.session_state["textos_cache"]:
-            texto = extrair_texto(BytesIO(file["conteudo"]), file["nome"])
-            st.session_state["textos_cache"][file["nome"]] = texto
-        else:
-            texto = st.session_state["textos_cache"][file["nome"]]
-
-        # Gerar resumo com cache
-        with st.spinner("Extraindo e resumindo..."):
-            resumo = gerar_resumo_com_cache(file["nome"], texto, tipo)
-        st.markdown(resumo, unsafe_allow_html=True)
+        chave = calcular_hash(file["conteudo"])
+        tarefas[chave] = fila.submeter(
+            f"resumo:{chave}:{tipo}", gerar_resumo_tarefa, file["conteudo"], file["nome"], tipo,
+            descricao=f"Resumo de {file['nome']}"
+        )
+
+    def desenhar():
+        for file in arquivos_selecionados:
+            st.markdown("---")
+            st.markdown(f"### 📎 {file['nome']}")
+            tarefa = tarefas[calcular_hash(file["conteudo"])]
+            if tarefa.estado == ERRO:
+                st.error(f"Erro ao gerar resumo: {tarefa.erro}")
+                if st.button("Tentar novamente", key=f"repetir_{tarefa.id}_{file['nome']}"):
+                    fila.reenviar(tarefa.id, gerar_resumo_tarefa, file["conteudo"], file["nome"], tipo,
+                                  descricao=tarefa.descricao)
+                    st.rerun()
+            elif tarefa.estado == CANCELADA:
+                st.warning("Resumo cancelado.")
+                if st.button("Gerar novamente", key=f"repetir_{tarefa.id}_{file['nome']}"):
+                    fila.reenviar(tarefa.id, gerar_resumo_tarefa, file["conteudo"], file["nome"], tipo,
+                                  descricao=tarefa.descricao)
+                    st.rerun()
+            elif tarefa.parcial:
+                cursor = "" if tarefa.terminou else " ▌"
+                st.markdown(tarefa.parcial + cursor, unsafe_allow_html=True)
+            else:
+                st.progress(tarefa.progresso, text="⏳ Extraindo e resumindo...")
+            if not tarefa.terminou:
+                if st.button("Cancelar", key=f"cancelar_{tarefa.id}_{file['nome']}"):
+                    if not tarefa.cancelar():
+                        st.toast("Outra sessão ainda aguarda este resumo; ele continuará sendo gerado.")
+        return any(not t.terminou for t in tarefas.values())
+
+    desenhar_com_atualizacao(desenhar, any(not t.terminou for t in tarefas.values()))
 
     st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# Os caches em disco (divisões, contagens) são criados na importação dos módulos:
+# os testes usam um diretório temporário, nunca o .cache do aplicativo
+os.environ["DIRETORIO_CACHE"] = tempfile.mkdtemp(prefix="cache_testes_")
+
+import pytest
+import tiktoken
+
+
+def codificacao_bytes(nome="bytes_teste", juncoes=()):
+    """
+    Codificação sintética do tiktoken, que não precisa de download: um token por
+    byte, mais os pedaços de juncoes (ex.: "ç" com os seus dois bytes) como tokens únicos.
+    """
+    ranks = {bytes([i]): i for i in range(256)}
+    for pedaco in juncoes:
+        ranks[pedaco.encode("utf-8")] = len(ranks)
+    return tiktoken.Encoding(nome, pat_str=r"\S+|\s+", mergeable_ranks=ranks, special_tokens={})
+
+
+@pytest.fixture
+def codificador(monkeypatch):
+    """Faz utils.tokens e utils.divisao usarem a codificação de um token por byte."""
+    enc = codificacao_bytes()
+    monkeypatch.setattr("utils.tokens.obter_codificador", lambda modelo="gpt-4o-mini": enc)
+    monkeypatch.setattr("utils.divisao.obter_codificador", lambda modelo="gpt-4o-mini": enc)
+    return enc
@@ -0,0 +1,69 @@
+import sys
+import numpy as np
+import pytest
+from utils.busca_hibrida import (
+    IndiceBM25, termos_busca, fundir_rrf, reordenar_mmr, reordenar_cross_encoder, _cross_encoder
+)
+
+
+@pytest.fixture
+def bm25():
+    indice = IndiceBM25()
+    indice.adicionar([
+        ("a:0", "Contratada inscrita no CNPJ 12.345.678/0001-90."),
+        ("a:1", "O prazo de vigência é de 12 meses."),
+        ("b:0", "A multa por atraso é de 2% ao dia, limitada a 10% do valor do contrato."),
+        ("b:1", "O prazo de entrega é de 30 dias após a assinatura do contrato."),
+    ])
+    return indice
+
+
+def test_termos_sem_acentos_e_numeros_so_com_digitos():
+    assert termos_busca("Vigência: CNPJ 12.345.678/0001-90") == [
+        "vigencia", "cnpj", "12.345.678/0001-90", "12345678000190"
+    ]
+
+
+def test_bm25_acha_numero_com_ou_sem_separadores(bm25):
+    assert bm25.buscar("CNPJ 12345678000190", k=1) == ["a:0"]
+    assert bm25.buscar("qual o 12.345.678/0001-90?", k=1) == ["a:0"]
+
+
+def test_bm25_ordena_por_relevancia_e_respeita_permitidos(bm25):
+    assert bm25.buscar("prazo de entrega", k=2) == ["b:1", "a:1"]
+    assert bm25.buscar("prazo de entrega", k=2, permitidos={"a:0", "a:1"}) == ["a:1"]
+    assert bm25.buscar("termo inexistente", k=3) == []
+
+
+def test_bm25_remover(bm25):
+    total = bm25.total_termos
+    bm25.remover(["b:1", "nao-existe"])
+    assert bm25.buscar("entrega", k=3) == []
+    assert "b:1" not in bm25.tamanhos
+    assert bm25.total_termos < total
+
+
+def test_rrf_soma_as_posicoes_das_listas():
+    fundidos = fundir_rrf([["x", "y", "z"], ["y", "w"]], k=60)
+    assert [doc_id for doc_id, _ in fundidos] == ["y", "x", "w", "z"]
+    assert fundidos[0][1] == pytest.approx(1 / 62 + 1 / 61)
+    assert fundir_rrf([]) == []
+
+
+def test_mmr_evita_trechos_repetidos():
+    vetores = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    relevancia = [1.0, 0.95, 0.5]
+    # Só relevância: o repetido vem antes; com diversidade, o trecho diferente
+    assert reordenar_mmr(relevancia, vetores, k=2, lambda_=1.0) == [0, 1]
+    assert reordenar_mmr(relevancia, vetores, k=2, lambda_=0.5) == [0, 2]
+    assert reordenar_mmr([], np.empty((0, 2)), k=2) == []
+
+
+def test_cross_encoder_indisponivel_mantem_a_ordem_da_fusao(monkeypatch):
+    # Sem o pacote (ou sem o modelo), a ordem recebida é mantida
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    _cross_encoder.cache_clear()
+    try:
+        assert reordenar_cross_encoder("pergunta", ["a", "b", "c"], k=2, modelo="modelo-teste") == [0, 1]
+    finally:
+        _cross_encoder.cache_clear()
@@ -0,0 +1,77 @@
+import pytest
+from utils import classificador_local
+from utils.classificador_local import (
+    CONFIANCA_CORPO, CONFIANCA_TITULO, REGRAS_TITULO, classificar_por_regras, classificar_localmente, treinar_modelo
+)
+from utils.classificacao import normalizar_texto, normalizar_tipo_documento
+from utils.config import CLASSIFICACAO_CONFIANCA_LOCAL
+
+
+@pytest.fixture
+def exemplos(monkeypatch):
+    """Substitui os rótulos guardados pelos exemplos informados em exemplos.extend(...)."""
+    lista = []
+    monkeypatch.setattr(classificador_local, "listar_exemplos", lambda: list(lista))
+    monkeypatch.setattr(classificador_local, "versao_rotulos", lambda: (len(lista),))
+    monkeypatch.setattr(classificador_local, "_modelo", {"versao": None, "centroides": None, "idf": None})
+    return lista
+
+
+def texto(bruto):
+    return normalizar_texto(bruto, manter_linhas=True)
+
+
+def test_titulo_nas_primeiras_linhas(exemplos):
+    assert classificar_localmente(texto("OFÍCIO Nº 123/2024\nAo Senhor Diretor")) == ("Ofício", CONFIANCA_TITULO)
+    assert classificar_localmente(texto("PRIMEIRO TERMO ADITIVO AO CONTRATO Nº 5/2023")) == (
+        "Termo Aditivo", CONFIANCA_TITULO
+    )
+
+
+def test_prioridade_entre_titulos():
+    # "Termo aditivo" vem antes de "Contrato" em REGRAS_TITULO, mesmo aparecendo depois
+    assert classificar_por_regras(texto("CONTRATO Nº 12/2023\nSEGUNDO TERMO ADITIVO")) == (
+        "Termo Aditivo", CONFIANCA_TITULO
+    )
+
+
+def test_relatorio_so_como_titulo():
+    assert classificar_por_regras(texto("1. RELATÓRIO DE ATIVIDADES\n...")) == ("Relatório", CONFIANCA_TITULO)
+    assert classificar_por_regras(texto("A contratada enviará relatório mensal.")) == (None, 0.0)
+
+
+def test_mencao_no_corpo_nao_dispensa_a_api(exemplos):
+    corpo = "Acordo entre as partes\n" + "cláusulas gerais do acordo firmado.\n" * 15
+    tipo, confianca = classificar_localmente(texto(corpo + "Conforme a proposta de preços apresentada."))
+    assert tipo == "Proposta"
+    assert confianca == CONFIANCA_CORPO < CLASSIFICACAO_CONFIANCA_LOCAL
+
+
+def test_sem_texto_ou_sem_titulo(exemplos):
+    assert classificar_localmente("") == (None, 0.0)
+    assert classificar_localmente(texto("Texto qualquer sem título conhecido")) == (None, 0.0)
+
+
+def test_modelo_precisa_de_exemplos_de_mais_de_um_tipo():
+    assert treinar_modelo([("texto de contrato", "Contrato")] * 10) == (None, None)
+    assert treinar_modelo([("a", "Contrato"), ("b", "Ata")]) == (None, None)
+
+
+def test_modelo_treinado_com_as_confirmacoes(exemplos):
+    exemplos.extend(
+        [("parecer juridico sobre a regularidade fiscal da empresa consultada", "Parecer")] * 3
+        + [("nota fiscal eletronica mercadoria entregue transportadora destinatario", "Nota Fiscal")] * 3
+    )
+    tipo, confianca = classificar_localmente(texto("Nota fiscal eletrônica: mercadoria entregue ao destinatário"))
+    assert tipo == "Nota Fiscal"
+    assert confianca > CLASSIFICACAO_CONFIANCA_LOCAL
+
+    # O modelo é treinado de novo quando os rótulos mudam
+    exemplos.append(("nota fiscal eletronica", "Nota Fiscal"))
+    classificar_localmente(texto("parecer jurídico"))
+    assert classificador_local._modelo["versao"] == (7,)
+
+
+@pytest.mark.parametrize("tipo", [tipo for tipo, _ in REGRAS_TITULO])
+def test_tipos_das_regras_sobrevivem_a_normalizacao(tipo):
+    assert normalizar_tipo_documento(tipo) == tipo
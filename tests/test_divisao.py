@@ -0,0 +1,98 @@
+from utils import divisao
+from utils.divisao import dividir_documento, dividir_documento_com_cache
+
+
+def artigos(quantidade, palavras=8):
+    """Texto com artigos curtos ("Art. N"), cada um uma unidade estrutural."""
+    return "".join(f"Art. {i} " + "texto " * palavras + "\n" for i in range(1, quantidade + 1))
+
+
+def test_chunks_respeitam_limite_e_cobrem_o_documento(codificador):
+    texto = artigos(30)
+    chunks = list(dividir_documento([(1, texto)], max_tokens=120, sobreposicao=0))
+
+    assert len(chunks) > 1
+    assert all(c.tokens <= 120 for c in chunks)
+    # Sem sobreposição, cada chunk começa onde o anterior terminou
+    assert chunks[0].inicio == 0
+    assert all(a.fim == b.inicio for a, b in zip(chunks, chunks[1:]))
+    assert chunks[-1].fim == len(texto.encode())
+    assert "".join(c.texto for c in chunks) == texto
+
+
+def test_offsets_batem_com_o_texto(codificador):
+    texto = artigos(20)
+    for c in dividir_documento([(1, texto)], max_tokens=100, sobreposicao=30):
+        # Um token por byte e texto ASCII: a posição em tokens é a posição no texto
+        assert c.texto == texto[c.inicio:c.fim]
+        assert c.tokens == c.fim - c.inicio
+
+
+def test_chunks_comecam_nas_fronteiras_estruturais(codificador):
+    texto = artigos(12)
+    chunks = list(dividir_documento([(1, texto)], max_tokens=150, sobreposicao=0))
+    assert all(c.texto.startswith("Art. ") for c in chunks)
+
+
+def test_sobreposicao_com_unidades_inteiras(codificador):
+    texto = artigos(30)
+    chunks = list(dividir_documento([(1, texto)], max_tokens=120, sobreposicao=60))
+    for a, b in zip(chunks, chunks[1:]):
+        repetidos = a.fim - b.inicio
+        assert 0 < repetidos <= 60
+        assert a.texto.endswith(texto[b.inicio:a.fim])
+        assert b.texto.startswith("Art. ")
+
+
+def test_sobreposicao_em_tokens_quando_a_unidade_nao_cabe(codificador):
+    # Uma única unidade maior que o limite, sem separadores: só dá para sobrepor tokens
+    texto = "x" * 500
+    chunks = list(dividir_documento([(1, texto)], max_tokens=100, sobreposicao=20))
+
+    assert all(c.tokens <= 100 for c in chunks)
+    assert all(a.fim - b.inicio == 20 for a, b in zip(chunks, chunks[1:]))
+    assert chunks[-1].fim == 500
+
+
+def test_unidade_grande_quebra_apos_frase_e_nao_em_numero(codificador):
+    texto = "Valor de R$ 1.234,56 conforme item 5.2 do edital. " * 20
+    chunks = list(dividir_documento([(1, texto)], max_tokens=120, sobreposicao=0))
+
+    assert len(chunks) > 1
+    assert all(c.texto.endswith(". ") for c in chunks)
+
+
+def test_por_pagina_nao_atravessa_paginas(codificador):
+    paginas = [(1, artigos(3)), (2, artigos(3)), (3, artigos(3))]
+    chunks = list(dividir_documento(paginas, max_tokens=1000, sobreposicao=50, por_pagina=True))
+
+    assert [c.pagina for c in chunks] == [1, 2, 3]
+    assert [c.texto for c in chunks] == [texto for _, texto in paginas]
+
+
+def test_divisao_com_cache_nao_le_as_paginas_de_novo(codificador):
+    texto = artigos(10)
+    primeira = dividir_documento_com_cache("hash-teste", [(1, texto)], max_tokens=100, sobreposicao=20)
+
+    def paginas_que_nao_podem_ser_lidas():
+        raise AssertionError("as páginas foram lidas de novo")
+        yield
+
+    segunda = dividir_documento_com_cache("hash-teste", paginas_que_nao_podem_ser_lidas(), max_tokens=100,
+                                          sobreposicao=20)
+    assert segunda == primeira
+
+
+def test_nova_versao_do_extrator_divide_de_novo(codificador, monkeypatch):
+    texto = artigos(10)
+    dividir_documento_com_cache("hash-extrator", [(1, texto)], max_tokens=100, sobreposicao=20)
+
+    monkeypatch.setattr(divisao, "EXTRATOR_VERSAO", "nova")
+    lidas = []
+
+    def paginas():
+        lidas.append(1)
+        yield 1, texto
+
+    dividir_documento_com_cache("hash-extrator", paginas(), max_tokens=100, sobreposicao=20)
+    assert lidas == [1]
@@ -0,0 +1,83 @@
+import os
+import zipfile
+from io import BytesIO
+import pytest
+from utils import ingestao_zip
+from utils.ingestao_zip import caminho_no_zip, expandir_zip
+
+
+def criar_zip(arquivos, compressao=zipfile.ZIP_STORED):
+    """Bytes de um zip com os arquivos informados ({caminho: conteúdo})."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compressao) as z:
+        for caminho, conteudo in arquivos.items():
+            z.writestr(caminho, conteudo)
+    return buffer.getvalue()
+
+
+def expandir(conteudo, nome="pacote.zip"):
+    avisos = []
+    return list(expandir_zip(conteudo, nome, avisos)), avisos
+
+
+def test_documentos_com_pastas_e_sem_arquivos_de_sistema():
+    conteudo = criar_zip({
+        "Edital/anexo.pdf": b"pdf",
+        "contrato.docx": b"docx",
+        "foto.png": b"png",
+        "__MACOSX/Edital/._anexo.pdf": b"x",
+        ".DS_Store": b"x",
+    })
+    documentos, avisos = expandir(conteudo)
+    assert documentos == [("pacote.zip/Edital/anexo.pdf", b"pdf"), ("pacote.zip/contrato.docx", b"docx")]
+    assert avisos == []
+
+
+def test_zip_dentro_de_zip_e_profundidade(monkeypatch):
+    monkeypatch.setattr(ingestao_zip, "ZIP_MAX_PROFUNDIDADE", 1)
+    interno = criar_zip({"a.txt": b"a", "mais.zip": criar_zip({"b.txt": b"b"})})
+    documentos, avisos = expandir(criar_zip({"interno.zip": interno}))
+
+    assert documentos == [("pacote.zip/interno.zip/a.txt", b"a")]
+    assert avisos == ["pacote.zip/interno.zip/mais.zip: zip dentro de zip além de 1 níveis; ignorado."]
+    assert caminho_no_zip(documentos[0][0]) == "a.txt"
+
+
+def test_limite_de_tamanho_por_arquivo(monkeypatch):
+    monkeypatch.setattr(ingestao_zip, "ZIP_MAX_MEMBRO_MB", 1)
+    grande = os.urandom(1024 * 1024 + 1)
+    documentos, avisos = expandir(criar_zip({"grande.pdf": grande, "pequeno.txt": b"ok"}))
+
+    assert documentos == [("pacote.zip/pequeno.txt", b"ok")]
+    assert avisos == ["pacote.zip/grande.pdf: maior que 1 MB descompactado; ignorado."]
+
+
+def test_limite_total_descompactado(monkeypatch):
+    monkeypatch.setattr(ingestao_zip, "ZIP_MAX_TOTAL_MB", 1)
+    metade = os.urandom(600 * 1024)
+    documentos, avisos = expandir(criar_zip({"a.pdf": metade, "b.pdf": metade, "c.txt": b"c"}))
+
+    assert [caminho for caminho, _ in documentos] == ["pacote.zip/a.pdf"]
+    assert avisos == ["pacote.zip: limite de 1 MB descompactados atingido; o restante foi ignorado."]
+
+
+def test_limite_de_quantidade(monkeypatch):
+    monkeypatch.setattr(ingestao_zip, "ZIP_MAX_ARQUIVOS", 2)
+    documentos, avisos = expandir(criar_zip({f"{i}.txt": b"x" for i in range(4)}))
+
+    assert len(documentos) == 2
+    assert avisos == ["pacote.zip: limite de 2 arquivos atingido; o restante foi ignorado."]
+
+
+def test_taxa_de_compressao_suspeita():
+    # Zeros comprimem bem mais que 100:1 (ZIP_MAX_RAZAO_COMPRESSAO padrão)
+    conteudo = criar_zip({"bomba.txt": bytes(1024 * 1024), "ok.txt": b"texto"}, compressao=zipfile.ZIP_DEFLATED)
+    documentos, avisos = expandir(conteudo)
+
+    assert documentos == [("pacote.zip/ok.txt", b"texto")]
+    assert avisos == ["pacote.zip/bomba.txt: taxa de compressão suspeita; ignorado."]
+
+
+@pytest.mark.parametrize("conteudo", [b"", b"nao e um zip"])
+def test_zip_invalido(conteudo):
+    assert expandir(conteudo) == ([], ["pacote.zip: arquivo zip inválido."])
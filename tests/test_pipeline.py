@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from utils import classificacao, rotulos
+from utils.extrair_texto import calcular_hash
+from utils.pipeline import executar_lote
+
+
+@pytest.fixture
+def sem_api(tmp_path, monkeypatch):
+    """Rótulos em um banco vazio e nenhuma chave da API: criar o cliente é um erro."""
+    monkeypatch.setattr(rotulos, "CAMINHO_ROTULOS", str(tmp_path / "rotulos.sqlite3"))
+
+    def criar_cliente_openai():
+        raise AssertionError("o cliente OpenAI não deveria ser criado")
+
+    monkeypatch.setattr(classificacao, "criar_cliente_openai", criar_cliente_openai)
+
+
+def test_nucleo_nao_importa_a_interface():
+    # Em um processo novo: os outros testes podem já ter importado esses módulos
+    codigo = (
+        "import sys, utils.pipeline; "
+        "print([m for m in ('streamlit', 'utils.classificar', 'utils.prazos', 'utils.tarefas') if m in sys.modules])"
+    )
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert saida.stdout.splitlines()[-1] == "[]"
+
+
+def test_classificacao_local_dispensa_o_cliente(tmp_path, sem_api):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    (entrada / "oficio.txt").write_text("OFÍCIO Nº 1/2024\nAo Senhor Diretor", encoding="utf-8")
+    saida = tmp_path / "saida"
+
+    executar_lote(str(entrada), str(saida), etapas=("extracao", "classificacao"))
+
+    resultado, = json.loads((saida / "resultados.json").read_text(encoding="utf-8"))
+    assert resultado["tipo"] == "Ofício"
+    assert "erro" not in resultado
+    assert resultado["concluidas"] == ["extracao", "classificacao"]
+    assert list(pd.read_parquet(saida / "documentos.parquet")["tipo"]) == ["Ofício"]
+
+
+def test_rotulo_guardado_dispensa_o_cliente(tmp_path, sem_api):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    (entrada / "sem_titulo.txt").write_text("Texto qualquer sem título conhecido", encoding="utf-8")
+    rotulos.salvar_rotulos([(calcular_hash((entrada / "sem_titulo.txt").read_bytes()), "sem_titulo.txt",
+                             "Ata", "texto qualquer", True)])
+    saida = tmp_path / "saida"
+
+    executar_lote(str(entrada), str(saida), etapas=("extracao", "classificacao"))
+
+    resultado, = json.loads((saida / "resultados.json").read_text(encoding="utf-8"))
+    assert resultado["tipo"] == "Ata"
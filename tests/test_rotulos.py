@@ -0,0 +1,57 @@
+import pytest
+from utils import rotulos
+from utils.rotulos import (
+    padrao_nome, salvar_rotulos, buscar_rotulo, tipo_do_padrao, listar_correcoes, listar_exemplos, versao_rotulos
+)
+
+
+@pytest.fixture(autouse=True)
+def banco(tmp_path, monkeypatch):
+    monkeypatch.setattr(rotulos, "CAMINHO_ROTULOS", str(tmp_path / "rotulos.sqlite3"))
+    monkeypatch.setattr(rotulos, "ROTULOS_PADRAO_MINIMO", 2)
+
+
+@pytest.mark.parametrize("nome, esperado", [
+    ("Relatório_Mensal_2024-05.pdf", "relatorio_mensal_#-#.pdf"),
+    ("pacote.zip/pasta/Ofício Circular 12.docx", "oficio circular #.docx"),
+    ("scan_12.pdf", ""),
+    ("documento_final_3.pdf", ""),
+    ("contrato_3.pdf", ""),
+    ("12345.pdf", ""),
+])
+def test_padrao_nome(nome, esperado):
+    assert padrao_nome(nome) == esperado
+
+
+def test_rotulo_por_hash():
+    assert buscar_rotulo("h1") is None
+    assert buscar_rotulo(None) is None
+    salvar_rotulos([("h1", "a.pdf", "Contrato", "texto", False)])
+    assert buscar_rotulo("h1") == "Contrato"
+    salvar_rotulos([("h1", "a.pdf", "Ata", "", False)])
+    assert buscar_rotulo("h1") == "Ata"
+    # Texto vazio não apaga o texto já guardado
+    assert listar_exemplos() == [("texto", "Ata")]
+
+
+def test_correcao_continua_marcada():
+    salvar_rotulos([("h1", "a.pdf", "Ata", "texto", True)])
+    salvar_rotulos([("h1", "a.pdf", "Ata", "texto", False)])
+    assert listar_correcoes() == [("a.pdf", "texto", "Ata")]
+
+
+def test_tipo_do_padrao_precisa_de_familia_consistente():
+    salvar_rotulos([("h1", "relatorio_mensal_01.pdf", "Relatório", "", False)])
+    assert tipo_do_padrao("relatorio_mensal_07.pdf") is None
+    salvar_rotulos([("h2", "relatorio_mensal_02.pdf", "Relatório", "", False)])
+    assert tipo_do_padrao("relatorio_mensal_07.pdf") == "Relatório"
+    # Uma família com tipos diferentes não sugere nada
+    salvar_rotulos([("h3", "relatorio_mensal_03.pdf", "Ofício", "", False)])
+    assert tipo_do_padrao("relatorio_mensal_07.pdf") is None
+    assert tipo_do_padrao("scan_1.pdf") is None
+
+
+def test_versao_muda_a_cada_gravacao():
+    antes = versao_rotulos()
+    salvar_rotulos([("h1", "a.pdf", "Ata", "texto", False)])
+    assert versao_rotulos() != antes
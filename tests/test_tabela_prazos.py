@@ -0,0 +1,119 @@
+import os
+from datetime import date
+import pandas as pd
+import pytest
+from utils import tabela_prazos
+from utils.tabela_prazos import (
+    Prazo, ler_data, ler_duracao, somar_duracao, interpretar_prazo, calcular_datas_relativas,
+    salvar_prazos_documento, carregar_prazos_documento, carregar_tabela, prazos_proximos
+)
+
+
+@pytest.fixture
+def diretorio_prazos(tmp_path, monkeypatch):
+    monkeypatch.setattr(tabela_prazos, "DIRETORIO_PRAZOS", str(tmp_path / "prazos"))
+    return tmp_path / "prazos"
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Assinatura: 22/03/2023", date(2023, 3, 22)),
+    ("em 05.01.24", date(2024, 1, 5)),
+    ("1º de abril de 2024", date(2024, 4, 1)),
+    ("até 15 de março de 2025", date(2025, 3, 15)),
+    ("valor de 11.112,12", None),
+    ("31/02/2024", None),
+    ("sem data", None),
+])
+def test_ler_data(texto, esperado):
+    assert ler_data(texto) == esperado
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("30 (trinta) dias úteis", (30, "dias úteis")),
+    ("até 10 dias corridos", (10, "dias")),
+    ("12 meses", (12, "meses")),
+    ("1 mês", (1, "meses")),
+    ("5 anos", (5, "anos")),
+    ("2 semanas", (2, "semanas")),
+    ("imediato", (None, None)),
+])
+def test_ler_duracao(texto, esperado):
+    assert ler_duracao(texto) == esperado
+
+
+def test_somar_duracao():
+    assert somar_duracao(date(2024, 1, 31), 1, "meses") == date(2024, 2, 29)
+    assert somar_duracao(date(2023, 1, 31), 1, "meses") == date(2023, 2, 28)
+    assert somar_duracao(date(2024, 11, 30), 2, "meses") == date(2025, 1, 30)
+    assert somar_duracao(date(2024, 2, 29), 1, "anos") == date(2025, 2, 28)
+    assert somar_duracao(date(2024, 3, 10), 10, "dias") == date(2024, 3, 20)
+    assert somar_duracao(date(2024, 3, 10), 2, "semanas", sinal=-1) == date(2024, 2, 25)
+    # Sexta-feira + 1 dia útil = segunda-feira
+    assert somar_duracao(date(2024, 3, 8), 1, "dias úteis") == date(2024, 3, 11)
+    assert somar_duracao(date(2024, 3, 11), 1, "dias úteis", sinal=-1) == date(2024, 3, 8)
+
+
+def test_interpretar_prazo():
+    prazo = interpretar_prazo("Entrega (cláusula 5.2.): até 30 dias após a assinatura", "a.pdf", "h1", "m")
+    assert prazo.evento == "Entrega (cláusula 5.2.)"
+    assert prazo.prazo == "até 30 dias após a assinatura"
+    assert prazo.clausula == "5.2"
+    assert (prazo.quantidade, prazo.unidade) == (30, "dias")
+    assert prazo.data_absoluta is None
+
+    sem_evento = interpretar_prazo("22/03/2023", "a.pdf", "h1")
+    assert sem_evento.evento == ""
+    assert sem_evento.data_absoluta == date(2023, 3, 22)
+
+
+def test_datas_relativas_a_assinatura():
+    prazos = calcular_datas_relativas([
+        interpretar_prazo("Assinatura do contrato: 01/03/2024", "a.pdf", "h1"),
+        interpretar_prazo("Entrega: 30 dias após a assinatura", "a.pdf", "h1"),
+        interpretar_prazo("Garantia: 10 dias antes da assinatura", "a.pdf", "h1"),
+        interpretar_prazo("Vigência: 12 meses", "a.pdf", "h1"),
+    ])
+    assert [p.data_absoluta for p in prazos] == [date(2024, 3, 1), date(2024, 3, 31), date(2024, 2, 20), None]
+
+
+def test_sem_assinatura_nada_e_calculado():
+    prazos = calcular_datas_relativas([interpretar_prazo("Entrega: 30 dias após a assinatura", "a.pdf", "h1")])
+    assert prazos[0].data_absoluta is None
+
+
+def test_gravar_e_carregar(diretorio_prazos):
+    assert carregar_prazos_documento("h1", "m") is None
+    prazos = [
+        Prazo("a.pdf", "h1", "Entrega", "20/03/2024", quantidade=None, data_absoluta=date(2024, 3, 20), modelo="m"),
+        Prazo("a.pdf", "h1", "Vigência", "12 meses", quantidade=12, unidade="meses", modelo="m"),
+    ]
+    salvar_prazos_documento("h1", "m", prazos)
+    salvar_prazos_documento("h2", "m", [Prazo("b.pdf", "h2", "Pagamento", "01/04/2024",
+                                              data_absoluta=date(2024, 4, 1), modelo="m")])
+
+    assert carregar_prazos_documento("h1", "m") == prazos
+    assert len(carregar_tabela()) == 3
+    assert list(carregar_tabela(hashes={"h2"})["evento"]) == ["Pagamento"]
+    assert carregar_tabela(modelo="outro").empty
+
+
+def test_prazos_de_versoes_antigas_sao_ignorados(diretorio_prazos, monkeypatch):
+    salvar_prazos_documento("h1", "m", [Prazo("a.pdf", "h1", "Entrega", "20/03/2024", modelo="m")])
+    assert len(carregar_tabela()) == 1
+
+    monkeypatch.setattr(tabela_prazos, "PROMPTS_VERSAO", "versao-nova")
+    assert carregar_prazos_documento("h1", "m") is None
+    assert carregar_tabela().empty
+    assert len(os.listdir(diretorio_prazos)) == 1
+
+
+def test_prazos_proximos():
+    tabela = tabela_prazos.para_tabela([
+        Prazo("a", "h", "Depois", "", data_absoluta=date(2024, 5, 1)),
+        Prazo("a", "h", "Logo", "", data_absoluta=date(2024, 3, 5)),
+        Prazo("a", "h", "Passou", "", data_absoluta=date(2024, 2, 1)),
+        Prazo("a", "h", "Sem data", ""),
+    ])
+    proximos = prazos_proximos(tabela, dias=30, hoje=date(2024, 3, 1))
+    assert list(proximos["evento"]) == ["Logo"]
+    assert list(prazos_proximos(tabela, dias=90, hoje=pd.Timestamp(2024, 3, 1))["evento"]) == ["Logo", "Depois"]
@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from utils import tarefas
+from utils.llm import mapear_sob_demanda
+from utils.tarefas import FilaTarefas, Tarefa, TarefaCancelada, CONCLUIDA, ERRO, CANCELADA
+
+
+def esperar(tarefa, limite=5):
+    fim = time.monotonic() + limite
+    while not tarefa.terminou:
+        assert time.monotonic() < fim, "a tarefa não terminou a tempo"
+        time.sleep(0.01)
+    return tarefa
+
+
+@pytest.fixture
+def fila():
+    return FilaTarefas(max_trabalhadores=2)
+
+
+def test_mesmo_id_reaproveita_a_tarefa(fila):
+    chamadas = []
+    liberar = threading.Event()
+
+    def funcao(tarefa, valor):
+        chamadas.append(valor)
+        liberar.wait(5)
+        return valor * 2
+
+    primeira = fila.submeter("t:1", funcao, 21)
+    assert fila.submeter("t:1", funcao, 99) is primeira
+    liberar.set()
+    esperar(primeira)
+    # Terminada, continua sendo a mesma tarefa (dentro da retenção)
+    assert fila.submeter("t:1", funcao, 99) is primeira
+    assert (primeira.estado, primeira.resultado, primeira.progresso) == (CONCLUIDA, 42, 1.0)
+    assert chamadas == [21]
+
+
+def test_reenviar_depois_de_erro(fila):
+    def falha(tarefa):
+        raise RuntimeError("falhou")
+
+    tarefa = esperar(fila.submeter("t:erro", falha))
+    assert tarefa.estado == ERRO and str(tarefa.erro) == "falhou"
+
+    nova = esperar(fila.reenviar("t:erro", lambda tarefa: "ok"))
+    assert nova is not tarefa
+    assert (nova.estado, nova.resultado) == (CONCLUIDA, "ok")
+
+
+def test_tarefas_antigas_sao_descartadas(fila, monkeypatch):
+    monkeypatch.setattr(tarefas, "TAREFAS_RETENCAO_MINUTOS", 1)
+    antiga = esperar(fila.submeter("t:antiga", lambda tarefa: 1))
+    recente = esperar(fila.submeter("t:recente", lambda tarefa: 2))
+    antiga.terminada_em -= 120
+
+    fila.submeter("t:outra", lambda tarefa: 3)
+    assert fila.obter("t:antiga") is None
+    assert fila.obter("t:recente") is recente
+    assert fila.submeter("t:antiga", lambda tarefa: 4) is not antiga
+
+
+def test_cancelar_so_quando_nenhuma_sessao_espera():
+    tarefa = Tarefa("t")
+    tarefa.registrar_sessao("a")
+    tarefa.registrar_sessao("b")
+
+    assert not tarefa.cancelar("a")
+    # A sessão que desistiu não volta a contar ao pedir a tarefa de novo
+    tarefa.registrar_sessao("a")
+    assert tarefa.cancelar("b")
+    assert tarefa.cancelada
+    with pytest.raises(TarefaCancelada):
+        tarefa.verificar_cancelamento()
+
+
+def test_tarefa_cancelada_antes_de_comecar(fila):
+    liberar = threading.Event()
+    ocupadas = [fila.submeter(f"t:ocupada{i}", lambda tarefa: liberar.wait(5)) for i in range(2)]
+    chamadas = []
+    tarefa = fila.submeter("t:na-fila", lambda tarefa: chamadas.append(1))
+    assert tarefa.cancelar("sessao")
+    liberar.set()
+
+    assert esperar(tarefa).estado == CANCELADA
+    assert chamadas == []
+    for ocupada in ocupadas:
+        esperar(ocupada)
+
+
+def test_progresso_avanca_com_os_itens():
+    tarefa = Tarefa("t")
+    vistos = []
+
+    def funcao(item):
+        vistos.append(tarefa.progresso)
+        return item
+
+    assert mapear_sob_demanda(funcao, range(4), 1, tarefa, total=4, ate=0.8) == [0, 1, 2, 3]
+    assert tarefa.progresso == pytest.approx(0.8)
+    assert vistos == sorted(vistos) and vistos[-1] < 0.8
@@ -0,0 +1,45 @@
+from conftest import codificacao_bytes
+from utils.tokens import _posicoes, _tamanhos_tokens, contar_tokens, tokenizar
+
+
+def test_tamanhos_tokens_em_bytes():
+    enc = codificacao_bytes(juncoes=["ç", "ã", "ão"])
+    tamanhos = _tamanhos_tokens(enc)
+    assert len(tamanhos) == enc.n_vocab
+    assert tamanhos[ord("a")] == 1
+    assert tamanhos[enc.encode_single_token("ç".encode())] == 2
+    assert tamanhos[enc.encode_single_token("ão".encode())] == 3
+
+
+def test_posicoes_com_caracteres_multibyte():
+    enc = codificacao_bytes(juncoes=["ç", "ã", "ão"])
+    texto = "ação e maçã"
+    ids = enc.encode(texto)
+    posicoes = _posicoes(texto, ids, enc)
+
+    assert len(posicoes) == len(ids)
+    assert posicoes == sorted(posicoes)
+    # Os tokens juntados começam no próprio caractere
+    pedacos = [enc.decode_single_token_bytes(i) for i in ids]
+    assert posicoes[pedacos.index("ç".encode())] == texto.index("ç")
+    assert posicoes[pedacos.index("ão".encode())] == texto.index("ão")
+    # Cortar nas posições remonta o texto
+    cortes = posicoes + [len(texto)]
+    assert "".join(texto[a:b] for a, b in zip(cortes, cortes[1:])) == texto
+
+
+def test_token_no_meio_do_caractere_fica_com_o_seguinte():
+    enc = codificacao_bytes()
+    texto = "aéb"
+    ids = enc.encode(texto)    # "é" vira dois tokens de um byte
+    assert len(ids) == 4
+    assert _posicoes(texto, ids, enc) == [0, 1, 2, 2]
+
+
+def test_tokenizar_guarda_a_contagem(codificador):
+    texto = "prazo de 30 dias"
+    ids, posicoes = tokenizar(texto)
+    assert len(ids) == len(texto.encode())
+    assert posicoes == list(range(len(texto)))
+    assert contar_tokens(texto) == len(ids)
+    assert _posicoes("", [], codificador) == []
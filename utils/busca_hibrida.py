@@ -0,0 +1,199 @@
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+import numpy as np
+from utils.indice_vetorial import posicoes_filtradas, buscar_por_vetor
+from utils.config import (
+    CHAT_K, CHAT_CANDIDATOS, CHAT_RRF_K, CHAT_RERANK, CHAT_MMR_LAMBDA, CHAT_CROSS_ENCODER
+)
+
+# ----- BUSCA HÍBRIDA DO CHAT -----
+# A busca vetorial acha trechos com o mesmo sentido da pergunta, mas costuma
+# perder números exatos (cláusula 5.2, CNPJ, número do contrato, valores em
+# R$). Por isso cada pergunta também passa por um índice invertido em memória
+# (BM25) sobre os mesmos chunks; as duas listas de candidatos são fundidas
+# pela posição (Reciprocal Rank Fusion) e, opcionalmente, reordenadas por MMR
+# (relevância com diversidade) ou por um cross-encoder local.
+
+# Números com separadores (5.2, 1.234,56, 12.345.678/0001-90) ficam inteiros;
+# palavras com ao menos duas letras
+TERMOS = re.compile(r"\d+(?:[./,-]\d+)*|[a-z]{2,}")
+
+
+def termos_busca(texto):
+    """
+    Termos do texto para o BM25: minúsculas, sem acentos. Números com separadores
+    entram também só com os dígitos, para que "12.345.678/0001-90" e
+    "12345678000190" se encontrem.
+    """
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii").lower()
+    termos = []
+    for termo in TERMOS.findall(texto):
+        termos.append(termo)
+        if not termo.isalnum() and termo[0].isdigit():
+            termos.append(re.sub(r"\D", "", termo))
+    return termos
+
+
+class IndiceBM25:
+    """
+    Índice invertido em memória (BM25) dos chunks, identificados pelo id no docstore
+    do FAISS. Guarda também a posição de cada id no FAISS (atualizada por sincronizar_bm25).
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)   # termo -> {id: frequência}
+        self.tamanhos = {}                  # id -> quantidade de termos
+        self.total_termos = 0
+        self.posicoes = {}                  # id -> posição no FAISS
+
+    def adicionar(self, itens):
+        """Indexa os chunks (id, texto) informados."""
+        for doc_id, texto in itens:
+            contagem = Counter(termos_busca(texto))
+            for termo, frequencia in contagem.items():
+                self.postings[termo][doc_id] = frequencia
+            self.tamanhos[doc_id] = sum(contagem.values())
+            self.total_termos += self.tamanhos[doc_id]
+
+    def remover(self, ids):
+        """Tira do índice os chunks com os ids informados."""
+        ids = set(ids) & self.tamanhos.keys()
+        if not ids:
+            return
+        for termo in list(self.postings):
+            documentos = self.postings[termo]
+            for doc_id in ids & documentos.keys():
+                del documentos[doc_id]
+            if not documentos:
+                del self.postings[termo]
+        for doc_id in ids:
+            self.total_termos -= self.tamanhos.pop(doc_id)
+
+    def buscar(self, consulta, k, permitidos=None):
+        """Retorna os ids dos k chunks com maior pontuação BM25, só entre os permitidos (todos, se None)."""
+        total = len(self.tamanhos)
+        if not total:
+            return []
+        media = self.total_termos / total or 1.0
+        pontuacoes = defaultdict(float)
+        for termo in set(termos_busca(consulta)):
+            documentos = self.postings.get(termo)
+            if not documentos:
+                continue
+            idf = math.log(1 + (total - len(documentos) + 0.5) / (len(documentos) + 0.5))
+            for doc_id, frequencia in documentos.items():
+                if permitidos is not None and doc_id not in permitidos:
+                    continue
+                norma = self.k1 * (1 - self.b + self.b * self.tamanhos[doc_id] / media)
+                pontuacoes[doc_id] += idf * frequencia * (self.k1 + 1) / (frequencia + norma)
+        return sorted(pontuacoes, key=pontuacoes.get, reverse=True)[:k]
+
+
+def sincronizar_bm25(indice, bm25=None):
+    """
+    Deixa o índice BM25 com os mesmos chunks do índice FAISS (acrescenta os novos
+    e tira os removidos) e refaz o mapa de id para posição no FAISS, que muda
+    quando chunks são removidos. Retorna o índice BM25, criando-o se bm25 for None.
+    """
+    bm25 = bm25 or IndiceBM25()
+    ids_faiss = set(indice.index_to_docstore_id.values())
+    bm25.remover(bm25.tamanhos.keys() - ids_faiss)
+    bm25.adicionar(
+        (doc_id, indice.docstore.search(doc_id).page_content)
+        for doc_id in ids_faiss - bm25.tamanhos.keys()
+    )
+    bm25.posicoes = {doc_id: i for i, doc_id in indice.index_to_docstore_id.items()}
+    return bm25
+
+def fundir_rrf(listas, k=CHAT_RRF_K):
+    """
+    Funde listas ordenadas de ids pela soma de 1 / (k + posição) em cada lista.
+    Retorna [(id, pontuação)] da maior para a menor pontuação.
+    """
+    pontuacoes = defaultdict(float)
+    for lista in listas:
+        for posicao, doc_id in enumerate(lista, start=1):
+            pontuacoes[doc_id] += 1 / (k + posicao)
+    return sorted(pontuacoes.items(), key=lambda item: item[1], reverse=True)
+
+def reordenar_mmr(relevancia, vetores, k, lambda_=CHAT_MMR_LAMBDA):
+    """
+    Maximal Marginal Relevance: escolhe, um a um, o candidato mais relevante e
+    menos parecido (cosseno dos vetores) com os já escolhidos. relevancia vai de
+    0 a 1 por candidato. Retorna os índices escolhidos.
+    """
+    if not len(vetores):
+        return []
+    vetores = vetores / (np.linalg.norm(vetores, axis=1, keepdims=True) + 1e-10)
+    relevancia = np.asarray(relevancia, dtype=np.float32)
+    escolhidos = [int(np.argmax(relevancia))]
+    while len(escolhidos) < min(k, len(vetores)):
+        redundancia = (vetores @ vetores[escolhidos].T).max(axis=1)
+        pontuacao = lambda_ * relevancia - (1 - lambda_) * redundancia
+        pontuacao[escolhidos] = -np.inf
+        escolhidos.append(int(np.argmax(pontuacao)))
+    return escolhidos
+
+@lru_cache(maxsize=1)
+def _cross_encoder(nome):
+    """
+    Carrega o cross-encoder uma vez. Retorna None se não for possível (pacote
+    sentence-transformers ausente, modelo sem download, sem rede etc.), para
+    não tentar de novo a cada pergunta.
+    """
+    try:
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(nome)
+    except Exception:
+        return None
+
+def reordenar_cross_encoder(consulta, textos, k, modelo=CHAT_CROSS_ENCODER):
+    """
+    Reordena os textos pela pontuação de um cross-encoder local (pergunta e trecho
+    lidos juntos). Se o modelo não puder ser carregado ou falhar, mantém a ordem
+    recebida (a da fusão). Retorna os índices escolhidos.
+    """
+    cross_encoder = _cross_encoder(modelo)
+    if cross_encoder is not None:
+        try:
+            pontuacoes = cross_encoder.predict([(consulta, texto) for texto in textos])
+            return [int(i) for i in np.argsort(-np.asarray(pontuacoes))[:k]]
+        except Exception:
+            pass
+    return list(range(min(k, len(textos))))
+
+def buscar_hibrido(indice, bm25, consulta, k=CHAT_K, filtro=None, rerank=CHAT_RERANK, candidatos=CHAT_CANDIDATOS):
+    """
+    Retorna os k chunks mais relevantes para a consulta, combinando a busca vetorial
+    do FAISS com o BM25 (fusão RRF) e reordenando os candidatos fundidos conforme
+    rerank ("mmr", "cross-encoder" ou ""). filtro restringe as duas buscas a um
+    documento ou tipo (ver posicoes_filtradas). Sem bm25, usa só a busca vetorial.
+    """
+    posicoes = posicoes_filtradas(indice, filtro)
+    vetor = indice.embedding_function.embed_query(consulta)
+    ids_vetoriais = [indice.index_to_docstore_id[i] for i in buscar_por_vetor(indice, vetor, candidatos, posicoes)]
+
+    listas = [ids_vetoriais]
+    if bm25 is not None:
+        permitidos = None if posicoes is None else {indice.index_to_docstore_id[i] for i in posicoes}
+        listas.append(bm25.buscar(consulta, candidatos, permitidos))
+    fundidos = fundir_rrf(listas)
+    docs = [indice.docstore.search(doc_id) for doc_id, _ in fundidos]
+
+    if rerank == "mmr" and len(fundidos) > k:
+        # A relevância vem da fusão (e não só do vetor), para não descartar os achados exatos do BM25
+        posicao_por_id = (
+            bm25.posicoes if bm25 is not None
+            else {doc_id: i for i, doc_id in indice.index_to_docstore_id.items()}
+        )
+        vetores = np.vstack([indice.index.reconstruct(posicao_por_id[doc_id]) for doc_id, _ in fundidos])
+        relevancia = np.array([pontuacao for _, pontuacao in fundidos]) / fundidos[0][1]
+        docs = [docs[i] for i in reordenar_mmr(relevancia, vetores, k)]
+    elif rerank == "cross-encoder" and len(fundidos) > 1:
+        docs = [docs[i] for i in reordenar_cross_encoder(consulta, [doc.page_content for doc in docs], k)]
+    return docs[:k]
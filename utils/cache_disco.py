@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+
+
+class CacheDisco:
+    """
+    Armazenamento chave-valor persistente em SQLite, compartilhado entre sessões,
+    processos e reinícios do app. Os valores (bytes) são gravados comprimidos.
+    Quando o total passa de limite_bytes, remove as entradas usadas há mais tempo (LRU).
+    Se ttl (em segundos) for informado, entradas mais antigas que ele são descartadas.
+    """
+
+    def __init__(self, caminho, limite_bytes, ttl=None):
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with closing(self._conectar()) as con, con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    chave TEXT PRIMARY KEY,
+                    valor BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado REAL NOT NULL,
+                    acessado REAL NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_cache_acessado ON cache (acessado)")
+
+    def _conectar(self):
+        # Uma conexão por operação: seguro entre threads e processos
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    def obter(self, chave):
+        """Retorna o valor (bytes) da chave, ou None se não existir ou tiver expirado."""
+        agora = time.time()
+        with closing(self._conectar()) as con, con:
+            linha = con.execute("SELECT valor, criado FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                return None
+            valor, criado = linha
+            if self.ttl is not None and agora - criado > self.ttl:
+                con.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                return None
+            con.execute("UPDATE cache SET acessado = ? WHERE chave = ?", (agora, chave))
+        return zlib.decompress(valor)
+
+    def salvar(self, chave, valor):
+        """Grava o valor (bytes) na chave e aplica o limite de tamanho."""
+        comprimido = zlib.compress(valor)
+        agora = time.time()
+        with closing(self._conectar()) as con, con:
+            con.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, tamanho, criado, acessado) VALUES (?, ?, ?, ?, ?)",
+                (chave, comprimido, len(comprimido), agora, agora)
+            )
+            self._aplicar_limite(con)
+
+    def obter_varios(self, chaves):
+        """Retorna um dicionário {chave: valor} só com as chaves encontradas (e não expiradas)."""
+        agora = time.time()
+        encontrados = {}
+        with closing(self._conectar()) as con, con:
+            for inicio in range(0, len(chaves), 500):
+                lote = chaves[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(lote))
+                linhas = con.execute(
+                    f"SELECT chave, valor, criado FROM cache WHERE chave IN ({marcadores})", lote
+                ).fetchall()
+                for chave, valor, criado in linhas:
+                    if self.ttl is None or agora - criado <= self.ttl:
+                        encontrados[chave] = valor
+            con.executemany("UPDATE cache SET acessado = ? WHERE chave = ?", [(agora, c) for c in encontrados])
+        return {chave: zlib.decompress(valor) for chave, valor in encontrados.items()}
+
+    def salvar_varios(self, itens):
+        """Grava vários pares (chave, valor) em uma única transação."""
+        agora = time.time()
+        linhas = []
+        for chave, valor in itens:
+            comprimido = zlib.compress(valor)
+            linhas.append((chave, comprimido, len(comprimido), agora, agora))
+        with closing(self._conectar()) as con, con:
+            con.executemany(
+                "INSERT OR REPLACE INTO cache (chave, valor, tamanho, criado, acessado) VALUES (?, ?, ?, ?, ?)",
+                linhas
+            )
+            self._aplicar_limite(con)
+
+    def remover(self, chave):
+        """Remove a chave do cache, se existir."""
+        with closing(self._conectar()) as con, con:
+            con.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def _aplicar_limite(self, con):
+        total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        excedente = total - self.limite_bytes
+        removidas = []
+        for chave, tamanho in con.execute("SELECT chave, tamanho FROM cache ORDER BY acessado").fetchall():
+            removidas.append((chave,))
+            excedente -= tamanho
+            if excedente <= 0:
+                break
+        con.executemany("DELETE FROM cache WHERE chave = ?", removidas)
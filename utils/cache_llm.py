@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from utils.cache_disco import CacheDisco
+from utils.config import DIRETORIO_CACHE, LLM_CACHE_LIMITE_MB, LLM_CACHE_TTL_DIAS
+from prompts import PROMPTS_VERSAO
+
+# ----- CACHE DE RESPOSTAS DO MODELO -----
+# Respostas de chamadas de chat guardadas em disco, compartilhadas por todas as
+# sessões e processos do app. A chave é o hash do modelo, das mensagens, da
+# temperatura, do max_tokens e da versão dos prompts: a mesma chamada feita de
+# novo (ex.: reabrir um pacote já processado) não vai à API.
+
+cache_respostas = CacheDisco(
+    os.path.join(DIRETORIO_CACHE, "llm.sqlite3"),
+    limite_bytes=LLM_CACHE_LIMITE_MB * 1024 * 1024,
+    ttl=LLM_CACHE_TTL_DIAS * 24 * 3600 if LLM_CACHE_TTL_DIAS else None
+)
+
+
+def chave_chamada(modelo, mensagens, temperature, max_tokens):
+    """Hash que identifica uma chamada de chat pelos seus parâmetros."""
+    conteudo = json.dumps(
+        {"modelo": modelo, "mensagens": mensagens, "temperature": temperature,
+         "max_tokens": max_tokens, "versao": PROMPTS_VERSAO},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def completar_com_cache(client, mensagens, modelo, temperature, max_tokens=None):
+    """Faz a chamada de chat (ou devolve a resposta guardada) e retorna o texto da resposta."""
+    chave = chave_chamada(modelo, mensagens, temperature, max_tokens)
+    guardada = cache_respostas.obter(chave)
+    if guardada is not None:
+        return guardada.decode("utf-8")
+
+    parametros = {"max_tokens": max_tokens} if max_tokens is not None else {}
+    resposta = client.chat.completions.create(
+        model=modelo,
+        messages=mensagens,
+        temperature=temperature,
+        **parametros
+    )
+    texto = resposta.choices[0].message.content.strip()
+    cache_respostas.salvar(chave, texto.encode("utf-8"))
+    return texto
+
+def completar_em_stream_com_cache(client, mensagens, modelo, temperature, max_tokens=None):
+    """
+    Igual a completar_com_cache, mas gera os pedaços da resposta à medida que
+    chegam. Uma resposta guardada é devolvida de uma vez, em um único pedaço.
+    A resposta só vai para o cache se o streaming chegar ao fim.
+    """
+    chave = chave_chamada(modelo, mensagens, temperature, max_tokens)
+    guardada = cache_respostas.obter(chave)
+    if guardada is not None:
+        yield guardada.decode("utf-8")
+        return
+
+    parametros = {"max_tokens": max_tokens} if max_tokens is not None else {}
+    resposta = client.chat.completions.create(
+        model=modelo,
+        messages=mensagens,
+        temperature=temperature,
+        stream=True,
+        **parametros
+    )
+    pedacos = []
+    for evento in resposta:
+        if evento.choices and evento.choices[0].delta.content:
+            pedacos.append(evento.choices[0].delta.content)
+            yield evento.choices[0].delta.content
+    cache_respostas.salvar(chave, "".join(pedacos).strip().encode("utf-8"))
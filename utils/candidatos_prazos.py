@@ -0,0 +1,99 @@
+import re
+from utils.config import PRAZOS_JANELA_CARACTERES
+
+# ----- PRÉ-EXTRAÇÃO DE PRAZOS POR REGRAS -----
+# Encontra no texto os trechos que podem conter prazos (datas e períodos no
+# formato usado em documentos brasileiros). Só as janelas em volta desses
+# trechos vão para o modelo; linhas simples como "Assinatura: 22/03/2023"
+# são resolvidas aqui mesmo, sem chamada à API.
+
+# Incrementar sempre que as regras mudarem, para invalidar os prazos já gravados
+CANDIDATOS_VERSAO = "1"
+
+MESES = "janeiro|fevereiro|março|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro"
+
+# 22/03/2023, 22.03.23, 22-03-2023 (sem confundir com valores como 11.112,12)
+DATA_NUMERICA = r"(?<![\d/.,])(?:0?[1-9]|[12]\d|3[01])([/.-])(?:0?[1-9]|1[0-2])\1(?:\d{4}|\d{2})(?![\d/]|[.,]\d)"
+
+# 22 de março de 2023, 1º de abril de 2024
+DATA_EXTENSO = rf"\b(?:0?[1-9]|[12]\d|3[01])[º°]?\s+de\s+(?:{MESES})\s+de\s+\d{{4}}\b"
+
+# 30 (trinta) dias úteis, 12 meses, 5 anos, 48 horas, 10º dia útil
+PERIODO = (
+    r"\b\d{1,4}\s*(?:\([^)\n]{1,40}\)\s*)?(?:dias?|meses|m[eê]s|anos?|semanas?|horas?)\b"
+    r"(?:\s+(?:úteis|uteis|corridos|consecutivos))?"
+    r"|\b\d{1,2}[º°]\s+dia\s+[úu]til\b"
+)
+
+# Expressões que indicam prazo mesmo sem número no mesmo trecho
+EXPRESSOES = (
+    r"\bprazos?\s+de\s+(?:vig[eê]ncia|execu[cç][aã]o|entrega|validade|garantia|pagamento)\b"
+    r"|\bdata[- ]limite\b|\bvencimento\b"
+)
+
+CANDIDATOS = re.compile(
+    rf"{DATA_NUMERICA}|{DATA_EXTENSO}|{PERIODO}|{EXPRESSOES}",
+    re.IGNORECASE
+)
+
+VALOR_SIMPLES = (
+    r"(?:(?:até|em|no prazo de)\s+)?(?:"
+    + DATA_NUMERICA.replace("\\1", "(?P=sep)").replace("([/.-])", "(?P<sep>[/.-])")
+    + rf"|{DATA_EXTENSO}|{PERIODO})"
+)
+
+# Linha com um rótulo e só uma data ou período, como "Prazo de vigência: 12 (doze) meses"
+LINHA_SIMPLES = re.compile(
+    rf"^[ \t\-•–]*(?P<rotulo>[^\W\d_][^:\n\d]{{2,80}}?)[ \t]*:[ \t]*(?P<valor>{VALOR_SIMPLES})[ \t]*[.;]?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def encontrar_candidatos(texto):
+    """Retorna as posições (início, fim) dos trechos que podem conter prazos."""
+    return [m.span() for m in CANDIDATOS.finditer(texto)]
+
+def resolver_linhas_simples(texto):
+    """
+    Resolve localmente as linhas com rótulo e uma única data ou período.
+    Retorna (prazos no formato "Evento: prazo", posições das linhas resolvidas).
+    """
+    prazos, posicoes = [], []
+    for m in LINHA_SIMPLES.finditer(texto):
+        prazos.append(f"{m.group('rotulo').strip()}: {m.group('valor').strip()}")
+        posicoes.append(m.span())
+    return prazos, posicoes
+
+def _juntar_janelas(posicoes, tamanho_texto, janela):
+    """Amplia cada posição em janela caracteres para os dois lados e junta as sobrepostas."""
+    janelas = []
+    for inicio, fim in sorted(posicoes):
+        inicio, fim = max(0, inicio - janela), min(tamanho_texto, fim + janela)
+        if janelas and inicio <= janelas[-1][1]:
+            janelas[-1][1] = max(janelas[-1][1], fim)
+        else:
+            janelas.append([inicio, fim])
+    return janelas
+
+def pre_extrair_prazos(paginas, janela=PRAZOS_JANELA_CARACTERES):
+    """
+    Percorre as páginas (página, texto) procurando candidatos a prazo.
+    Retorna (prazos resolvidos localmente, trechos para o modelo), onde os trechos
+    são (página, texto) só com as janelas em volta dos candidatos não resolvidos.
+    Sem candidatos, a lista de trechos fica vazia e o modelo não precisa ser chamado.
+    """
+    prazos, trechos = [], []
+    for pagina, texto in paginas:
+        resolvidos, linhas = resolver_linhas_simples(texto)
+        prazos.extend(resolvidos)
+
+        posicoes = [
+            (inicio, fim) for inicio, fim in encontrar_candidatos(texto)
+            if not any(li <= inicio and fim <= lf for li, lf in linhas)
+        ]
+        if not posicoes:
+            continue
+
+        janelas = _juntar_janelas(posicoes, len(texto), janela)
+        trechos.append((pagina, "\n[...]\n".join(texto[inicio:fim].strip() for inicio, fim in janelas) + "\n"))
+    return prazos, trechos
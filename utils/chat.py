@@ -1,33 +1,114 @@
 import streamlit as st
-from utils.extrair_texto import extrair_texto
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.chat_models import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document as LCDocument
-from io import BytesIO
-
-def criar_chain(textos):
+import asyncio
+from utils.indice_vetorial import (
+    obter_indice_documento, mesclar_indices, adicionar_ao_indice, remover_do_indice, definir_tipos,
+    aceita_remocao, otimizar_indice
+)
+from utils.busca_hibrida import sincronizar_bm25, buscar_hibrido
+from utils.embeddings import EmbeddingsComCache
+from utils.cliente_openai import criar_cliente_openai_async, iterar_no_loop
+from utils.tarefas import fila_tarefas, desenhar_com_atualizacao, CONCLUIDA
+from utils.config import CHAT_PULAR_CONDENSACAO_SEM_HISTORICO
+from prompts import PROMPT_CHAT_CONDENSAR, PROMPT_CHAT_RESPOSTA
+
+def indexar_documento_tarefa(tarefa, conteudo, nome):
     """
-    Cria um ConversationalRetrievalChain a partir de uma lista de textos.
-    Divide textos em chunks, cria embeddings e indexa em FAISS para buscas.
+    Tarefa em segundo plano que gera o índice de um documento e o salva em
+    disco (se ainda não estiver lá). Retorna as estatísticas de embeddings.
     """
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-    chunks = text_splitter.split_text("\n\n".join(textos))
-    docs = [LCDocument(page_content=chunk) for chunk in chunks]
-    embeddings = OpenAIEmbeddings()
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-    llm = ChatOpenAI(temperature=0.3)
-    return ConversationalRetrievalChain.from_llm(llm=llm, retriever=retriever)
-
-def mostrar_baloes(chat_history):
+    tarefa.verificar_cancelamento()
+    embeddings = EmbeddingsComCache(tarefa=tarefa)
+    obter_indice_documento(conteudo, nome, embeddings)
+    return embeddings.estatisticas
+
+def sincronizar_indice_todos(arquivos, embeddings=None, tipos_por_hash=None):
     """
-    Renderiza as mensagens da conversa em balões estilizados, separando pergunta e resposta.
+    Mantém na sessão o índice único do chat igual à lista de arquivos enviados.
+    Só os documentos adicionados ou removidos desde a última vez são processados.
+    Cada chunk tem nos metadados o documento, o hash, a página e o tipo
+    (tipos_por_hash, da classificação confirmada), usados para filtrar as buscas.
+    O índice BM25 da busca híbrida (st.session_state.indice_todos_bm25) acompanha o FAISS.
     """
-    for pergunta, resposta in chat_history:
-        st.markdown(f"""
+    tipos_por_hash = tipos_por_hash or {}
+    hashes_atuais = {f["hash"]: f for f in arquivos}
+    hashes_indice = st.session_state.get("indice_todos_hashes", set())
+    indice = st.session_state.get("indice_todos")
+
+    removidos = hashes_indice - hashes_atuais.keys()
+    novos = [f for doc_hash, f in hashes_atuais.items() if doc_hash not in hashes_indice]
+    if not removidos and not novos and indice is not None:
+        if st.session_state.get("indice_todos_tipos") != tipos_por_hash:
+            definir_tipos(indice, tipos_por_hash)
+            st.session_state.indice_todos_tipos = tipos_por_hash
+        return indice
+
+    if indice is not None and removidos:
+        if aceita_remocao(indice):
+            remover_do_indice(indice, removidos)
+        else:
+            # Índice treinado: é montado de novo com os documentos que ficaram (lidos do disco)
+            indice, novos = None, list(hashes_atuais.values())
+
+    if novos:
+        embeddings = embeddings or EmbeddingsComCache()
+        indices = [obter_indice_documento(f["content"], f["name"], embeddings) for f in novos]
+        indices = [i for i in indices if i is not None]
+        if indice is None and indices:
+            indice = mesclar_indices(indices, embeddings)
+        elif indices:
+            adicionar_ao_indice(indice, indices)
+            otimizar_indice(indice)
+
+    if indice is None:
+        raise ValueError("Nenhum texto foi extraído dos documentos enviados.")
+
+    definir_tipos(indice, tipos_por_hash)
+    st.session_state.indice_todos_bm25 = sincronizar_bm25(indice, st.session_state.get("indice_todos_bm25"))
+    st.session_state.indice_todos = indice
+    st.session_state.indice_todos_hashes = set(hashes_atuais)
+    st.session_state.indice_todos_tipos = tipos_por_hash
+    return indice
+
+async def responder_em_stream(vectorstore, pergunta, chat_history, modelo="gpt-3.5-turbo",
+                              pular_condensacao=CHAT_PULAR_CONDENSACAO_SEM_HISTORICO, filtro=None, bm25=None):
+    """
+    Responde a uma pergunta sobre os documentos, devolvendo a resposta em pedaços
+    à medida que é gerada. Com histórico, a pergunta é antes reescrita como uma
+    pergunta independente; sem histórico, essa etapa é pulada se pular_condensacao.
+    Os trechos vêm da busca híbrida (vetorial + BM25, ver buscar_hibrido);
+    filtro restringe a busca a um documento ou tipo.
+    """
+    client = criar_cliente_openai_async()
+
+    pergunta_busca = pergunta
+    if chat_history or not pular_condensacao:
+        historico = "\n".join(f"Usuário: {p}\nAssistente: {r}" for p, r in chat_history)
+        resposta = await client.chat.completions.create(
+            model=modelo,
+            messages=[{"role": "user", "content": PROMPT_CHAT_CONDENSAR.format(historico=historico, pergunta=pergunta)}],
+            temperature=0
+        )
+        pergunta_busca = resposta.choices[0].message.content.strip()
+
+    docs = await asyncio.to_thread(buscar_hibrido, vectorstore, bm25, pergunta_busca, filtro=filtro)
+    contexto = "\n\n".join(
+        f"[{doc.metadata.get('documento', '')}, p. {doc.metadata.get('pagina', '?')}]\n{doc.page_content}"
+        for doc in docs
+    )
+
+    stream = await client.chat.completions.create(
+        model=modelo,
+        messages=[{"role": "user", "content": PROMPT_CHAT_RESPOSTA.format(contexto=contexto, pergunta=pergunta_busca)}],
+        temperature=0.3,
+        stream=True
+    )
+    async for evento in stream:
+        if evento.choices and evento.choices[0].delta.content:
+            yield evento.choices[0].delta.content
+
+def balao_pergunta(pergunta):
+    """Retorna o HTML do balão de pergunta (à direita)."""
+    return f"""
         <div style='text-align: right; margin: 8px 0;'>
             <span style='
                 background-color: #DCF8C6;
@@ -41,9 +122,11 @@ def mostrar_baloes(chat_history):
                 box-shadow: 1px 1px 2px #aaa;
             '>{pergunta}</span>
         </div>
-        """, unsafe_allow_html=True)
+        """
 
-        st.markdown(f"""
+def balao_resposta(resposta):
+    """Retorna o HTML do balão de resposta (à esquerda)."""
+    return f"""
         <div style='text-align: left; margin: 8px 0;'>
             <span style='
                 background-color: #FFF;
@@ -57,7 +140,36 @@ def mostrar_baloes(chat_history):
                 box-shadow: 1px 1px 2px #aaa;
             '>{resposta}</span>
         </div>
-        """, unsafe_allow_html=True)
+        """
+
+def mostrar_baloes(chat_history, pergunta_nova=None, vectorstore=None, filtro=None, bm25=None):
+    """
+    Renderiza as mensagens da conversa em balões estilizados, separando pergunta e resposta.
+    Se pergunta_nova for informada, transmite a resposta no último balão à medida
+    que é gerada, adiciona o par ao histórico e retorna a resposta completa.
+    """
+    for pergunta, resposta in chat_history:
+        st.markdown(balao_pergunta(pergunta), unsafe_allow_html=True)
+        st.markdown(balao_resposta(resposta), unsafe_allow_html=True)
+
+    resposta_nova = None
+    if pergunta_nova:
+        st.markdown(balao_pergunta(pergunta_nova), unsafe_allow_html=True)
+        espaco = st.empty()
+        espaco.markdown(balao_resposta("🔎 Buscando resposta..."), unsafe_allow_html=True)
+
+        # A resposta é gerada no event loop de fundo (cliente e conexões reaproveitados);
+        # os pedaços chegam aqui, na thread da página, que atualiza o balão
+        resposta_nova = ""
+        pedacos = iterar_no_loop(
+            responder_em_stream(vectorstore, pergunta_nova, chat_history, filtro=filtro, bm25=bm25)
+        )
+        for pedaco in pedacos:
+            resposta_nova += pedaco
+            espaco.markdown(balao_resposta(resposta_nova + " ▌"), unsafe_allow_html=True)
+        espaco.markdown(balao_resposta(resposta_nova), unsafe_allow_html=True)
+        chat_history.append((pergunta_nova, resposta_nova))
+
     st.markdown("<div id='end_chat'></div>", unsafe_allow_html=True)
     st.markdown("""
         <script>
@@ -67,10 +179,12 @@ def mostrar_baloes(chat_history):
             }
         </script>
     """, unsafe_allow_html=True)
+    return resposta_nova
 
 def mostrar_chat():
     """
-    Exibe a interface do chat que permite perguntas sobre todos os documentos ou um documento específico.
+    Exibe a interface do chat que permite perguntas sobre todos os documentos, um documento
+    específico ou um tipo de documento, todas atendidas pelo mesmo índice (com filtros).
     Gerencia o estado da conversa e da interface usando st.session_state.
     """
     st.markdown("""
@@ -103,12 +217,55 @@ def mostrar_chat():
         st.session_state.input_todos = ""
         st.session_state.limpar_input_todos = False
 
-    # Cria chain para todos os documentos, só uma vez, e guarda na sessão
-    if "chain_todos" not in st.session_state:
-        textos_todos = [extrair_texto(BytesIO(f["content"]), f["name"]) for f in arquivos]
-        st.session_state.chain_todos = criar_chain(textos_todos)
+    # Os índices dos documentos novos são gerados em tarefas em segundo plano;
+    # a página acompanha o andamento e só monta o chat quando todos estão prontos
+    hashes_indice = st.session_state.get("indice_todos_hashes", set())
+    fila = fila_tarefas()
+    tarefas = {
+        f["hash"]: fila.submeter(f"indice:{f['hash']}", indexar_documento_tarefa, f["content"], f["name"],
+                                 descricao=f"Índice de {f['name']}")
+        for f in arquivos if f["hash"] not in hashes_indice
+    }
+    if not all(t.terminou for t in tarefas.values()):
+        def desenhar():
+            concluidos = sum(t.terminou for t in tarefas.values())
+            st.progress(concluidos / len(tarefas), text=f"Indexando documentos... ({concluidos}/{len(tarefas)})")
+            return concluidos < len(tarefas)
 
-    chain_todos = st.session_state.chain_todos
+        desenhar_com_atualizacao(desenhar, True)
+        return
+
+    # Documentos cuja indexação falhou ficam de fora até o usuário tentar de novo
+    falhas = {doc_hash for doc_hash, t in tarefas.items() if t.estado != CONCLUIDA}
+    for f in arquivos:
+        if f["hash"] in falhas:
+            tarefa = tarefas[f["hash"]]
+            st.warning(f"Não foi possível indexar **{f['name']}**: {tarefa.erro or 'cancelado'}")
+            if st.button("Tentar novamente", key=f"repetir_{tarefa.id}"):
+                fila.reenviar(tarefa.id, indexar_documento_tarefa, f["content"], f["name"], descricao=tarefa.descricao)
+                st.rerun()
+    indexados = [f for f in arquivos if f["hash"] not in falhas]
+    if not indexados:
+        return
+
+    # Um único índice na sessão, atualizado só no que mudou, atende às perguntas
+    # sobre todos os documentos, sobre um documento e sobre um tipo (por filtro)
+    tipos_por_hash = {
+        doc["hash"]: tipo
+        for tipo, docs in st.session_state.get("classificacao_final", {}).items()
+        for doc in docs if doc.get("hash")
+    }
+    embeddings = EmbeddingsComCache()
+    indice_todos = sincronizar_indice_todos(indexados, embeddings, tipos_por_hash)
+    est = {"acertos": 0, "faltas": 0, "tokens": 0}
+    for tarefa in tarefas.values():
+        for chave, valor in (tarefa.resultado or {}).items():
+            est[chave] += valor
+    if est["acertos"] or est["faltas"]:
+        st.caption(
+            f"Embeddings: {est['acertos']} chunk(s) em cache, {est['faltas']} gerado(s), "
+            f"{est['tokens']} token(s) enviados."
+        )
 
     st.markdown("### 📄 Pergunte algo sobre todos os documentos:")
 
@@ -125,17 +282,10 @@ def mostrar_chat():
             st.session_state.limpar_input_todos = True
             st.rerun()
 
+    bm25 = st.session_state.get("indice_todos_bm25")
+    mostrar_baloes(st.session_state.chat_todos, pergunta_todos, indice_todos, bm25=bm25)
     if pergunta_todos:
-        with st.spinner("🔎 Buscando resposta..."):
-            result = chain_todos({
-                "question": pergunta_todos,
-                "chat_history": st.session_state.chat_todos
-            })
-            resposta = result["answer"]
-            st.session_state.chat_todos.append((pergunta_todos, resposta))
-            st.session_state.limpar_input_todos = True
-
-    mostrar_baloes(st.session_state.chat_todos)
+        st.session_state.limpar_input_todos = True
 
     # -------------------------------
     # CHAT COM UM DOCUMENTO ESPECÍFICO
@@ -146,52 +296,64 @@ def mostrar_chat():
     doc_escolhido = st.selectbox("", nomes, key="doc_escolhido")
 
     if doc_escolhido:
-        key_chat = f"chat_{doc_escolhido}"
-        key_input = f"input_individual_{doc_escolhido}"
-        key_limpar = f"limpar_individual_{doc_escolhido}"
-        key_flag_limpar = f"limpar_input_{doc_escolhido}"
-        key_chain_individual = f"chain_{doc_escolhido}"
+        doc_hash = next(f["hash"] for f in arquivos if f["name"] == doc_escolhido)
+        mostrar_conversa(
+            doc_escolhido,
+            "Exemplos:\n1) Quais são as atividades presentes na proposta?; Esse termo aditivo mudou o prazo do contrato?",
+            f"Digite abaixo uma pergunta sobre {doc_escolhido}",
+            indice_todos,
+            {"hash": {doc_hash}},
+            bm25
+        )
 
-        if key_chat not in st.session_state:
-            st.session_state[key_chat] = []
+    # -------------------------------
+    # CHAT COM UM TIPO DE DOCUMENTO
+    # -------------------------------
 
-        if key_flag_limpar not in st.session_state:
-            st.session_state[key_flag_limpar] = False
+    tipos = sorted({tipo for tipo in tipos_por_hash.values() if tipo})
+    if tipos:
+        st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
+        st.markdown("### 📂 Pergunte algo sobre um tipo de documento:")
+        tipo_escolhido = st.selectbox("", tipos, key="tipo_escolhido")
+        if tipo_escolhido:
+            mostrar_conversa(
+                f"tipo_{tipo_escolhido}",
+                "Exemplos:\n1) Quais valores aparecem nos contratos?; Quais prazos os termos aditivos alteraram?",
+                f"Digite abaixo uma pergunta sobre os documentos do tipo {tipo_escolhido}",
+                indice_todos,
+                {"tipo": {tipo_escolhido}},
+                bm25
+            )
 
-        if st.session_state[key_flag_limpar]:
-            st.session_state[key_input] = ""
-            st.session_state[key_flag_limpar] = False
+def mostrar_conversa(chave, exemplos, ajuda, indice, filtro, bm25=None):
+    """
+    Mostra uma conversa (campo de pergunta, botão de limpar e balões) restrita aos
+    chunks do índice único que batem com o filtro. O histórico fica na sessão, por chave.
+    """
+    key_chat = f"chat_{chave}"
+    key_input = f"input_individual_{chave}"
+    key_limpar = f"limpar_individual_{chave}"
+    key_flag_limpar = f"limpar_input_{chave}"
 
-        # Cria chain individual do documento escolhido, só uma vez e guarda na sessão
-        if key_chain_individual not in st.session_state:
-            file_data = next(f for f in arquivos if f["name"] == doc_escolhido)
-            file_obj = BytesIO(file_data["content"])
-            texto = extrair_texto(file_obj, file_data["name"])
-            st.session_state[key_chain_individual] = criar_chain([texto])
+    if key_chat not in st.session_state:
+        st.session_state[key_chat] = []
 
-        chain_individual = st.session_state[key_chain_individual]
+    if key_flag_limpar not in st.session_state:
+        st.session_state[key_flag_limpar] = False
 
-        col1, col2 = st.columns([8, 1])
-        with col1:
-            pergunta_individual = st.text_input(
-                "Exemplos:\n1) Quais são as atividades presentes na proposta?; Esse termo aditivo mudou o prazo do contrato?",
-                key=key_input,
-                help=f"Digite abaixo uma pergunta sobre {doc_escolhido}"
-            )
-        with col2:
-            if st.button("Limpar conversa", key=key_limpar):
-                st.session_state[key_chat] = []
-                st.session_state[key_flag_limpar] = True
-                st.rerun()
+    if st.session_state[key_flag_limpar]:
+        st.session_state[key_input] = ""
+        st.session_state[key_flag_limpar] = False
+
+    col1, col2 = st.columns([8, 1])
+    with col1:
+        pergunta = st.text_input(exemplos, key=key_input, help=ajuda)
+    with col2:
+        if st.button("Limpar conversa", key=key_limpar):
+            st.session_state[key_chat] = []
+            st.session_state[key_flag_limpar] = True
+            st.rerun()
 
-        if pergunta_individual:
-            with st.spinner("🔎 Buscando resposta..."):
-                result = chain_individual({
-                    "question": pergunta_individual,
-                    "chat_history": st.session_state[key_chat]
-                })
-                resposta = result["answer"]
-                st.session_state[key_chat].append((pergunta_individual, resposta))
-                st.session_state[key_flag_limpar] = True
-
-        mostrar_baloes(st.session_state[key_chat])
\ No newline at end of file
+    mostrar_baloes(st.session_state[key_chat], pergunta, indice, filtro, bm25)
+    if pergunta:
+        st.session_state[key_flag_limpar] = True
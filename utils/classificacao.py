@@ -0,0 +1,157 @@
+import re
+import unicodedata
+from io import BytesIO
+from utils.extrair_texto import extrair_texto
+from utils.config import (
+    CLASSIFICACAO_TIMEOUT, CLASSIFICACAO_LOCAL, CLASSIFICACAO_CONFIANCA_LOCAL, ROTULOS_EXEMPLOS_PROMPT
+)
+from utils.cliente_openai import criar_cliente_openai
+from utils.cache_llm import completar_com_cache
+from utils.classificador_local import classificar_localmente
+from utils.rotulos import buscar_rotulo, tipo_do_padrao, listar_correcoes
+from utils.ingestao_zip import caminho_no_zip
+
+# ----- CLASSIFICAÇÃO DE DOCUMENTOS -----
+# Núcleo sem interface, usado pelas páginas (utils.classificar) e pelo
+# processamento em lote. Rótulos já confirmados, títulos inconfundíveis e o
+# classificador local resolvem a maior parte dos documentos sem a API.
+
+
+def normalizar_texto(texto: str, manter_linhas: bool = False) -> str:
+    texto = ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    )
+    if manter_linhas:
+        # Mantém uma quebra entre as linhas (as regras de título procuram o início da linha)
+        texto = re.sub(r'[^\S\n]*\n\s*', '\n', re.sub(r'[^\S\n]+', ' ', texto))
+    else:
+        texto = re.sub(r'\s+', ' ', texto)
+    return texto.lower().strip()
+
+def eh_parte_de_edital(nome_arquivo: str) -> bool:
+    # Só o caminho dentro do zip conta: o nome do próprio zip (ex.: "edital_12.zip")
+    # vale para todos os documentos dele, inclusive contratos e propostas
+    nome_norm = normalizar_texto(caminho_no_zip(nome_arquivo))
+    palavras_chave = [
+        "edital", "licit", "instrucoes", "instruc", "lista de requerimentos",
+        "criterio", "formulario", "modelo de acordo", "secao", "condicoes gerais",
+        "questionario"
+    ]
+    return any(palavra in nome_norm for palavra in palavras_chave)
+
+def normalizar_tipo_documento(tipo: str, nome_arquivo: str = None) -> str:
+    tipo_lower = normalizar_texto(tipo)
+    
+    if "edital de licitacao" in tipo_lower or (nome_arquivo and eh_parte_de_edital(nome_arquivo)):
+        return "Edital de Licitação"
+    
+    # Chaves sem acentos, como tipo_lower
+    mapeamento = {
+        "contrato": "Contrato",
+        "termo aditivo": "Termo Aditivo",
+        "relatorio": "Relatório",
+        "oficio": "Ofício",
+        "ata": "Ata",
+        "proposta": "Proposta",
+        "minuta": "Minuta",
+        "termo de apostilamento": "Termo de Apostilamento",
+        "termo de referencia": "Termo de Referência",
+    }
+    
+    for chave, valor in mapeamento.items():
+        if chave in tipo_lower:
+            return valor
+
+    return "Outro"
+
+def classificar_documento(nome_arquivo: str, conteudo_texto: str = None, client=None,
+                          classificacao_local=None, timeout=None) -> str:
+    """
+    Classifica um documento pelo conteúdo (ou pelo nome, sem texto).
+    O cliente OpenAI só é criado (se não for informado) quando a API é de fato
+    chamada; o timeout, se informado, vale para essa requisição.
+    """
+    if eh_parte_de_edital(nome_arquivo):
+        return "Edital de Licitação"
+
+    # Títulos inconfundíveis e documentos parecidos com os já confirmados dispensam a API
+    # (classificacao_local, se informada, é o resultado de classificar_localmente já calculado)
+    if CLASSIFICACAO_LOCAL and conteudo_texto:
+        tipo_local, confianca = classificacao_local or classificar_localmente(
+            normalizar_texto(conteudo_texto[:4000], manter_linhas=True)
+        )
+        if tipo_local and confianca >= CLASSIFICACAO_CONFIANCA_LOCAL:
+            return tipo_local
+    
+    tipos_validos = [
+        "Contrato", "Termo Aditivo", "Relatório", "Ofício", "Ata", "Proposta", "Minuta",
+        "Termo de Apostilamento", "Edital de Licitação", "Termo de Referência"
+    ]
+
+    # Correções feitas pelos usuários entram como exemplos
+    correcoes = listar_correcoes(ROTULOS_EXEMPLOS_PROMPT) if ROTULOS_EXEMPLOS_PROMPT else []
+    exemplos = ""
+    if correcoes:
+        exemplos = "\nExemplos de classificações corrigidas pelos usuários:\n" + "\n".join(
+            f"- Arquivo '{nome}' (início: \"{texto[:300]}\"): {tipo}" for nome, texto, tipo in correcoes
+        ) + "\n"
+
+    if conteudo_texto and conteudo_texto.strip():
+        prompt = f"""
+Classifique o documento com base no conteúdo abaixo.
+
+Lista oficial: {", ".join(tipos_validos)}
+{exemplos}
+Conteúdo:
+\"\"\"{conteudo_texto[:4000]}\"\"\"
+"""
+    else:
+        prompt = f"""
+Classifique o documento com base apenas no nome do arquivo.
+
+Lista oficial: {", ".join(tipos_validos)}
+{exemplos}
+Nome do arquivo: '{caminho_no_zip(nome_arquivo)}'
+"""
+
+    client = client or criar_cliente_openai()
+    if timeout is not None:
+        client = client.with_options(timeout=timeout)
+    tipo_cru_raw = completar_com_cache(
+        client, [{"role": "user", "content": prompt}], "gpt-4o-mini", temperature=0, max_tokens=30
+    )
+    tipo_normalizado = normalizar_tipo_documento(tipo_cru_raw, nome_arquivo)
+
+    if tipo_normalizado == "Outro" and tipo_cru_raw.lower() not in [t.lower() for t in tipos_validos]:
+        return tipo_cru_raw.title()
+
+    return tipo_normalizado
+
+def extrair_e_classificar(arq, client=None, timeout=CLASSIFICACAO_TIMEOUT, tarefa=None):
+    """
+    Extrai o texto de um arquivo enviado e classifica o documento.
+    Documentos já confirmados (mesmo hash) usam o tipo guardado, sem extração nem
+    chamada à API. O tipo sugerido pelo padrão do nome (famílias de documentos já
+    confirmadas) só é usado se o classificador local concordar com ele.
+    O cliente só é criado se a API for chamada; o timeout é aplicado a cada
+    requisição feita a ela. Com uma tarefa em segundo
+    plano, o cancelamento é verificado depois da extração, antes de chamar a API.
+    """
+    tipo_conhecido = buscar_rotulo(arq.get("hash"))
+    if tipo_conhecido:
+        return tipo_conhecido
+
+    texto = extrair_texto(BytesIO(arq["content"]), arq["name"])
+    if tarefa is not None:
+        tarefa.verificar_cancelamento()
+        tarefa.progresso = 0.5
+    tipo_padrao = tipo_do_padrao(arq["name"])
+    classificacao_local = None
+    if texto.strip() and (CLASSIFICACAO_LOCAL or tipo_padrao):
+        # Calculada uma vez: serve para confirmar o padrão do nome e para classificar_documento
+        classificacao_local = classificar_localmente(normalizar_texto(texto[:4000], manter_linhas=True))
+        if tipo_padrao and classificacao_local[0] == tipo_padrao:
+            return tipo_padrao
+    tipo = classificar_documento(arq["name"], texto, client, classificacao_local, timeout)
+    return normalizar_tipo_documento(tipo, arq["name"])
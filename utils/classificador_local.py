@@ -0,0 +1,151 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from utils.rotulos import listar_exemplos, versao_rotulos
+from utils.config import CLASSIFICACAO_SIMILARIDADE_MINIMA, CLASSIFICACAO_EXEMPLOS_MINIMOS
+
+# ----- CLASSIFICADOR LOCAL -----
+# Primeira etapa da classificação, sem chamar a API:
+# 1. regras sobre os títulos do início do documento ("TERMO ADITIVO", "OFÍCIO Nº"...);
+# 2. um modelo TF-IDF por centroides, treinado com as classificações confirmadas.
+# Cada etapa devolve (tipo, confiança entre 0 e 1); o modelo de linguagem só é
+# chamado quando a confiança fica abaixo do limite configurado.
+# Os textos recebidos aqui já estão normalizados (minúsculas, sem acentos, uma
+# quebra de linha entre as linhas).
+
+# Regras na ordem de prioridade: termos mais específicos antes dos genéricos.
+# Entre os títulos encontrados no início do documento, vale o primeiro desta lista
+REGRAS_TITULO = [
+    ("Termo Aditivo", r"\b(?:\d+[ºo°]?\s*|primeiro |segundo |terceiro |quarto |quinto )?termo aditivo\b"),
+    ("Termo de Apostilamento", r"\b(?:termo de )?apostilamento\b"),
+    ("Termo de Referência", r"\btermo de referencia\b"),
+    ("Edital de Licitação", r"\bedital\b.{0,40}\b(?:licitacao|pregao|concorrencia|tomada de precos)\b"),
+    ("Minuta", r"\bminuta\b"),
+    ("Ata", r"\bata (?:da|de|do)\b.{0,40}\b(?:reuniao|sessao|assembleia|registro de precos)\b"),
+    ("Ofício", r"\boficio\s*(?:n[ºo°.]|circular)"),
+    # "relatório" é comum no corpo de contratos: só vale no início de uma linha (como título)
+    ("Relatório", r"^[\d.\s-]*relatorio\b"),
+    ("Proposta", r"\bproposta (?:comercial|tecnica|de precos?)\b"),
+    ("Contrato", r"\b(?:contrato\s*(?:n[ºo°.]|administrativo|de prestacao|de concessao)|instrumento particular de contrato)"),
+]
+REGRAS_COMPILADAS = [(tipo, re.compile(padrao, re.MULTILINE | re.DOTALL)) for tipo, padrao in REGRAS_TITULO]
+
+# Tamanho (em caracteres) considerado como título e como primeira página
+TAMANHO_TITULO = 300
+TAMANHO_PRIMEIRA_PAGINA = 2500
+
+# Confiança de um título nas primeiras linhas e de um termo só mencionado no
+# corpo da primeira página ("conforme a proposta de preços..."); a do corpo fica
+# abaixo do limite padrão (CLASSIFICACAO_CONFIANCA_LOCAL): sozinha, não dispensa a API
+CONFIANCA_TITULO = 0.95
+CONFIANCA_CORPO = 0.3
+
+PALAVRAS_IGNORADAS = {
+    "que", "para", "com", "por", "dos", "das", "nos", "nas", "uma", "pela", "pelo", "aos",
+    "sua", "seu", "suas", "seus", "este", "esta", "como", "mais", "ser", "sao", "ou", "nao",
+}
+
+_modelo = {"versao": None, "centroides": None, "idf": None}
+_trava = threading.Lock()
+
+
+def classificar_por_regras(texto):
+    """
+    Procura títulos característicos no início do documento.
+    Um título nas primeiras linhas dá confiança alta (havendo mais de um, vale a
+    ordem de prioridade de REGRAS_TITULO); um termo encontrado só mais abaixo na
+    primeira página é apenas uma menção e dá confiança baixa.
+    """
+    inicio = texto[:TAMANHO_PRIMEIRA_PAGINA]
+    encontrados = []
+    for tipo, regra in REGRAS_COMPILADAS:
+        m = regra.search(inicio)
+        if m:
+            encontrados.append((m.start(), tipo))
+    if not encontrados:
+        return None, 0.0
+
+    no_titulo = [tipo for posicao, tipo in encontrados if posicao < TAMANHO_TITULO]
+    if no_titulo:
+        return no_titulo[0], CONFIANCA_TITULO
+    return min(encontrados)[1], CONFIANCA_CORPO
+
+def _termos(texto):
+    return [t for t in re.findall(r"[a-z]{3,}", texto) if t not in PALAVRAS_IGNORADAS]
+
+def _vetor(texto, idf):
+    """Vetor TF-IDF (dicionário termo -> peso) com norma 1."""
+    contagem = Counter(t for t in _termos(texto) if t in idf)
+    vetor = {t: (1 + math.log(n)) * idf[t] for t, n in contagem.items()}
+    norma = math.sqrt(sum(v * v for v in vetor.values())) or 1.0
+    return {t: v / norma for t, v in vetor.items()}
+
+def treinar_modelo(exemplos):
+    """
+    Treina o modelo de centroides a partir de (texto, tipo).
+    Retorna (centroides por tipo, idf), ou (None, None) se houver poucos exemplos.
+    """
+    if len(exemplos) < CLASSIFICACAO_EXEMPLOS_MINIMOS or len({tipo for _, tipo in exemplos}) < 2:
+        return None, None
+
+    documentos = Counter()
+    for texto, _ in exemplos:
+        documentos.update(set(_termos(texto)))
+    total = len(exemplos)
+    idf = {t: math.log((1 + total) / (1 + n)) + 1 for t, n in documentos.items()}
+
+    somas = defaultdict(Counter)
+    for texto, tipo in exemplos:
+        somas[tipo].update(_vetor(texto, idf))
+
+    centroides = {}
+    for tipo, soma in somas.items():
+        norma = math.sqrt(sum(v * v for v in soma.values())) or 1.0
+        centroides[tipo] = {t: v / norma for t, v in soma.items()}
+    return centroides, idf
+
+def _obter_modelo():
+    """Retorna o modelo treinado com os rótulos atuais, treinando de novo só quando eles mudam."""
+    versao = versao_rotulos()
+    with _trava:
+        if _modelo["versao"] != versao:
+            _modelo["centroides"], _modelo["idf"] = treinar_modelo(listar_exemplos())
+            _modelo["versao"] = versao
+        return _modelo["centroides"], _modelo["idf"]
+
+def classificar_por_modelo(texto):
+    """
+    Compara o texto com o centroide de cada tipo já confirmado.
+    A confiança é a vantagem relativa do tipo mais parecido sobre o segundo.
+    """
+    centroides, idf = _obter_modelo()
+    if not centroides:
+        return None, 0.0
+
+    vetor = _vetor(texto, idf)
+    similaridades = sorted(
+        ((sum(peso * centroide.get(t, 0.0) for t, peso in vetor.items()), tipo) for tipo, centroide in centroides.items()),
+        reverse=True
+    )
+    melhor, tipo = similaridades[0]
+    segunda = similaridades[1][0] if len(similaridades) > 1 else 0.0
+    if melhor < CLASSIFICACAO_SIMILARIDADE_MINIMA:
+        return None, 0.0
+    return tipo, (melhor - segunda) / melhor
+
+def classificar_localmente(texto):
+    """
+    Classifica o texto normalizado sem chamar a API: primeiro pelas regras de
+    título, depois pelo modelo de centroides. Retorna (tipo ou None, confiança).
+    """
+    if not texto or not texto.strip():
+        return None, 0.0
+    tipo, confianca = classificar_por_regras(texto)
+    if confianca >= CONFIANCA_TITULO:
+        return tipo, confianca
+
+    tipo_modelo, confianca_modelo = classificar_por_modelo(texto)
+    if confianca_modelo > confianca:
+        return tipo_modelo, confianca_modelo
+    return tipo, confianca
@@ -1,106 +1,16 @@
 import streamlit as st
-from openai import OpenAI
-import os
-import unicodedata
-import re
 from utils.extrair_texto import extrair_texto
 from io import BytesIO
 from collections import defaultdict
+from utils.cliente_openai import criar_cliente_openai
+from utils.classificacao import (
+    normalizar_texto, eh_parte_de_edital, normalizar_tipo_documento, classificar_documento, extrair_e_classificar
+)
+from utils.rotulos import salvar_rotulos, buscar_rotulo, versao_rotulos
+from utils.tarefas import fila_tarefas, desenhar_com_atualizacao, CONCLUIDA
 
 # ---------------- FUNÇÕES DE CLASSIFICAÇÃO ---------------- #
 
-def criar_cliente_openai():
-    api_key = os.getenv("OPENAI_API_KEY") or st.secrets.get("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY não está configurada no ambiente")
-    return OpenAI(api_key=api_key)
-
-def normalizar_texto(texto: str) -> str:
-    texto = ''.join(
-        c for c in unicodedata.normalize('NFD', texto)
-        if unicodedata.category(c) != 'Mn'
-    )
-    texto = re.sub(r'\s+', ' ', texto)
-    return texto.lower().strip()
-
-def eh_parte_de_edital(nome_arquivo: str) -> bool:
-    nome_norm = normalizar_texto(nome_arquivo)
-    palavras_chave = [
-        "edital", "licit", "instrucoes", "instruc", "lista de requerimentos",
-        "criterio", "formulario", "modelo de acordo", "secao", "condicoes gerais",
-        "questionario"
-    ]
-    return any(palavra in nome_norm for palavra in palavras_chave)
-
-def normalizar_tipo_documento(tipo: str, nome_arquivo: str = None) -> str:
-    tipo_lower = normalizar_texto(tipo)
-    
-    if "edital de licitacao" in tipo_lower or (nome_arquivo and eh_parte_de_edital(nome_arquivo)):
-        return "Edital de Licitação"
-    
-    mapeamento = {
-        "contrato": "Contrato",
-        "termo aditivo": "Termo Aditivo",
-        "relatório": "Relatório",
-        "ofício": "Ofício",
-        "ata": "Ata",
-        "proposta": "Proposta",
-        "minuta": "Minuta",
-        "termo de apostilamento": "Termo de Apostilamento",
-        "termo de referência": "Termo de Referência",
-    }
-    
-    for chave, valor in mapeamento.items():
-        if chave in tipo_lower:
-            return valor
-
-    return "Outro"
-
-def classificar_documento(nome_arquivo: str, conteudo_texto: str = None, client=None) -> str:
-    if client is None:
-        raise ValueError("Client OpenAI deve ser passado para classificar_documento")
-    
-    if eh_parte_de_edital(nome_arquivo):
-        return "Edital de Licitação"
-    
-    tipos_validos = [
-        "Contrato", "Termo Aditivo", "Relatório", "Ofício", "Ata", "Proposta", "Minuta",
-        "Termo de Apostilamento", "Edital de Licitação", "Termo de Referência"
-    ]
-
-    if conteudo_texto and conteudo_texto.strip():
-        prompt = f"""
-Classifique o documento com base no conteúdo abaixo.
-
-Lista oficial: {", ".join(tipos_validos)}
-
-Conteúdo:
-\"\"\"{conteudo_texto[:4000]}\"\"\"
-"""
-    else:
-        prompt = f"""
-Classifique o documento com base apenas no nome do arquivo.
-
-Lista oficial: {", ".join(tipos_validos)}
-
-Nome do arquivo: '{nome_arquivo}'
-"""
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-        max_tokens=30
-    )
-
-    tipo_cru_raw = response.choices[0].message.content.strip()
-    tipo_normalizado = normalizar_tipo_documento(tipo_cru_raw, nome_arquivo)
-
-    if tipo_normalizado == "Outro" and tipo_cru_raw.lower() not in [t.lower() for t in tipos_validos]:
-        return tipo_cru_raw.title()
-
-    return tipo_normalizado
-
 @st.cache_data(show_spinner="Classificando os documentos...")
 def classificar_com_cache(lista_docs):
     client = criar_cliente_openai()
@@ -110,6 +20,36 @@ def classificar_com_cache(lista_docs):
         resultados.append({"nome": doc["nome"], "classificacao": classificacao})
     return resultados
 
+def classificar_tarefa(tarefa, arq):
+    """Tarefa em segundo plano que extrai e classifica um arquivo enviado."""
+    tarefa.verificar_cancelamento()
+    return extrair_e_classificar(arq, tarefa=tarefa)
+
+def guardar_rotulos(docs):
+    """Guarda as classificações dos documentos (e se foram corrigidas à mão) no repositório de rótulos."""
+    try:
+        salvar_rotulos(
+            (doc["hash"], doc["nome"], doc["classificacao"],
+             normalizar_texto(extrair_texto(BytesIO(doc["conteudo"]), doc["nome"])[:4000]),
+             doc.get("corrigido", False))
+            for doc in docs if doc.get("hash")
+        )
+    except Exception as e:
+        st.warning(f"Não foi possível guardar as classificações: {e}")
+
+def agrupar_confirmados(docs):
+    """
+    Monta a classificação final ({tipo: [docs]}) com os documentos confirmados e
+    guarda essas classificações para as próximas sessões.
+    """
+    confirmados = [doc for doc in docs if doc.get("confirmado", False)]
+    guardar_rotulos(confirmados)
+
+    return {
+        tipo: [doc for doc in confirmados if doc["classificacao"] == tipo]
+        for tipo in dict.fromkeys(d["classificacao"] for d in confirmados)
+    }
+
 def mostrar_classificacao_documentos():
     """
     Mostra a classificação automática dos documentos, permite ajustes manuais
@@ -125,16 +65,58 @@ def mostrar_classificacao_documentos():
 
     if "docs" not in st.session_state:
         st.session_state.docs = []
-        client = criar_cliente_openai()
-        for arq in documentos:
-            texto = extrair_texto(BytesIO(arq["content"]), arq["name"])
-            tipo = normalizar_tipo_documento(classificar_documento(arq["name"], texto, client), arq["name"])
+
+    # Classifica apenas os arquivos que ainda não estão na sessão (retoma após um rerun)
+    nomes_classificados = {d["nome"] for d in st.session_state.docs}
+    pendentes = [arq for arq in documentos if arq["name"] not in nomes_classificados]
+
+    if pendentes:
+        # Documentos já confirmados (mesmo hash) não precisam de tarefa. Os demais
+        # ganham uma tarefa em segundo plano cada: a classificação continua mesmo
+        # que a página seja recarregada ou o usuário navegue para outra. O id leva
+        # a versão dos rótulos do início desta classificação, para que um novo
+        # envio depois de correções não reaproveite uma classificação antiga
+        versao = st.session_state.setdefault("classificacao_versao_rotulos", versao_rotulos())
+        conhecidos = {arq["name"]: buscar_rotulo(arq.get("hash")) for arq in pendentes}
+        fila = fila_tarefas()
+        tarefas = {
+            arq["name"]: fila.submeter(
+                f"classificar:{versao[0]}-{versao[1]}:{arq.get('hash') or arq['name']}", classificar_tarefa, arq,
+                descricao=f"Classificação de {arq['name']}"
+            )
+            for arq in pendentes if not conhecidos[arq["name"]]
+        }
+        if not all(t.terminou for t in tarefas.values()):
+            def desenhar():
+                concluidos = sum(t.terminou for t in tarefas.values())
+                progresso = sum(t.progresso for t in tarefas.values()) / len(tarefas)
+                st.progress(progresso, text=f"Classificando os documentos... ({concluidos}/{len(tarefas)})")
+                return concluidos < len(tarefas)
+
+            desenhar_com_atualizacao(desenhar, True)
+            return
+
+        for arq in pendentes:
+            tarefa = tarefas.get(arq["name"])
+            if tarefa is None:
+                tipo = conhecidos[arq["name"]]
+            elif tarefa.estado == CONCLUIDA:
+                tipo = tarefa.resultado
+            else:
+                st.warning(f"Não foi possível classificar **{arq['name']}**: {tarefa.erro or 'cancelado'}")
+                tipo = "Outro"
             st.session_state.docs.append({
                 "nome": arq["name"],
                 "conteudo": arq["content"],
+                "hash": arq.get("hash"),
                 "classificacao": tipo,
                 "confirmado": False  # flag para rastrear confirmação
             })
+        st.session_state.pop("classificacao_versao_rotulos", None)
+
+        # Mantém a ordem do upload, independente da ordem de conclusão
+        ordem = {arq["name"]: i for i, arq in enumerate(documentos)}
+        st.session_state.docs.sort(key=lambda d: ordem.get(d["nome"], len(ordem)))
 
     if "modo_ajuste" not in st.session_state:
         st.session_state.modo_ajuste = False
@@ -160,10 +142,7 @@ def mostrar_classificacao_documentos():
                 d["confirmado"] = True
 
             # Agrupamento corrigido
-            st.session_state["classificacao_final"] = {
-                tipo: [doc for doc in st.session_state.docs if doc["classificacao"] == tipo and doc.get("confirmado", False)]
-                for tipo in set(d["classificacao"] for d in st.session_state.docs)
-            }
+            st.session_state["classificacao_final"] = agrupar_confirmados(st.session_state.docs)
 
             st.session_state["page"] = "menu"
             st.rerun()
@@ -203,6 +182,10 @@ def mostrar_classificacao_documentos():
                 for d in st.session_state.docs:
                     if d["nome"] == doc_escolhido:
                         d["classificacao"] = nova_classificacao
+                        d["corrigido"] = True
+                        # A correção já fica guardada, mesmo sem finalizar os ajustes
+                        if nova_classificacao:
+                            guardar_rotulos([d])
                 st.success(f"Classificação de **{doc_escolhido}** atualizada para **{nova_classificacao}**")
 
         # Finalizar ajustes: confirma os documentos
@@ -214,10 +197,7 @@ def mostrar_classificacao_documentos():
                         d["confirmado"] = True  # garante que todos entrem na classificação final
 
                 # Agrupamento corrigido
-                st.session_state["classificacao_final"] = {
-                    tipo: [doc for doc in st.session_state.docs if doc["classificacao"] == tipo and doc.get("confirmado", False)]
-                    for tipo in set(d["classificacao"] for d in st.session_state.docs)
-                }
+                st.session_state["classificacao_final"] = agrupar_confirmados(st.session_state.docs)
 
                 st.session_state.modo_ajuste = False
                 st.session_state["page"] = "menu"
@@ -0,0 +1,251 @@
+import asyncio
+import os
+import queue
+import re
+import threading
+import time
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from utils.config import (
+    OPENAI_MAX_SIMULTANEOS, OPENAI_CONEXOES, OPENAI_TENTATIVAS, OPENAI_TIMEOUT, OPENAI_RESERVA_TOKENS
+)
+
+# ----- CLIENTE OPENAI COMPARTILHADO -----
+# Um único cliente por processo, com conexões HTTP reaproveitadas (keep-alive).
+# Todas as funcionalidades passam pelo mesmo limite de requisições simultâneas
+# e pela mesma leitura dos cabeçalhos de limite de taxa da API: quando a cota
+# acaba (ou chega um 429), todas as threads esperam a cota voltar, em vez de
+# insistir e gerar uma cascata de 429. As novas tentativas (429/5xx) ficam com
+# o próprio SDK, que espera de forma exponencial e aleatória.
+
+_cliente = None
+_clientes_async = weakref.WeakKeyDictionary()
+_loop = None
+_trava = threading.Lock()
+
+
+def obter_chave_openai():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        try:
+            # Importado só aqui: o processamento em lote não depende do Streamlit
+            import streamlit as st
+            api_key = st.secrets.get("OPENAI_API_KEY")
+        except (ImportError, FileNotFoundError):
+            # Fora do Streamlit (ex.: processamento em lote) pode não existir secrets.toml
+            api_key = None
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY não está configurada no ambiente")
+    return api_key
+
+def _ler_duracao(valor):
+    """Converte durações dos cabeçalhos da API ("20ms", "1s", "6m0s", "1h2m3.5s") em segundos."""
+    if not valor:
+        return 0.0
+    try:
+        return float(valor)
+    except ValueError:
+        pass
+    fatores = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(numero) * fatores[unidade] for numero, unidade in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", valor))
+
+
+class LimiteDeTaxa:
+    """
+    Balde de requisições compartilhado, abastecido pelos cabeçalhos
+    x-ratelimit-* das respostas, mais um teto de requisições simultâneas.
+    """
+
+    def __init__(self, max_simultaneos=OPENAI_MAX_SIMULTANEOS, reserva_tokens=OPENAI_RESERVA_TOKENS):
+        self.simultaneos = threading.BoundedSemaphore(max_simultaneos)
+        self.reserva_tokens = reserva_tokens
+        self._trava = threading.Lock()
+        self._requisicoes_restantes = None
+        self._liberado_em = 0.0
+
+    def espera(self):
+        """
+        Retorna quantos segundos esperar antes de enviar uma requisição.
+        Quando retorna 0, a requisição já foi descontada do balde.
+        """
+        with self._trava:
+            agora = time.monotonic()
+            if agora < self._liberado_em:
+                return self._liberado_em - agora
+            if self._requisicoes_restantes is not None:
+                if self._requisicoes_restantes <= 0:
+                    # A janela da API já reiniciou; o próximo cabeçalho traz o valor real
+                    self._requisicoes_restantes = None
+                else:
+                    self._requisicoes_restantes -= 1
+            return 0.0
+
+    def atualizar(self, resposta):
+        """Lê os cabeçalhos de limite de taxa (e o retry-after de um 429) da resposta."""
+        cabecalhos = resposta.headers
+        with self._trava:
+            agora = time.monotonic()
+            if resposta.status_code == 429:
+                espera = _ler_duracao(cabecalhos.get("retry-after-ms")) / 1000 \
+                    or _ler_duracao(cabecalhos.get("retry-after")) or 1.0
+                self._liberado_em = max(self._liberado_em, agora + espera)
+                return
+
+            restantes = cabecalhos.get("x-ratelimit-remaining-requests")
+            if restantes is not None and restantes.isdigit():
+                self._requisicoes_restantes = int(restantes)
+                if self._requisicoes_restantes <= 0:
+                    reinicio = _ler_duracao(cabecalhos.get("x-ratelimit-reset-requests"))
+                    self._liberado_em = max(self._liberado_em, agora + reinicio)
+
+            tokens = cabecalhos.get("x-ratelimit-remaining-tokens")
+            if tokens is not None and tokens.isdigit() and int(tokens) < self.reserva_tokens:
+                reinicio = _ler_duracao(cabecalhos.get("x-ratelimit-reset-tokens"))
+                self._liberado_em = max(self._liberado_em, agora + reinicio)
+
+
+limite_de_taxa = LimiteDeTaxa()
+
+
+class TransporteComLimite(httpx.HTTPTransport):
+    """Transporte HTTP que respeita o limite de taxa e de simultaneidade compartilhado."""
+
+    def __init__(self, limite, **kwargs):
+        super().__init__(**kwargs)
+        self.limite = limite
+
+    def handle_request(self, request):
+        with self.limite.simultaneos:
+            while (espera := self.limite.espera()) > 0:
+                time.sleep(espera)
+            resposta = super().handle_request(request)
+            self.limite.atualizar(resposta)
+            return resposta
+
+
+class TransporteAsyncComLimite(httpx.AsyncHTTPTransport):
+    """Versão assíncrona de TransporteComLimite (esperas sem bloquear o event loop)."""
+
+    def __init__(self, limite, **kwargs):
+        super().__init__(**kwargs)
+        self.limite = limite
+
+    async def handle_async_request(self, request):
+        # O semáforo é de threads (compartilhado com o cliente síncrono): espera por
+        # ele em uma thread. Se a requisição for cancelada antes, a vaga obtida
+        # depois é devolvida
+        adquirir = asyncio.ensure_future(asyncio.to_thread(self.limite.simultaneos.acquire))
+        try:
+            await asyncio.shield(adquirir)
+        except asyncio.CancelledError:
+            adquirir.add_done_callback(lambda _: self.limite.simultaneos.release())
+            raise
+        try:
+            while (espera := self.limite.espera()) > 0:
+                await asyncio.sleep(espera)
+            resposta = await super().handle_async_request(request)
+            self.limite.atualizar(resposta)
+            return resposta
+        finally:
+            self.limite.simultaneos.release()
+
+
+def _limites_conexao():
+    return httpx.Limits(
+        max_connections=OPENAI_CONEXOES,
+        max_keepalive_connections=OPENAI_CONEXOES,
+        keepalive_expiry=60
+    )
+
+def criar_cliente_openai():
+    """Retorna o cliente OpenAI do processo, criando-o na primeira chamada."""
+    global _cliente
+    api_key = obter_chave_openai()
+    with _trava:
+        if _cliente is None or _cliente.api_key != api_key:
+            _cliente = OpenAI(
+                api_key=api_key,
+                max_retries=OPENAI_TENTATIVAS,
+                timeout=OPENAI_TIMEOUT,
+                http_client=httpx.Client(
+                    transport=TransporteComLimite(limite_de_taxa, limits=_limites_conexao()),
+                    timeout=OPENAI_TIMEOUT,
+                    follow_redirects=True
+                )
+            )
+        return _cliente
+
+def obter_loop():
+    """
+    Event loop de fundo do processo, rodando em uma thread própria (criado na
+    primeira chamada). As corrotinas que usam o cliente assíncrono rodam nele,
+    para que o cliente e suas conexões sejam reaproveitados entre as execuções
+    da página.
+    """
+    global _loop
+    with _trava:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="openai-async", daemon=True).start()
+        return _loop
+
+def iterar_no_loop(gerador_async):
+    """
+    Consome um gerador assíncrono no event loop de fundo e entrega os itens a
+    quem chama (uma thread comum, como a da página do Streamlit) à medida que
+    chegam. Se quem chama parar antes do fim, o gerador é cancelado.
+    """
+    fila = queue.Queue()
+    fim = object()
+
+    async def consumir():
+        try:
+            async for item in gerador_async:
+                fila.put((item, None))
+        except Exception as e:
+            fila.put((fim, e))
+        else:
+            fila.put((fim, None))
+
+    futuro = asyncio.run_coroutine_threadsafe(consumir(), obter_loop())
+    try:
+        while True:
+            item, erro = fila.get()
+            if item is fim:
+                if erro is not None:
+                    raise erro
+                return
+            yield item
+    finally:
+        futuro.cancel()
+
+def criar_cliente_openai_async():
+    """
+    Retorna o cliente OpenAI assíncrono do event loop atual (normalmente o de
+    obter_loop). As conexões de um cliente assíncrono pertencem ao seu event
+    loop, por isso há um por loop; o limite de taxa e de simultaneidade é o
+    mesmo do cliente síncrono.
+    """
+    api_key = obter_chave_openai()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _trava:
+        cliente = _clientes_async.get(loop) if loop is not None else None
+        if cliente is None or cliente.api_key != api_key:
+            cliente = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=OPENAI_TENTATIVAS,
+                timeout=OPENAI_TIMEOUT,
+                http_client=httpx.AsyncClient(
+                    transport=TransporteAsyncComLimite(limite_de_taxa, limits=_limites_conexao()),
+                    timeout=OPENAI_TIMEOUT,
+                    follow_redirects=True
+                )
+            )
+            if loop is not None:
+                _clientes_async[loop] = cliente
+        return cliente
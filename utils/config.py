@@ -0,0 +1,211 @@
+import os
+
+# ----- CONFIGURAÇÕES GERAIS -----
+# Valores padrão podem ser sobrescritos por variáveis de ambiente.
+
+# Classificação: tempo máximo (em segundos) de cada chamada à API
+CLASSIFICACAO_TIMEOUT = float(os.getenv("CLASSIFICACAO_TIMEOUT", "60"))
+
+# Classificar primeiro localmente (regras de título e modelo treinado com as confirmações) (1) ou sempre pela API (0)
+CLASSIFICACAO_LOCAL = os.getenv("CLASSIFICACAO_LOCAL", "1") == "1"
+
+# Confiança mínima (0 a 1) da classificação local para dispensar a chamada à API
+CLASSIFICACAO_CONFIANCA_LOCAL = float(os.getenv("CLASSIFICACAO_CONFIANCA_LOCAL", "0.5"))
+
+# Similaridade mínima (cosseno TF-IDF) com o tipo mais parecido para o modelo local opinar
+CLASSIFICACAO_SIMILARIDADE_MINIMA = float(os.getenv("CLASSIFICACAO_SIMILARIDADE_MINIMA", "0.2"))
+
+# Quantas classificações confirmadas são necessárias para treinar o modelo local
+CLASSIFICACAO_EXEMPLOS_MINIMOS = int(os.getenv("CLASSIFICACAO_EXEMPLOS_MINIMOS", "5"))
+
+# Quantos documentos confirmados com o mesmo padrão de nome (e o mesmo tipo) bastam
+# para classificar na hora os próximos dessa família; 0 desativa
+ROTULOS_PADRAO_MINIMO = int(os.getenv("ROTULOS_PADRAO_MINIMO", "3"))
+
+# Quantas correções manuais recentes entram como exemplos no prompt de classificação
+ROTULOS_EXEMPLOS_PROMPT = int(os.getenv("ROTULOS_EXEMPLOS_PROMPT", "5"))
+
+# ----- CLIENTE OPENAI -----
+
+# Quantas requisições à API (de todas as funcionalidades e sessões) podem estar em andamento ao mesmo tempo
+OPENAI_MAX_SIMULTANEOS = int(os.getenv("OPENAI_MAX_SIMULTANEOS", "16"))
+
+# Quantas conexões HTTP ficam abertas (e são reaproveitadas) com a API
+OPENAI_CONEXOES = int(os.getenv("OPENAI_CONEXOES", "32"))
+
+# Quantas novas tentativas o SDK faz em erros 429/5xx (com espera exponencial e aleatória)
+OPENAI_TENTATIVAS = int(os.getenv("OPENAI_TENTATIVAS", "4"))
+
+# Tempo máximo (em segundos) de cada requisição à API
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+
+# Abaixo desta quantidade de tokens restantes na cota, as requisições esperam a cota reiniciar
+OPENAI_RESERVA_TOKENS = int(os.getenv("OPENAI_RESERVA_TOKENS", "2000"))
+
+# ----- EXTRAÇÃO DE TEXTO -----
+
+# Extrair em processos separados (1) ou no próprio processo do Streamlit (0)
+EXTRACAO_EM_PROCESSOS = os.getenv("EXTRACAO_EM_PROCESSOS", "1") == "1"
+
+# Quantidade de processos de extração
+EXTRACAO_PROCESSOS = int(os.getenv("EXTRACAO_PROCESSOS", str(os.cpu_count() or 2)))
+
+# Tempo máximo (em segundos) para extrair um arquivo (ou uma faixa de páginas)
+EXTRACAO_TIMEOUT = float(os.getenv("EXTRACAO_TIMEOUT", "120"))
+
+# Limite de memória (em MB) de cada processo de extração; 0 desativa o limite
+EXTRACAO_LIMITE_MEMORIA_MB = int(os.getenv("EXTRACAO_LIMITE_MEMORIA_MB", "2048"))
+
+# PDFs com mais páginas que isso são divididos em faixas extraídas em paralelo
+EXTRACAO_PAGINAS_POR_TAREFA = int(os.getenv("EXTRACAO_PAGINAS_POR_TAREFA", "50"))
+
+# ----- ARQUIVOS ZIP -----
+
+# Tamanho máximo (em MB, descompactado) de cada arquivo dentro do zip
+ZIP_MAX_MEMBRO_MB = int(os.getenv("ZIP_MAX_MEMBRO_MB", "200"))
+
+# Tamanho máximo (em MB) de tudo o que é descompactado de um mesmo envio
+ZIP_MAX_TOTAL_MB = int(os.getenv("ZIP_MAX_TOTAL_MB", "2048"))
+
+# Quantidade máxima de arquivos lidos de um mesmo envio
+ZIP_MAX_ARQUIVOS = int(os.getenv("ZIP_MAX_ARQUIVOS", "5000"))
+
+# Razão máxima entre tamanho descompactado e compactado (proteção contra zip bomb)
+ZIP_MAX_RAZAO_COMPRESSAO = int(os.getenv("ZIP_MAX_RAZAO_COMPRESSAO", "100"))
+
+# Quantos níveis de zip dentro de zip são abertos
+ZIP_MAX_PROFUNDIDADE = int(os.getenv("ZIP_MAX_PROFUNDIDADE", "3"))
+
+# ----- CACHE EM DISCO -----
+
+# Diretório onde ficam os caches persistentes (compartilhados entre sessões)
+DIRETORIO_CACHE = os.getenv("DIRETORIO_CACHE", ".cache")
+
+# Tamanho máximo (em MB) do cache de textos extraídos
+EXTRACAO_CACHE_LIMITE_MB = int(os.getenv("EXTRACAO_CACHE_LIMITE_MB", "1024"))
+
+# Tamanho máximo (em MB) do cache de embeddings por chunk
+EMBEDDINGS_CACHE_LIMITE_MB = int(os.getenv("EMBEDDINGS_CACHE_LIMITE_MB", "2048"))
+
+# Tamanho máximo (em MB) do cache de respostas do modelo
+LLM_CACHE_LIMITE_MB = int(os.getenv("LLM_CACHE_LIMITE_MB", "512"))
+
+# Por quantos dias uma resposta do modelo fica no cache; 0 mantém até o limite de tamanho
+LLM_CACHE_TTL_DIAS = int(os.getenv("LLM_CACHE_TTL_DIAS", "30"))
+
+# Tamanho máximo (em MB) do cache de divisões dos documentos em chunks
+DIVISAO_CACHE_LIMITE_MB = int(os.getenv("DIVISAO_CACHE_LIMITE_MB", "256"))
+
+# ----- DIVISÃO EM CHUNKS -----
+
+# Tamanho máximo (em tokens) das partes enviadas ao modelo nos resumos e prazos
+DIVISAO_MAX_TOKENS = int(os.getenv("DIVISAO_MAX_TOKENS", "3000"))
+
+# Quantas contagens de tokens (por hash do texto) ficam guardadas na memória do processo
+TOKENS_CACHE_ENTRADAS = int(os.getenv("TOKENS_CACHE_ENTRADAS", "50000"))
+
+# Quantos tokens do fim de uma parte são repetidos no início da seguinte
+DIVISAO_SOBREPOSICAO = int(os.getenv("DIVISAO_SOBREPOSICAO", "200"))
+
+# Tamanho máximo (em tokens) dos trechos indexados para o chat
+CHAT_CHUNK_TOKENS = int(os.getenv("CHAT_CHUNK_TOKENS", "300"))
+
+# Quantos tokens do fim de um trecho do chat são repetidos no início do seguinte
+CHAT_CHUNK_SOBREPOSICAO = int(os.getenv("CHAT_CHUNK_SOBREPOSICAO", "50"))
+
+# ----- EMBEDDINGS -----
+
+# Quantos chunks são enviados em cada requisição de embeddings
+EMBEDDINGS_TAMANHO_LOTE = int(os.getenv("EMBEDDINGS_TAMANHO_LOTE", "256"))
+
+# Quantas requisições de embeddings podem estar em andamento ao mesmo tempo
+EMBEDDINGS_MAX_SIMULTANEOS = int(os.getenv("EMBEDDINGS_MAX_SIMULTANEOS", "4"))
+
+# Quantas tentativas por lote antes de desistir (com espera exponencial entre elas)
+EMBEDDINGS_TENTATIVAS = int(os.getenv("EMBEDDINGS_TENTATIVAS", "5"))
+
+# ----- RESUMOS -----
+
+# Quantos resumos parciais (e reduções intermediárias) rodam ao mesmo tempo
+RESUMO_MAX_SIMULTANEOS = int(os.getenv("RESUMO_MAX_SIMULTANEOS", "6"))
+
+# Limite de tokens dos resumos parciais juntos em uma única etapa de redução;
+# acima disso, os resumos são reduzidos em grupos (em árvore) antes do resumo final
+RESUMO_LIMITE_TOKENS_REDUCAO = int(os.getenv("RESUMO_LIMITE_TOKENS_REDUCAO", "6000"))
+
+# ----- PRAZOS -----
+
+# Quantas partes de um mesmo documento são enviadas ao modelo ao mesmo tempo
+PRAZOS_MAX_SIMULTANEOS = int(os.getenv("PRAZOS_MAX_SIMULTANEOS", "4"))
+
+# Procurar datas e períodos por regras antes de chamar o modelo (1) ou enviar o texto todo (0)
+PRAZOS_PRE_EXTRACAO = os.getenv("PRAZOS_PRE_EXTRACAO", "1") == "1"
+
+# Quantos caracteres antes e depois de cada data ou período vão para o modelo
+PRAZOS_JANELA_CARACTERES = int(os.getenv("PRAZOS_JANELA_CARACTERES", "300"))
+
+# ----- PROCESSAMENTO EM LOTE -----
+
+# Quantos documentos o processamento em lote (processar_lote.py) trata ao mesmo tempo
+PIPELINE_DOCUMENTOS_SIMULTANEOS = int(os.getenv("PIPELINE_DOCUMENTOS_SIMULTANEOS", "8"))
+
+# ----- TAREFAS EM SEGUNDO PLANO -----
+
+# Quantas tarefas (resumos, prazos, classificações, índices) rodam ao mesmo tempo no processo
+TAREFAS_TRABALHADORES = int(os.getenv("TAREFAS_TRABALHADORES", "8"))
+
+# De quantos em quantos segundos as páginas redesenham as tarefas em andamento
+TAREFAS_INTERVALO_ATUALIZACAO = float(os.getenv("TAREFAS_INTERVALO_ATUALIZACAO", "0.5"))
+
+# Por quantos minutos uma tarefa terminada continua disponível para as páginas
+TAREFAS_RETENCAO_MINUTOS = int(os.getenv("TAREFAS_RETENCAO_MINUTOS", "60"))
+
+# ----- ÍNDICE VETORIAL -----
+
+# A partir de quantos chunks o índice do chat deixa de ser exato (Flat) e passa a ser
+# treinado com o tipo abaixo; um valor bem alto mantém sempre o índice exato
+INDICE_LIMITE_FLAT = int(os.getenv("INDICE_LIMITE_FLAT", "20000"))
+
+# Tipo dos índices grandes: "hnsw" (grafo HNSW com quantização escalar de 8 bits)
+# ou "ivfpq" (listas invertidas com quantização por produto, menor uso de memória)
+INDICE_TIPO_GRANDE = os.getenv("INDICE_TIPO_GRANDE", "hnsw")
+
+# IVF-PQ: quantidade de listas (0 = 4 x raiz do número de chunks) e de listas visitadas por busca
+INDICE_IVF_LISTAS = int(os.getenv("INDICE_IVF_LISTAS", "0"))
+INDICE_IVF_NPROBE = int(os.getenv("INDICE_IVF_NPROBE", "16"))
+
+# IVF-PQ: em quantos subvetores cada vetor é quantizado (1 byte cada)
+INDICE_PQ_SUBVETORES = int(os.getenv("INDICE_PQ_SUBVETORES", "64"))
+
+# HNSW: vizinhos por nó no grafo e tamanho da lista de candidatos na busca
+INDICE_HNSW_VIZINHOS = int(os.getenv("INDICE_HNSW_VIZINHOS", "32"))
+INDICE_HNSW_EF_BUSCA = int(os.getenv("INDICE_HNSW_EF_BUSCA", "64"))
+
+# Buscas com filtro em índices aproximados: até quantos chunks permitidos a busca é
+# exata, sobre os vetores reconstruídos; acima disso, usa o próprio índice com
+# nprobe/efSearch aumentados na proporção do filtro
+INDICE_FILTRO_EXATO_MAX = int(os.getenv("INDICE_FILTRO_EXATO_MAX", "10000"))
+
+# ----- CHAT -----
+
+# Na primeira pergunta (sem histórico) a etapa de reescrever a pergunta é pulada
+CHAT_PULAR_CONDENSACAO_SEM_HISTORICO = os.getenv("CHAT_PULAR_CONDENSACAO_SEM_HISTORICO", "1") == "1"
+
+# Quantos trechos dos documentos vão no contexto de cada resposta
+CHAT_K = int(os.getenv("CHAT_K", "4"))
+
+# Quantos candidatos a busca por palavras (BM25) e a busca vetorial trazem, cada uma, antes da fusão
+CHAT_CANDIDATOS = int(os.getenv("CHAT_CANDIDATOS", "20"))
+
+# Constante da fusão por posição (Reciprocal Rank Fusion): maior dá mais peso às posições de baixo
+CHAT_RRF_K = int(os.getenv("CHAT_RRF_K", "60"))
+
+# Reordenação dos candidatos fundidos: "mmr" (relevância com diversidade), "cross-encoder"
+# (modelo local; exige o pacote sentence-transformers) ou "" (só a fusão)
+CHAT_RERANK = os.getenv("CHAT_RERANK", "mmr")
+
+# Peso da relevância contra a diversidade no MMR (1 = só relevância)
+CHAT_MMR_LAMBDA = float(os.getenv("CHAT_MMR_LAMBDA", "0.7"))
+
+# Modelo do cross-encoder (multilíngue, para textos em português)
+CHAT_CROSS_ENCODER = os.getenv("CHAT_CROSS_ENCODER", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
@@ -0,0 +1,194 @@
+import json
+import os
+import re
+from dataclasses import dataclass, asdict
+from bisect import bisect_left
+from utils.cache_disco import CacheDisco
+from utils.tokens import tokenizar, obter_codificador
+from utils.extrair_texto import EXTRATOR_VERSAO
+from utils.config import DIRETORIO_CACHE, DIVISAO_CACHE_LIMITE_MB
+
+# ----- DIVISÃO DE DOCUMENTOS EM CHUNKS -----
+# Um único divisor para resumos, prazos e chat. Cada página é tokenizada uma
+# vez e cortada, nas posições dos tokens, em unidades que começam nas fronteiras
+# da estrutura do documento (cláusulas, artigos, capítulos, seções numeradas e
+# páginas); os chunks são montados juntando unidades inteiras até o limite de
+# tokens, com sobreposição entre chunks vizinhos (unidades inteiras ou, se a
+# última não couber, os seus últimos tokens). Só unidades maiores que o
+# limite são quebradas (após parágrafos, linhas ou frases e, em último caso,
+# no próprio limite de tokens).
+# As fronteiras e contagens de tokens ficam em cache por hash do documento.
+
+# Incrementar sempre que a regra de divisão mudar, para invalidar o cache
+DIVISAO_VERSAO = "3"
+
+# Início de uma unidade estrutural: no começo da linha, "CLÁUSULA", "Art. 5º",
+# "CAPÍTULO", "SEÇÃO", "ANEXO" ou uma numeração ("3.", "4.2", "5.1.3)") seguida de título
+FRONTEIRAS = re.compile(
+    r"^[ \t]*(?:"
+    r"(?i:cl[áa]usula\b|art\.|artigo\b|cap[íi]tulo\b|se[çc][ãa]o\b|subse[çc][ãa]o\b|anexo\b)"
+    r"|\d{1,2}(?:\.\d{1,2}){0,3}[.)]?[ \t]+[A-ZÁÉÍÓÚÂÊÔÃÕÇ]"
+    r")",
+    re.MULTILINE
+)
+
+# Separadores usados, em ordem, para quebrar uma unidade maior que o limite.
+# O ponto só conta no fim de uma frase (seguido de espaço; ".\n" já é coberto
+# por "\n"), não em "Art. 5º" já separado, "1.2.3" ou "R$ 1.000,00".
+SEPARADORES = ("\n\n", "\n", ". ", ";")
+
+cache_divisoes = CacheDisco(
+    os.path.join(DIRETORIO_CACHE, "divisoes.sqlite3"),
+    limite_bytes=DIVISAO_CACHE_LIMITE_MB * 1024 * 1024
+)
+
+
+@dataclass
+class Chunk:
+    """Pedaço de um documento: página onde começa, texto, tokens e posição (em tokens) no documento."""
+    pagina: int
+    texto: str
+    tokens: int
+    inicio: int
+    fim: int
+
+
+def _fronteiras(texto, posicoes):
+    """Índices dos tokens em que começam as unidades estruturais do texto (o primeiro é sempre 0)."""
+    inicios = [0]
+    for m in FRONTEIRAS.finditer(texto):
+        # Primeiro token que começa na fronteira ou depois dela
+        j = bisect_left(posicoes, m.start(), lo=inicios[-1])
+        if inicios[-1] < j < len(posicoes):
+            inicios.append(j)
+    return inicios
+
+def _quebrar(texto, posicoes, inicio, fim, max_tokens):
+    """
+    Divide os tokens [inicio, fim) em faixas de até max_tokens. Cada corte é feito,
+    de preferência, logo após um parágrafo, uma linha ou uma frase na segunda
+    metade da faixa; sem separador, no próprio limite de tokens.
+    """
+    faixas = []
+    while fim - inicio > max_tokens:
+        limite = inicio + max_tokens
+        meio = inicio + max_tokens // 2 + 1
+        faixas.append((inicio, _corte(texto, posicoes, meio, limite)))
+        inicio = faixas[-1][1]
+    faixas.append((inicio, fim))
+    return faixas
+
+def _corte(texto, posicoes, meio, limite):
+    """Primeiro token depois do último separador entre os tokens meio e limite (ou o próprio limite)."""
+    for separador in SEPARADORES:
+        fim_busca = posicoes[limite]
+        while (k := texto.rfind(separador, posicoes[meio], fim_busca)) >= 0:
+            j = bisect_left(posicoes, k + len(separador), meio, limite + 1)
+            if j <= limite:
+                return j
+            fim_busca = k
+    return limite
+
+def _unidades(paginas, modelo, max_tokens, max_pedaco):
+    """
+    Gera (página, texto, tokens, posições) de cada unidade do documento, com as
+    posições dos tokens relativas ao texto da unidade. Unidades maiores que
+    max_tokens são quebradas em pedaços de até max_pedaco tokens. Cada página é tokenizada
+    uma vez e cortada nas posições dos tokens, sem codificar de novo.
+    """
+    for pagina, texto in paginas:
+        ids, posicoes = tokenizar(texto, modelo)
+        if not ids:
+            continue
+        inicios = _fronteiras(texto, posicoes)
+        for a, b in zip(inicios, inicios[1:] + [len(ids)]):
+            for inicio, fim in _quebrar(texto, posicoes, a, b, max_tokens if b - a <= max_tokens else max_pedaco):
+                fim_texto = posicoes[fim] if fim < len(posicoes) else len(texto)
+                deslocamento = posicoes[inicio]
+                yield (pagina, texto[deslocamento:fim_texto], fim - inicio,
+                       [p - deslocamento for p in posicoes[inicio:fim]])
+
+def dividir_documento(paginas, max_tokens=3000, sobreposicao=200, modelo="gpt-4o-mini", por_pagina=False):
+    """
+    Gera os chunks (Chunk) de um documento, lendo as páginas sob demanda.
+    Cada chunk tem até max_tokens e repete no início as últimas unidades do anterior,
+    até sobreposicao tokens; se nem a última unidade couber, repete os seus últimos
+    sobreposicao tokens. Com por_pagina, nenhum chunk atravessa uma página
+    (usado pelo chat, que guarda a página de cada trecho).
+    """
+    atual = []          # unidades do chunk em montagem: (página, texto, tokens, início, posições)
+    tokens_atual = 0
+    posicao = 0
+
+    def fechar():
+        return Chunk(
+            pagina=atual[0][0],
+            texto="".join(unidade[1] for unidade in atual),
+            tokens=tokens_atual,
+            inicio=atual[0][3],
+            fim=atual[-1][3] + atual[-1][2]
+        )
+
+    def sobra():
+        """
+        Últimas unidades do chunk fechado que cabem na sobreposição ou, se a última
+        já não couber (ex.: um pedaço de uma unidade grande), os seus últimos tokens.
+        """
+        mantidas, tokens = [], 0
+        for unidade in reversed(atual):
+            if tokens + unidade[2] > sobreposicao:
+                break
+            mantidas.insert(0, unidade)
+            tokens += unidade[2]
+        if not mantidas and sobreposicao > 0:
+            pagina, texto, quantidade, inicio, posicoes = atual[-1]
+            corte = quantidade - sobreposicao
+            mantidas = [(pagina, texto[posicoes[corte]:], sobreposicao, inicio + corte,
+                         [p - posicoes[corte] for p in posicoes[corte:]])]
+            tokens = sobreposicao
+        return mantidas, tokens
+
+    # Unidades maiores que o limite são quebradas em pedaços que ainda deixam
+    # espaço para a sobreposição com o pedaço anterior
+    max_pedaco = max_tokens - min(sobreposicao, max_tokens // 2)
+    novas = []
+    for pagina, texto, tokens, posicoes in _unidades(paginas, modelo, max_tokens, max_pedaco):
+        mudou_pagina = por_pagina and atual and atual[-1][0] != pagina
+        if atual and (mudou_pagina or tokens_atual + tokens > max_tokens):
+            if novas:
+                yield fechar()
+            if mudou_pagina:
+                atual, tokens_atual = [], 0
+            else:
+                atual, tokens_atual = sobra()
+                if tokens_atual + tokens > max_tokens:
+                    atual, tokens_atual = [], 0
+            novas = []
+        atual.append((pagina, texto, tokens, posicao, posicoes))
+        novas.append(posicao)
+        tokens_atual += tokens
+        posicao += tokens
+    if novas:
+        yield fechar()
+
+def dividir_documento_com_cache(doc_hash, paginas, max_tokens=3000, sobreposicao=200, modelo="gpt-4o-mini",
+                                por_pagina=False, variante=""):
+    """
+    Igual a dividir_documento, mas guarda a divisão por hash do documento (e pelos
+    parâmetros e pela versão do extrator de texto): da segunda vez em diante, as
+    páginas nem são lidas.
+    variante distingue divisões de textos derivados do documento (ex.: só os trechos
+    com prazos). Sem doc_hash, apenas divide. Retorna a lista de Chunk.
+    """
+    if not doc_hash:
+        return list(dividir_documento(paginas, max_tokens, sobreposicao, modelo, por_pagina))
+
+    enc = obter_codificador(modelo)
+    chave = f"{doc_hash}:{variante}:{enc.name}:{max_tokens}:{sobreposicao}:{int(por_pagina)}:v{DIVISAO_VERSAO}:e{EXTRATOR_VERSAO}"
+    guardada = cache_divisoes.obter(chave)
+    if guardada is not None:
+        return [Chunk(**c) for c in json.loads(guardada)]
+
+    chunks = list(dividir_documento(paginas, max_tokens, sobreposicao, modelo, por_pagina))
+    cache_divisoes.salvar(chave, json.dumps([asdict(c) for c in chunks], ensure_ascii=False).encode("utf-8"))
+    return chunks
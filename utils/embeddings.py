@@ -0,0 +1,119 @@
+import hashlib
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import openai
+from langchain_core.embeddings import Embeddings
+from utils.cache_disco import CacheDisco
+from utils.cliente_openai import criar_cliente_openai
+from utils.config import (
+    DIRETORIO_CACHE, EMBEDDINGS_CACHE_LIMITE_MB, EMBEDDINGS_TAMANHO_LOTE,
+    EMBEDDINGS_MAX_SIMULTANEOS, EMBEDDINGS_TENTATIVAS
+)
+
+# Erros transitórios da API que valem nova tentativa
+ERROS_TRANSITORIOS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+cache_embeddings = CacheDisco(
+    os.path.join(DIRETORIO_CACHE, "embeddings.sqlite3"),
+    limite_bytes=EMBEDDINGS_CACHE_LIMITE_MB * 1024 * 1024
+)
+
+
+def normalizar_chunk(texto: str) -> str:
+    """Normaliza espaços em branco para que chunks iguais gerem a mesma chave."""
+    return re.sub(r'\s+', ' ', texto).strip()
+
+class EmbeddingsComCache(Embeddings):
+    """
+    Embeddings da OpenAI com cache em disco por chunk.
+    Cada chunk normalizado é identificado pelo seu SHA-256; só os que não estão
+    no cache são enviados à API, em lotes paralelos e com novas tentativas.
+    Mantém em estatisticas a contagem de acertos, faltas e tokens enviados.
+    Com uma tarefa em segundo plano, o cancelamento é verificado a cada lote
+    (os lotes já gerados ficam no cache).
+    """
+
+    def __init__(self, model="text-embedding-ada-002", tamanho_lote=EMBEDDINGS_TAMANHO_LOTE,
+                 max_simultaneos=EMBEDDINGS_MAX_SIMULTANEOS, tentativas=EMBEDDINGS_TENTATIVAS, tarefa=None):
+        self.model = model
+        self.tarefa = tarefa
+        self.tamanho_lote = tamanho_lote
+        self.max_simultaneos = max_simultaneos
+        self.tentativas = tentativas
+        self.estatisticas = {"acertos": 0, "faltas": 0, "tokens": 0}
+
+    def _chave(self, texto):
+        return f"{self.model}:{hashlib.sha256(texto.encode('utf-8')).hexdigest()}"
+
+    def embed_documents(self, texts):
+        textos = [normalizar_chunk(t) for t in texts]
+        chaves = [self._chave(t) for t in textos]
+
+        encontrados = cache_embeddings.obter_varios(list(set(chaves)))
+        vetores = {chave: np.frombuffer(valor, dtype=np.float32) for chave, valor in encontrados.items()}
+
+        # Chunks repetidos dentro do mesmo pedido são enviados uma vez só
+        faltantes = {}
+        for chave, texto in zip(chaves, textos):
+            if chave not in vetores:
+                faltantes.setdefault(chave, texto)
+
+        self.estatisticas["acertos"] += len(chaves) - len(faltantes)
+        self.estatisticas["faltas"] += len(faltantes)
+
+        if faltantes:
+            itens = list(faltantes.items())
+            lotes = [itens[i:i + self.tamanho_lote] for i in range(0, len(itens), self.tamanho_lote)]
+            with ThreadPoolExecutor(max_workers=self.max_simultaneos) as executor:
+                futuros = [executor.submit(self._gerar_lote, lote) for lote in lotes]
+                try:
+                    for futuro in futuros:
+                        novos, tokens = futuro.result()
+                        self.estatisticas["tokens"] += tokens
+                        cache_embeddings.salvar_varios(
+                            (chave, vetor.tobytes()) for chave, vetor in novos.items()
+                        )
+                        vetores.update(novos)
+                        if self.tarefa is not None:
+                            self.tarefa.verificar_cancelamento()
+                except BaseException:
+                    # Os lotes que ainda não começaram não são mais enviados
+                    for futuro in futuros:
+                        futuro.cancel()
+                    raise
+
+        return [vetores[chave].tolist() for chave in chaves]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def _gerar_lote(self, lote):
+        """
+        Envia um lote de chunks à API, com espera exponencial e aleatória
+        entre tentativas em caso de erro transitório.
+        Retorna ({chave: vetor}, tokens enviados).
+        """
+        client = criar_cliente_openai().with_options(max_retries=0)
+        for tentativa in range(self.tentativas):
+            try:
+                resposta = client.embeddings.create(model=self.model, input=[texto for _, texto in lote])
+                break
+            except ERROS_TRANSITORIOS:
+                if tentativa == self.tentativas - 1:
+                    raise
+                time.sleep(min(60, 2 ** tentativa) + random.uniform(0, 1))
+
+        novos = {
+            chave: np.asarray(item.embedding, dtype=np.float32)
+            for (chave, _), item in zip(lote, sorted(resposta.data, key=lambda d: d.index))
+        }
+        return novos, resposta.usage.total_tokens
@@ -0,0 +1,217 @@
+import math
+import multiprocessing
+import queue
+import signal
+import threading
+from collections import deque
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+from utils.extrair_texto import gerar_paginas_por_formato, extrair_texto
+from utils.config import (
+    EXTRACAO_PROCESSOS, EXTRACAO_TIMEOUT, EXTRACAO_LIMITE_MEMORIA_MB, EXTRACAO_PAGINAS_POR_TAREFA
+)
+
+# ----- SERVIÇO DE EXTRAÇÃO EM PROCESSOS -----
+# A extração roda em processos separados, para não prender o GIL do processo
+# do Streamlit. Cada processo atende uma tarefa por vez, com limite de memória;
+# o tempo máximo de cada tarefa conta a partir do momento em que ela começa a
+# rodar (a espera por um processo livre não conta). Um processo travado ou
+# morto é encerrado e substituído sozinho, sem afetar as tarefas dos outros.
+
+# Folga (em segundos) sobre o tempo máximo antes de encerrar um processo que não respondeu
+FOLGA_TIMEOUT = 5
+
+_pool = None
+_trava = threading.Lock()
+
+
+class ErroExtracao(Exception):
+    """Falha do processo de extração (ex.: encerrado ao passar do limite de memória)."""
+
+
+class ExtracaoExcedeuTempo(ErroExtracao, TimeoutError):
+    pass
+
+
+def _inicializar_processo(limite_memoria_mb):
+    """Aplica o limite de memória no processo de extração (apenas em sistemas Unix)."""
+    if not limite_memoria_mb:
+        return
+    try:
+        import resource
+        limite = limite_memoria_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def _interromper(signum, frame):
+    raise ExtracaoExcedeuTempo("Tempo máximo de extração excedido.")
+
+def _executar_com_timeout(timeout, funcao, *args):
+    """
+    Executa a função dentro do processo de extração, interrompendo-a com SIGALRM
+    se passar de timeout segundos (onde o sinal existir).
+    """
+    if not hasattr(signal, "SIGALRM"):
+        return funcao(*args)
+    signal.signal(signal.SIGALRM, _interromper)
+    signal.alarm(max(1, math.ceil(timeout)))
+    try:
+        return funcao(*args)
+    finally:
+        signal.alarm(0)
+
+def _trabalhador(conexao, limite_memoria_mb):
+    """Laço de um processo de extração: recebe (função, args, timeout) e devolve (ok, resultado ou erro)."""
+    _inicializar_processo(limite_memoria_mb)
+    while True:
+        try:
+            funcao, args, timeout = conexao.recv()
+        except EOFError:
+            return
+        try:
+            resposta = (True, _executar_com_timeout(timeout, funcao, *args))
+        except Exception as e:
+            resposta = (False, e)
+        try:
+            conexao.send(resposta)
+        except Exception as e:
+            # Resultado ou erro que não pode ser serializado
+            conexao.send((False, ErroExtracao(f"Resposta inválida do processo de extração: {e!r}")))
+
+def _paginas_arquivo(conteudo, ext):
+    return list(gerar_paginas_por_formato(BytesIO(conteudo), ext))
+
+def _paginas_pdf(conteudo, inicio, fim):
+    with fitz.open(stream=conteudo, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(inicio, fim)]
+
+def _contar_paginas_pdf(conteudo):
+    with fitz.open(stream=conteudo, filetype="pdf") as doc:
+        return doc.page_count
+
+
+class _Processo:
+    """Um processo de extração e a conexão com ele."""
+
+    def __init__(self, contexto):
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(
+            target=_trabalhador, args=(conexao_filho, EXTRACAO_LIMITE_MEMORIA_MB), daemon=True
+        )
+        self.processo.start()
+        conexao_filho.close()
+
+    def encerrar(self):
+        # Processos presos em código nativo não respondem ao SIGALRM: encerra à força
+        self.processo.kill()
+        self.processo.join()
+        self.conexao.close()
+
+
+class PoolExtracao:
+    """Processos de extração compartilhados por todas as chamadas do processo do Streamlit."""
+
+    def __init__(self, max_processos=EXTRACAO_PROCESSOS):
+        self._contexto = multiprocessing.get_context("spawn")
+        self._vagas = threading.BoundedSemaphore(max_processos)
+        self._livres = queue.LifoQueue()
+
+    def _obter_processo(self):
+        while True:
+            try:
+                processo = self._livres.get_nowait()
+            except queue.Empty:
+                return _Processo(self._contexto)
+            if processo.processo.is_alive():
+                return processo
+            processo.encerrar()
+
+    def executar(self, funcao, *args, timeout=EXTRACAO_TIMEOUT):
+        """
+        Executa funcao(*args) em um processo livre (esperando por um, se preciso)
+        e retorna o resultado. Se a tarefa passar de timeout segundos, só o processo
+        dela é encerrado e ExtracaoExcedeuTempo é levantada; se o processo morrer,
+        levanta ErroExtracao. Erros da própria função são repassados.
+        """
+        with self._vagas:
+            processo = self._obter_processo()
+            try:
+                processo.conexao.send((funcao, args, timeout))
+                respondeu = processo.conexao.poll(timeout + FOLGA_TIMEOUT)
+                if respondeu:
+                    ok, resultado = processo.conexao.recv()
+            except (EOFError, OSError) as e:
+                # O processo morreu no meio da tarefa (por exemplo, ao passar do limite de memória)
+                processo.encerrar()
+                raise ErroExtracao("O processo de extração foi encerrado antes de terminar.") from e
+            if not respondeu:
+                processo.encerrar()
+                raise ExtracaoExcedeuTempo("Tempo máximo de extração excedido.")
+            self._livres.put(processo)
+        if not ok:
+            raise resultado
+        return resultado
+
+
+def obter_pool():
+    """Retorna o pool de processos de extração, criando-o na primeira chamada."""
+    global _pool
+    with _trava:
+        if _pool is None:
+            _pool = PoolExtracao()
+        return _pool
+
+def gerar_paginas_em_processos(conteudo, ext, timeout=EXTRACAO_TIMEOUT,
+                               paginas_por_tarefa=EXTRACAO_PAGINAS_POR_TAREFA):
+    """
+    Extrai o texto de um arquivo no pool de processos e gera as páginas na ordem
+    original, à medida que ficam prontas. PDFs são divididos em faixas de páginas
+    extraídas em paralelo, com no máximo EXTRACAO_PROCESSOS faixas em andamento
+    (só essas páginas ficam na memória de cada vez); os outros formatos são
+    extraídos em uma tarefa só. Levanta ExtracaoExcedeuTempo se uma tarefa passar
+    do tempo e ErroExtracao se o processo dela morrer.
+    """
+    pool = obter_pool()
+
+    if ext != "pdf":
+        yield from pool.executar(_paginas_arquivo, conteudo, ext, timeout=timeout)
+        return
+
+    total_paginas = pool.executar(_contar_paginas_pdf, conteudo, timeout=timeout)
+    faixas = [
+        (inicio, min(inicio + paginas_por_tarefa, total_paginas))
+        for inicio in range(0, total_paginas, paginas_por_tarefa)
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, min(len(faixas), EXTRACAO_PROCESSOS))) as executor:
+        em_andamento = deque()
+        try:
+            for inicio, fim in faixas:
+                if len(em_andamento) >= EXTRACAO_PROCESSOS:
+                    yield from em_andamento.popleft().result()
+                em_andamento.append(executor.submit(pool.executar, _paginas_pdf, conteudo, inicio, fim, timeout=timeout))
+            while em_andamento:
+                yield from em_andamento.popleft().result()
+        finally:
+            # Leitura interrompida (ou erro): as faixas que ainda não começaram não são extraídas
+            for futuro in em_andamento:
+                futuro.cancel()
+
+def extrair_varios(arquivos, max_simultaneos=EXTRACAO_PROCESSOS):
+    """
+    Extrai (e grava no cache em disco) o texto de vários arquivos em paralelo.
+    Retorna um dicionário {nome: erro} com os arquivos que falharam.
+    """
+    def extrair(arq):
+        extrair_texto(BytesIO(arq["content"]), arq["name"])
+
+    erros = {}
+    with ThreadPoolExecutor(max_workers=max_simultaneos) as executor:
+        futuros = {executor.submit(extrair, arq): arq["name"] for arq in arquivos}
+        for futuro, nome in futuros.items():
+            try:
+                futuro.result()
+            except Exception as e:
+                erros[nome] = e
+    return erros
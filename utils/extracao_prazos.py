@@ -0,0 +1,117 @@
+from io import BytesIO
+from itertools import tee
+from utils.extrair_texto import extrair_paginas, calcular_hash
+from utils.llm import mapear_sob_demanda
+from utils.divisao import dividir_documento_com_cache
+from utils.cliente_openai import criar_cliente_openai
+from utils.cache_llm import completar_com_cache
+from utils.candidatos_prazos import pre_extrair_prazos
+from utils.tabela_prazos import (
+    interpretar_prazo, calcular_datas_relativas, salvar_prazos_documento, carregar_prazos_documento
+)
+from utils.config import PRAZOS_MAX_SIMULTANEOS, PRAZOS_PRE_EXTRACAO, PRAZOS_JANELA_CARACTERES, DIVISAO_MAX_TOKENS, DIVISAO_SOBREPOSICAO
+from prompts import PROMPT_PRAZOS
+
+# ----- EXTRAÇÃO DE PRAZOS -----
+# Núcleo sem interface, usado pela página de prazos (utils.prazos) e pelo
+# processamento em lote.
+
+
+def limitar_prazos(texto: str, max_itens: int = 10) -> list:
+    """
+    Filtra linhas que começam com marcadores típicos de tópicos de prazos.
+    Retorna até max_itens prazos encontrados.
+    """
+    linhas = [
+        linha.strip("-•– ").strip()
+        for linha in texto.splitlines()
+        if linha.strip().startswith(("-", "•", "–"))
+    ]
+    return linhas[:max_itens] if linhas else []
+
+def dividir_para_prazos(paginas, modelo, limite_inteiro=10000, max_tokens=DIVISAO_MAX_TOKENS, doc_hash=None,
+                        variante=""):
+    """
+    Documentos (ou trechos) de até limite_inteiro tokens são enviados inteiros;
+    maiores são divididos em chunks de max_tokens nas cláusulas e seções.
+    A divisão fica em cache por doc_hash (e variante).
+    """
+    # As páginas só são lidas (e guardadas para a segunda divisão) se a divisão não estiver em cache
+    inteiro, paginas = tee(paginas)
+    chunks = dividir_documento_com_cache(doc_hash, inteiro, limite_inteiro, 0, modelo, variante=variante)
+    if len(chunks) <= 1:
+        return [chunks[0].texto if chunks else ""]
+    chunks = dividir_documento_com_cache(doc_hash, paginas, max_tokens, DIVISAO_SOBREPOSICAO, modelo, variante=variante)
+    return [chunk.texto for chunk in chunks]
+
+def extrair_prazos_parte(client, parte, modelo):
+    """Envia uma parte do documento ao modelo e retorna os prazos encontrados nela."""
+    prompt = f"""{PROMPT_PRAZOS}
+
+Texto:
+\"\"\"{parte}\"\"\"
+"""
+    conteudo = completar_com_cache(client, [{"role": "user", "content": prompt}], modelo, temperature=0.2)
+
+    topicos = limitar_prazos(conteudo)
+    return [
+        t for t in topicos
+        if "não especificado" not in t.lower()
+        and "ver cláusula" not in t.lower()
+        and len(t.split(":")) > 1
+    ]
+
+def extrair_linhas_prazos(file, filename, modelo="gpt-3.5-turbo", max_simultaneos=PRAZOS_MAX_SIMULTANEOS, doc_hash=None,
+                          tarefa=None):
+    """
+    Extrai os prazos de um documento usando o prompt específico.
+    Antes, as datas e períodos são procurados por regras: prazos simples são
+    resolvidos localmente e só os trechos em volta dos demais vão para o modelo.
+    Divide texto em partes se for muito longo para evitar limite de tokens;
+    as partes são enviadas ao modelo em paralelo. Com doc_hash, a divisão vem do cache.
+    Com uma tarefa em segundo plano, o cancelamento é verificado entre as partes
+    e o progresso da tarefa avança a cada parte concluída.
+    Retorna (linhas "Evento: prazo" sem duplicatas, mensagens de erro das partes que falharam).
+    """
+    paginas = extrair_paginas(file, filename)
+    prazos_locais = []
+    variante = ""
+    if PRAZOS_PRE_EXTRACAO:
+        prazos_locais, paginas = pre_extrair_prazos(paginas)
+        if not paginas:
+            return list(dict.fromkeys(prazos_locais)), []
+        variante = f"trechos-prazos-{PRAZOS_JANELA_CARACTERES}"
+
+    partes = dividir_para_prazos(paginas, modelo, doc_hash=doc_hash, variante=variante)
+    client = criar_cliente_openai()
+
+    def processar(item):
+        i, parte = item
+        try:
+            return extrair_prazos_parte(client, parte, modelo), None
+        except Exception as e:
+            return [], f"Erro ao processar parte {i+1}: {e}"
+
+    resultados = mapear_sob_demanda(processar, enumerate(partes), max_simultaneos, tarefa, total=len(partes))
+    prazos_extraidos = prazos_locais + [prazo for prazos, _ in resultados for prazo in prazos]
+    erros = [erro for _, erro in resultados if erro]
+    return list(dict.fromkeys(prazos_extraidos)), erros
+
+def extrair_prazos_documento(conteudo, nome, modelo="gpt-3.5-turbo", tarefa=None):
+    """
+    Retorna os prazos estruturados (lista de Prazo) de um documento.
+    Documentos já processados são lidos da tabela de prazos, sem chamar a API;
+    os novos são extraídos, têm as datas relativas calculadas e são gravados nela.
+    Retorna (prazos, erros).
+    """
+    doc_hash = calcular_hash(conteudo)
+    prazos = carregar_prazos_documento(doc_hash, modelo)
+    if prazos is not None:
+        return prazos, []
+
+    linhas, erros = extrair_linhas_prazos(BytesIO(conteudo), nome, modelo, doc_hash=doc_hash, tarefa=tarefa)
+    prazos = calcular_datas_relativas([interpretar_prazo(linha, nome, doc_hash, modelo) for linha in linhas])
+    # Com partes que falharam, o resultado fica fora da tabela para ser refeito depois
+    if not erros:
+        salvar_prazos_documento(doc_hash, modelo, prazos)
+    return prazos, erros
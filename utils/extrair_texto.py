@@ -3,40 +3,136 @@ import fitz  # PyMuPDF
 import docx
 from pptx import Presentation
 from io import BytesIO
-import streamlit as st
+import hashlib
+import json
+import os
+from utils.cache_disco import CacheDisco
+from utils.config import DIRETORIO_CACHE, EXTRACAO_CACHE_LIMITE_MB, EXTRACAO_EM_PROCESSOS
+
+# Incrementar sempre que a forma de extração mudar, para invalidar o cache em disco
+EXTRATOR_VERSAO = "2"
+
+FORMATOS_SUPORTADOS = ("pdf", "docx", "txt", "pptx", "xlsx")
+
+# O cache guarda cada página em uma entrada própria ("<chave>:<n>") e um
+# manifesto ("<chave>") com o total de páginas, para permitir leitura página a página
+# Páginas extraídas gravadas no cache por transação
+PAGINAS_POR_GRAVACAO = 50
+
+cache_textos = CacheDisco(
+    os.path.join(DIRETORIO_CACHE, "extracao.sqlite3"),
+    limite_bytes=EXTRACAO_CACHE_LIMITE_MB * 1024 * 1024
+)
+
+def calcular_hash(conteudo: bytes) -> str:
+    """Retorna o SHA-256 (hexadecimal) do conteúdo de um arquivo."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+def _chave_documento(conteudo, ext):
+    return f"{calcular_hash(conteudo)}:{ext}:{EXTRATOR_VERSAO}"
+
+def _paginas_com_cache(conteudo, ext, chave):
+    """
+    Gera (número da página, texto) a partir do cache em disco. Se o documento
+    não estiver lá (ou alguma página tiver sido descartada), extrai no pool de
+    processos (com tempo máximo e limite de memória; ver gerar_paginas_em_processos)
+    ou, com EXTRACAO_EM_PROCESSOS desligado (e para TXT), no próprio processo.
+    Nos dois casos as páginas são entregues e gravadas no cache à medida que
+    ficam prontas, sem montar o documento inteiro na memória.
+    """
+    proxima = 1
+    manifesto = cache_textos.obter(chave)
+    if manifesto is not None:
+        total = json.loads(manifesto)["paginas"]
+        while proxima <= total:
+            texto = cache_textos.obter(f"{chave}:{proxima}")
+            if texto is None:
+                break
+            yield proxima, texto.decode("utf-8")
+            proxima += 1
+        else:
+            return
+
+    if EXTRACAO_EM_PROCESSOS and ext != "txt":
+        from utils.extracao_paralela import gerar_paginas_em_processos
+        paginas = gerar_paginas_em_processos(conteudo, ext)
+    else:
+        paginas = gerar_paginas_por_formato(BytesIO(conteudo), ext)
+
+    pendentes, total = [], 0
+    for numero, texto in enumerate(paginas, start=1):
+        pendentes.append((f"{chave}:{numero}", texto.encode("utf-8")))
+        total = numero
+        if len(pendentes) >= PAGINAS_POR_GRAVACAO:
+            cache_textos.salvar_varios(pendentes)
+            pendentes = []
+        if numero >= proxima:
+            yield numero, texto
+    # O manifesto só é gravado quando todas as páginas já estão no cache
+    pendentes.append((chave, json.dumps({"paginas": total}).encode("utf-8")))
+    cache_textos.salvar_varios(pendentes)
+
+def extrair_paginas(file, filename: str):
+    """
+    Gera (número da página, texto) sob demanda; do cache, lê uma página por vez.
+    Em PDFs cada item é uma página; em PPTX, um slide; em XLSX, uma planilha;
+    DOCX e TXT são tratados como uma página só.
+    """
+    ext = filename.split('.')[-1].lower()
+    if ext not in FORMATOS_SUPORTADOS:
+        yield 1, "Formato não suportado."
+        return
+
+    conteudo = file.read()
+    yield from _paginas_com_cache(conteudo, ext, _chave_documento(conteudo, ext))
 
-@st.cache_data(show_spinner="Extraindo texto...")
 def extrair_texto(file, filename: str):
     """
     Função principal para extrair texto de vários formatos de arquivo.
-    Detecta a extensão do arquivo e chama a função específica.
+    Consulta primeiro o cache em disco, chaveado pelo SHA-256 do arquivo
+    e pela versão do extrator; só extrai de novo se o texto não estiver lá.
+    A extração em si roda no pool de processos (utils.extracao_paralela).
     """
     ext = filename.split('.')[-1].lower()
+    if ext not in FORMATOS_SUPORTADOS:
+        return "Formato não suportado."
 
+    conteudo = file.read()
+    return "".join(texto for _, texto in _paginas_com_cache(conteudo, ext, _chave_documento(conteudo, ext)))
+
+def gerar_paginas_por_formato(file, ext: str):
+    """
+    Detecta a extensão do arquivo e gera o texto de cada página, sem usar cache.
+    """
     if ext == "pdf":
-        return extract_pdf(file)
+        yield from paginas_pdf(file)
     elif ext == "docx":
-        return extract_docx(file)
+        yield extract_docx(file)
     elif ext == "txt":
-        return file.read().decode("utf-8")
+        yield file.read().decode("utf-8")
     elif ext == "pptx":
-        return extract_pptx(file)
+        yield from paginas_pptx(file)
     elif ext == "xlsx":
-        return extract_xlsx(file)
+        yield from paginas_xlsx(file)
     else:
-        return "Formato não suportado."
+        yield "Formato não suportado."
+
+def paginas_pdf(file_obj):
+    """
+    Gera o texto de cada página de um PDF, uma de cada vez, usando PyMuPDF (fitz).
+    """
+    file_bytes = file_obj.read()
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        for page in doc:
+            yield page.get_text()
 
-@st.cache_data
 def extract_pdf(file_obj):
     """
     Extrai texto de arquivo PDF usando PyMuPDF (fitz).
     Lê todas as páginas e concatena o texto.
     """
-    file_bytes = file_obj.read()
-    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
-        return "".join([page.get_text() for page in doc])
+    return "".join(paginas_pdf(file_obj))
 
-@st.cache_data
 def extract_docx(file_obj):
     """
     Extrai texto de arquivo DOCX usando python-docx.
@@ -59,29 +155,38 @@ def extract_docx(file_obj):
 
     return "\n".join(textos)
 
-@st.cache_data
-def extract_pptx(file_obj):
+def paginas_pptx(file_obj):
     """
-    Extrai texto de apresentações PPTX usando python-pptx.
-    Percorre slides e formas, extraindo texto de cada forma que tenha atributo text.
+    Gera o texto de cada slide de uma apresentação PPTX usando python-pptx.
+    Percorre as formas do slide, extraindo texto de cada forma que tenha atributo text.
     """
-    texto = ""
     for slide in Presentation(file_obj).slides:
+        texto = ""
         for shape in slide.shapes:
             if hasattr(shape, "text"):
                 texto += shape.text + "\n"
-    return texto
+        yield texto
 
-@st.cache_data
-def extract_xlsx(file_obj):
+def extract_pptx(file_obj):
     """
-    Extrai texto de planilhas XLSX usando pandas.
-    Para cada aba, converte o conteúdo em string e concatena com cabeçalho da planilha.
+    Extrai texto de apresentações PPTX usando python-pptx.
+    Percorre slides e formas, extraindo texto de cada forma que tenha atributo text.
+    """
+    return "".join(paginas_pptx(file_obj))
+
+def paginas_xlsx(file_obj):
+    """
+    Gera o texto de cada aba de uma planilha XLSX usando pandas,
+    com o cabeçalho da planilha antes do conteúdo.
     """
     xls = pd.ExcelFile(file_obj)
-    texto = ""
     for sheet in xls.sheet_names:
         df = xls.parse(sheet)
-        texto += f"\n--- Planilha: {sheet} ---\n"
-        texto += df.astype(str).to_string(index=False)
-    return texto
+        yield f"\n--- Planilha: {sheet} ---\n" + df.astype(str).to_string(index=False)
+
+def extract_xlsx(file_obj):
+    """
+    Extrai texto de planilhas XLSX usando pandas.
+    Para cada aba, converte o conteúdo em string e concatena com cabeçalho da planilha.
+    """
+    return "".join(paginas_xlsx(file_obj))
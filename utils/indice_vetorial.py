@@ -0,0 +1,281 @@
+import json
+import os
+import shutil
+import threading
+from io import BytesIO
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document as LCDocument
+from utils.divisao import dividir_documento_com_cache
+from utils.config import (
+    DIRETORIO_CACHE, CHAT_CHUNK_TOKENS, CHAT_CHUNK_SOBREPOSICAO, INDICE_LIMITE_FLAT, INDICE_TIPO_GRANDE,
+    INDICE_IVF_LISTAS, INDICE_IVF_NPROBE, INDICE_PQ_SUBVETORES, INDICE_HNSW_VIZINHOS, INDICE_HNSW_EF_BUSCA,
+    INDICE_FILTRO_EXATO_MAX
+)
+from utils.extrair_texto import extrair_paginas, calcular_hash
+
+# Incrementar sempre que a divisão em chunks mudar, para invalidar os índices salvos
+INDICE_VERSAO = "3"
+
+DIRETORIO_INDICES = os.path.join(DIRETORIO_CACHE, "indices")
+
+
+def dividir_para_busca(paginas, doc_hash=None):
+    """
+    Divide um documento em chunks para indexação, sem atravessar páginas, cortando
+    nas cláusulas, artigos e seções (ver utils.divisao). Recebe (página, texto) e
+    retorna (página, chunk); com doc_hash, a divisão vem do cache.
+    """
+    chunks = dividir_documento_com_cache(
+        doc_hash, paginas, CHAT_CHUNK_TOKENS, CHAT_CHUNK_SOBREPOSICAO, por_pagina=True
+    )
+    return [(chunk.pagina, chunk.texto) for chunk in chunks if chunk.texto.strip()]
+
+def _diretorio_indice(doc_hash, embeddings):
+    modelo = getattr(embeddings, "model", "embeddings").replace("/", "_")
+    return os.path.join(DIRETORIO_INDICES, f"{doc_hash}-{modelo}-v{INDICE_VERSAO}")
+
+def _ler_indice_faiss(caminho):
+    """
+    Lê o índice FAISS mapeando o arquivo em memória (mmap) quando a versão
+    do faiss permite; caso contrário, faz a leitura normal.
+    """
+    for flag in ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP"):
+        if hasattr(faiss, flag):
+            try:
+                return faiss.read_index(caminho, getattr(faiss, flag))
+            except RuntimeError:
+                continue
+    return faiss.read_index(caminho)
+
+def salvar_indice(diretorio, vectorstore):
+    """
+    Salva o índice FAISS e os chunks (texto, id e metadados) de um documento.
+    Grava em diretório temporário e renomeia, para nunca deixar um índice pela metade.
+    """
+    temporario = f"{diretorio}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(temporario, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(temporario, "index.faiss"))
+
+    chunks = []
+    for i in range(vectorstore.index.ntotal):
+        doc_id = vectorstore.index_to_docstore_id[i]
+        doc = vectorstore.docstore.search(doc_id)
+        chunks.append({"id": doc_id, "texto": doc.page_content, "metadados": doc.metadata})
+    with open(os.path.join(temporario, "chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False)
+
+    try:
+        os.replace(temporario, diretorio)
+    except OSError:
+        # Outro processo salvou o mesmo índice antes
+        shutil.rmtree(temporario, ignore_errors=True)
+
+def carregar_indice(diretorio, embeddings):
+    """Carrega do disco um índice salvo com salvar_indice. Retorna None se não existir."""
+    caminho_indice = os.path.join(diretorio, "index.faiss")
+    if not os.path.exists(caminho_indice):
+        return None
+
+    with open(os.path.join(diretorio, "chunks.json"), encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    docstore = InMemoryDocstore({
+        c["id"]: LCDocument(page_content=c["texto"], metadata=c["metadados"])
+        for c in chunks
+    })
+    index_to_docstore_id = {i: c["id"] for i, c in enumerate(chunks)}
+    return FAISS(embeddings, _ler_indice_faiss(caminho_indice), docstore, index_to_docstore_id)
+
+def obter_indice_documento(conteudo, nome, embeddings):
+    """
+    Retorna o índice FAISS de um documento, identificado pelo hash do conteúdo.
+    Procura primeiro no disco; só gera embeddings se o documento nunca foi indexado.
+    Os índices individuais não ficam na memória: o chat copia os vetores para o
+    índice único da sessão (ver mesclar_indices). Retorna None se o documento não tiver texto.
+    """
+    doc_hash = calcular_hash(conteudo)
+    diretorio = _diretorio_indice(doc_hash, embeddings)
+
+    vectorstore = carregar_indice(diretorio, embeddings)
+    if vectorstore is None:
+        chunks = dividir_para_busca(extrair_paginas(BytesIO(conteudo), nome), doc_hash)
+        if not chunks:
+            return None
+        vectorstore = FAISS.from_texts(
+            [chunk for _, chunk in chunks],
+            embeddings,
+            metadatas=[{"documento": nome, "hash": doc_hash, "pagina": pagina} for pagina, _ in chunks],
+            ids=[f"{doc_hash}:{i}" for i in range(len(chunks))]
+        )
+        salvar_indice(diretorio, vectorstore)
+    return vectorstore
+
+def adicionar_ao_indice(destino, indices):
+    """
+    Copia para o índice destino os vetores e chunks dos índices de documentos
+    informados, sem gerar embeddings de novo. Documentos que já estão no destino
+    (mesmos ids) são ignorados; os índices de origem não são alterados.
+    """
+    for vectorstore in indices:
+        total = vectorstore.index.ntotal
+        ids = [vectorstore.index_to_docstore_id[i] for i in range(total)]
+        if not ids or ids[0] in destino.docstore._dict:
+            continue
+        docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+        vetores = vectorstore.index.reconstruct_n(0, total)
+        destino.add_embeddings(
+            zip([doc.page_content for doc in docs], vetores),
+            metadatas=[dict(doc.metadata) for doc in docs],
+            ids=ids
+        )
+
+def criar_indice_faiss(vetores, tipo="flat"):
+    """
+    Fábrica dos índices FAISS (distância L2), treinados com os vetores informados
+    (que não são adicionados):
+    - "flat": exato, guarda os vetores inteiros (float32);
+    - "ivfpq": listas invertidas com quantização por produto; busca em INDICE_IVF_NPROBE listas;
+    - "hnsw": grafo HNSW com quantização escalar de 8 bits.
+    """
+    vetores = np.ascontiguousarray(vetores, dtype=np.float32)
+    total, dimensao = vetores.shape
+    if tipo == "flat":
+        return faiss.IndexFlatL2(dimensao)
+
+    if tipo == "ivfpq":
+        # Cada lista precisa de dezenas de vetores de treino; a PQ, de 256 por subquantizador
+        listas = INDICE_IVF_LISTAS or int(4 * np.sqrt(total))
+        listas = max(1, min(listas, total // 39))
+        # Subvetores de ao menos 16 dimensões (menores treinam devagar e quantizam mal)
+        subvetores = max(
+            m for m in range(1, min(INDICE_PQ_SUBVETORES, dimensao) + 1)
+            if dimensao % m == 0 and (dimensao // m >= 16 or m == 1)
+        )
+        bits = 8 if total >= 256 * 39 else max(1, int(np.log2(max(total // 39, 2))))
+        indice = faiss.index_factory(dimensao, f"IVF{listas},PQ{subvetores}x{bits}")
+        # O treino "polysemous" (só usado na busca por distância de Hamming) é a parte mais lenta
+        indice.do_polysemous_training = False
+        indice.train(vetores)
+        indice.nprobe = min(INDICE_IVF_NPROBE, listas)
+        # Permite reconstruir os vetores (usado no MMR da busca híbrida)
+        indice.make_direct_map()
+        return indice
+
+    if tipo == "hnsw":
+        indice = faiss.index_factory(dimensao, f"HNSW{INDICE_HNSW_VIZINHOS},SQ8")
+        indice.train(vetores)
+        indice.hnsw.efSearch = INDICE_HNSW_EF_BUSCA
+        return indice
+
+    raise ValueError(f"Tipo de índice desconhecido: {tipo}")
+
+def parametros_busca(indice, seletor, fracao=1.0):
+    """
+    Parâmetros de busca com o seletor de posições. nprobe/efSearch do índice são
+    divididos por fracao (a parte do índice que o seletor permite): com poucos
+    chunks permitidos, a busca precisa visitar mais listas ou nós para achá-los.
+    """
+    if isinstance(indice, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=seletor, nprobe=min(indice.nlist, int(np.ceil(indice.nprobe / fracao))))
+    if isinstance(indice, faiss.IndexHNSW):
+        ef_busca = indice.hnsw.efSearch
+        return faiss.SearchParametersHNSW(sel=seletor, efSearch=max(ef_busca, min(indice.ntotal, int(np.ceil(ef_busca / fracao)))))
+    return faiss.SearchParameters(sel=seletor)
+
+def otimizar_indice(destino, limite=INDICE_LIMITE_FLAT, tipo=INDICE_TIPO_GRANDE):
+    """
+    Quando um índice exato passa de limite chunks, troca-o por um índice do tipo
+    informado, treinado com os próprios vetores. As posições dos chunks não mudam.
+    Retorna True se o índice foi trocado.
+    """
+    if not isinstance(destino.index, faiss.IndexFlat) or destino.index.ntotal < limite or tipo == "flat":
+        return False
+    vetores = destino.index.reconstruct_n(0, destino.index.ntotal)
+    novo = criar_indice_faiss(vetores, tipo)
+    novo.add(vetores)
+    destino.index = novo
+    return True
+
+def aceita_remocao(destino):
+    """
+    Só o índice exato remove vetores renumerando as posições, como o
+    FAISS do LangChain espera; os treinados são reconstruídos sem os documentos.
+    """
+    return isinstance(destino.index, faiss.IndexFlat)
+
+def remover_do_indice(destino, doc_hashes):
+    """Remove do índice destino todos os chunks dos documentos com os hashes informados."""
+    ids = [
+        doc_id for doc_id in destino.index_to_docstore_id.values()
+        if doc_id.split(":")[0] in doc_hashes
+    ]
+    if ids:
+        destino.delete(ids)
+
+def mesclar_indices(indices, embeddings):
+    """
+    Junta vários índices de documentos em um novo índice FAISS, copiando os
+    vetores já calculados (sem gerar embeddings de novo). O novo índice é exato
+    até INDICE_LIMITE_FLAT chunks e, acima disso, treinado (ver otimizar_indice).
+    Os índices de origem não são alterados.
+    """
+    destino = FAISS(embeddings, faiss.IndexFlatL2(indices[0].index.d), InMemoryDocstore(), {})
+    adicionar_ao_indice(destino, indices)
+    otimizar_indice(destino)
+    return destino
+
+def definir_tipos(indice, tipos_por_hash):
+    """Grava nos metadados de cada chunk o tipo do seu documento (ou None, se não classificado)."""
+    for doc in indice.docstore._dict.values():
+        doc.metadata["tipo"] = tipos_por_hash.get(doc.metadata.get("hash"))
+
+def posicoes_filtradas(indice, filtro):
+    """
+    Posições (no FAISS) dos chunks cujos metadados batem com o filtro
+    ({campo: valores aceitos}, ex.: {"hash": {...}} ou {"tipo": {"Contrato"}}).
+    Sem filtro, retorna None (todas as posições).
+    """
+    if not filtro:
+        return None
+    return [
+        i for i, doc_id in indice.index_to_docstore_id.items()
+        if all(indice.docstore._dict[doc_id].metadata.get(campo) in valores for campo, valores in filtro.items())
+    ]
+
+def buscar_com_filtro(index, consulta, k, posicoes, exato_max=INDICE_FILTRO_EXATO_MAX):
+    """
+    Posições dos k vetores do índice FAISS (index) mais próximos da consulta, só
+    entre as posições permitidas. No índice exato, o seletor basta. Nos aproximados
+    (IVF-PQ, HNSW), a busca com seletor descarta os vizinhos não permitidos depois
+    de visitar as listas ou nós e, com um filtro pequeno, volta quase vazia; por
+    isso, até exato_max posições, a busca é exata sobre os vetores reconstruídos.
+    """
+    posicoes = np.asarray(posicoes, dtype=np.int64)
+    k = min(k, len(posicoes))
+    if not k:
+        return []
+    seletor = faiss.IDSelectorBatch(posicoes)
+    if isinstance(index, faiss.IndexFlat):
+        _, indices = index.search(consulta, k, params=parametros_busca(index, seletor))
+    elif len(posicoes) <= exato_max:
+        _, indices = faiss.knn(consulta, index.reconstruct_batch(posicoes), k, metric=index.metric_type)
+        return [int(posicoes[i]) for i in indices[0] if i >= 0]
+    else:
+        fracao = len(posicoes) / index.ntotal
+        _, indices = index.search(consulta, k, params=parametros_busca(index, seletor, fracao))
+    return [int(i) for i in indices[0] if i >= 0]
+
+def buscar_por_vetor(indice, vetor, k, posicoes=None):
+    """
+    Retorna as posições dos k chunks mais próximos do vetor. Com posicoes, a busca
+    é feita só entre elas (ver buscar_com_filtro): os k resultados vêm sempre
+    dos chunks permitidos, por menor que seja a parte deles no índice.
+    """
+    consulta = np.array([vetor], dtype=np.float32)
+    if posicoes is not None:
+        return buscar_com_filtro(indice.index, consulta, k, posicoes)
+    _, indices = indice.index.search(consulta, min(k, indice.index.ntotal))
+    return [int(i) for i in indices[0] if i >= 0]
@@ -0,0 +1,82 @@
+import zipfile
+from io import BytesIO
+from utils.extrair_texto import FORMATOS_SUPORTADOS
+from utils.config import (
+    ZIP_MAX_MEMBRO_MB, ZIP_MAX_TOTAL_MB, ZIP_MAX_ARQUIVOS, ZIP_MAX_RAZAO_COMPRESSAO, ZIP_MAX_PROFUNDIDADE
+)
+
+
+def _ignorar(caminho):
+    """Pastas e arquivos de sistema que não são documentos (ex.: __MACOSX, .DS_Store)."""
+    partes = caminho.split("/")
+    return "__MACOSX" in partes or any(parte.startswith(".") for parte in partes)
+
+def caminho_no_zip(caminho):
+    """
+    Caminho do documento dentro do zip mais interno, sem o nome dos zips
+    (ex.: "edital_12.zip/Contratos/contrato.pdf" -> "Contratos/contrato.pdf").
+    Nomes de arquivos enviados fora de um zip ficam iguais.
+    """
+    partes = caminho.split("/")
+    ultimo_zip = max((i for i, parte in enumerate(partes[:-1]) if parte.lower().endswith(".zip")), default=-1)
+    return "/".join(partes[ultimo_zip + 1:])
+
+def expandir_zip(conteudo, nome_zip, avisos=None, _estado=None, _profundidade=0):
+    """
+    Percorre um arquivo zip (e zips dentro dele) gerando (caminho, conteúdo) de cada
+    documento suportado, um de cada vez, sem descompactar tudo na memória.
+    O caminho mantém o nome do zip e as pastas (ex.: "pacote.zip/Edital/anexo.pdf"),
+    para exibição; as heurísticas pelo nome usam só caminho_no_zip.
+    Arquivos que passam dos limites de tamanho, quantidade, razão de compressão
+    ou profundidade são ignorados, com uma mensagem em avisos.
+    """
+    avisos = avisos if avisos is not None else []
+    estado = _estado if _estado is not None else {"total": 0, "arquivos": 0}
+    max_membro = ZIP_MAX_MEMBRO_MB * 1024 * 1024
+    max_total = ZIP_MAX_TOTAL_MB * 1024 * 1024
+
+    try:
+        arquivo_zip = zipfile.ZipFile(BytesIO(conteudo))
+    except zipfile.BadZipFile:
+        avisos.append(f"{nome_zip}: arquivo zip inválido.")
+        return
+
+    with arquivo_zip:
+        for info in arquivo_zip.infolist():
+            caminho = f"{nome_zip}/{info.filename}"
+            if info.is_dir() or _ignorar(info.filename):
+                continue
+
+            ext = info.filename.split('.')[-1].lower()
+            if ext != "zip" and ext not in FORMATOS_SUPORTADOS:
+                continue
+
+            if estado["arquivos"] >= ZIP_MAX_ARQUIVOS:
+                avisos.append(f"{nome_zip}: limite de {ZIP_MAX_ARQUIVOS} arquivos atingido; o restante foi ignorado.")
+                return
+            if info.file_size > max_membro:
+                avisos.append(f"{caminho}: maior que {ZIP_MAX_MEMBRO_MB} MB descompactado; ignorado.")
+                continue
+            if info.compress_size and info.file_size / info.compress_size > ZIP_MAX_RAZAO_COMPRESSAO:
+                avisos.append(f"{caminho}: taxa de compressão suspeita; ignorado.")
+                continue
+            if estado["total"] + info.file_size > max_total:
+                avisos.append(f"{nome_zip}: limite de {ZIP_MAX_TOTAL_MB} MB descompactados atingido; o restante foi ignorado.")
+                return
+
+            # Lê no máximo o limite, caso o tamanho declarado no zip seja falso
+            with arquivo_zip.open(info) as membro:
+                dados = membro.read(max_membro + 1)
+            if len(dados) > max_membro:
+                avisos.append(f"{caminho}: maior que {ZIP_MAX_MEMBRO_MB} MB descompactado; ignorado.")
+                continue
+
+            estado["total"] += len(dados)
+            if ext == "zip":
+                if _profundidade >= ZIP_MAX_PROFUNDIDADE:
+                    avisos.append(f"{caminho}: zip dentro de zip além de {ZIP_MAX_PROFUNDIDADE} níveis; ignorado.")
+                    continue
+                yield from expandir_zip(dados, caminho, avisos, estado, _profundidade + 1)
+            else:
+                estado["arquivos"] += 1
+                yield caminho, dados
@@ -1,56 +1,139 @@
-import tiktoken
+from concurrent.futures import ThreadPoolExecutor
 from prompts import PROMPTS_PADRONIZADOS
-from utils.classificar import criar_cliente_openai
+from utils.cliente_openai import criar_cliente_openai
+from utils.cache_llm import completar_com_cache, completar_em_stream_com_cache
+from utils.tokens import contar_tokens
+from utils.divisao import dividir_documento, dividir_documento_com_cache
+from utils.config import RESUMO_MAX_SIMULTANEOS, RESUMO_LIMITE_TOKENS_REDUCAO, DIVISAO_MAX_TOKENS, DIVISAO_SOBREPOSICAO
 
 
-def contar_tokens(texto, modelo="gpt-4o-mini"):
-    """Conta a quantidade de tokens de um texto dado um modelo."""
-    enc = tiktoken.encoding_for_model(modelo)
-    return len(enc.encode(texto))
+def como_paginas(texto):
+    """Aceita um texto ou um iterável de (página, texto) e devolve sempre o iterável."""
+    return [(1, texto)] if isinstance(texto, str) else texto
 
-def dividir_em_chunks(texto, max_tokens=3000, modelo="gpt-4o-mini"):
+def mapear_sob_demanda(funcao, itens, max_simultaneos, tarefa=None, total=None, ate=1.0):
     """
-    Divide o texto em pedaços (chunks) que não ultrapassem max_tokens.
-    Útil para textos grandes que precisam ser processados em partes.
+    Como executor.map, mas só consome o próximo item quando há vaga: no máximo
+    max_simultaneos itens em andamento, para não carregar todos na memória de uma vez.
+    Com uma tarefa em segundo plano, verifica o cancelamento a cada item e, se o
+    total de itens for informado, avança o progresso da tarefa até ate.
+    Retorna os resultados na ordem dos itens.
     """
-    enc = tiktoken.encoding_for_model(modelo)
-    tokens = enc.encode(texto)
-    chunks = [enc.decode(tokens[i:i+max_tokens]) for i in range(0, len(tokens), max_tokens)]
-    return chunks
+    resultados = []
 
-def gerar_resumo_padronizado(texto, tipo_documento, modelo="gpt-3.5-turbo"):
-    """
-    Gera um resumo detalhado e estruturado de um texto, adaptado ao tipo do documento.
-    Usa prompts padronizados por tipo para direcionar a geração.
-    Divide textos muito grandes em partes e gera resumos parciais antes do resumo final.
-    """
-    tipo = tipo_documento.strip()
-    prompt_base = PROMPTS_PADRONIZADOS.get(tipo, PROMPTS_PADRONIZADOS["default"])
+    def receber(futuro):
+        resultados.append(futuro.result())
+        if tarefa is not None and total:
+            tarefa.progresso = ate * len(resultados) / total
+
+    with ThreadPoolExecutor(max_workers=max_simultaneos) as executor:
+        em_andamento = []
+        for item in itens:
+            if tarefa is not None:
+                tarefa.verificar_cancelamento()
+            if len(em_andamento) >= max_simultaneos:
+                receber(em_andamento.pop(0))
+            em_andamento.append(executor.submit(funcao, item))
+        for futuro in em_andamento:
+            if tarefa is not None:
+                tarefa.verificar_cancelamento()
+            receber(futuro)
+    return resultados
 
-    if contar_tokens(texto, modelo) <= 3000:
-        partes = [texto]
-    else:
-        partes = dividir_em_chunks(texto, max_tokens=3000, modelo=modelo)
+def completar(client, prompt, modelo, temperature, max_tokens):
+    """Faz uma chamada de chat com um único prompt (ou usa a resposta do cache) e retorna o texto."""
+    return completar_com_cache(client, [{"role": "user", "content": prompt}], modelo, temperature, max_tokens)
 
-    resumos_parciais = []
-    for parte in partes:
-        prompt_resumo_parcial = f"""
+def resumir_parte(client, parte, modelo):
+    """Gera o resumo parcial (etapa map) de um pedaço do documento."""
+    prompt_resumo_parcial = f"""
 Você é um assistente técnico especializado em análise detalhada de documentos. Faça um resumo completo e detalhado do conteúdo abaixo, destacando todas as informações relevantes, sem omitir pontos importantes. Estruture o texto em tópicos claros.
 
 Texto:
 \"\"\"\n{parte}\n\"\"\"
 """
-        client = criar_cliente_openai()
-        resposta = client.chat.completions.create(
-            model=modelo,
-            messages=[{"role": "user", "content": prompt_resumo_parcial}],
-            temperature=0.2,
-            max_tokens=1000
-        )
-        resumos_parciais.append(resposta.choices[0].message.content.strip())
+    return completar(client, prompt_resumo_parcial, modelo, temperature=0.2, max_tokens=1000)
+
+def juntar_resumos(client, resumos, modelo):
+    """Junta um grupo de resumos parciais em um único resumo intermediário."""
+    prompt_intermediario = f"""
+Você é um assistente técnico. Junte os resumos parciais abaixo, que são partes consecutivas de um mesmo documento, em um único resumo detalhado e estruturado em tópicos, sem repetições e sem omitir datas, valores, nomes e obrigações.
+
+Resumos parciais:
+\"\"\"\n{chr(10).join(resumos)}\n\"\"\"
+"""
+    return completar(client, prompt_intermediario, modelo, temperature=0.1, max_tokens=1000)
+
+def agrupar_por_tokens(textos, limite_tokens, modelo):
+    """
+    Agrupa textos consecutivos de forma que cada grupo fique dentro de limite_tokens.
+    Um texto que sozinho passa do limite fica em um grupo próprio.
+    """
+    grupos, atual, tokens_atual = [], [], 0
+    for texto in textos:
+        tokens = contar_tokens(texto, modelo)
+        if atual and tokens_atual + tokens > limite_tokens:
+            grupos.append(atual)
+            atual, tokens_atual = [], 0
+        atual.append(texto)
+        tokens_atual += tokens
+    if atual:
+        grupos.append(atual)
+    return grupos
+
+def reduzir_em_arvore(client, resumos, modelo, limite_tokens=RESUMO_LIMITE_TOKENS_REDUCAO,
+                      max_simultaneos=RESUMO_MAX_SIMULTANEOS, tarefa=None):
+    """
+    Reduz os resumos parciais em níveis (árvore) até que caibam juntos
+    em limite_tokens. Os grupos de cada nível são reduzidos em paralelo.
+    """
+    with ThreadPoolExecutor(max_workers=max_simultaneos) as executor:
+        while len(resumos) > 1 and contar_tokens(chr(10).join(resumos), modelo) > limite_tokens:
+            if tarefa is not None:
+                tarefa.verificar_cancelamento()
+            grupos = agrupar_por_tokens(resumos, limite_tokens, modelo)
+            if len(grupos) == len(resumos):
+                # Nenhum grupo com mais de um resumo: não há como reduzir mais
+                break
+            resumos = list(executor.map(
+                lambda grupo: grupo[0] if len(grupo) == 1 else juntar_resumos(client, grupo, modelo),
+                grupos
+            ))
+    return resumos
+
+def preparar_prompt_final(client, texto, tipo_documento, modelo="gpt-3.5-turbo", max_simultaneos=RESUMO_MAX_SIMULTANEOS,
+                          doc_hash=None, tarefa=None):
+    """
+    Executa as etapas map e reduce do resumo e devolve o prompt do resumo final.
+    O texto pode ser uma string ou um iterável de (página, texto), lido sob demanda;
+    com doc_hash, a divisão em partes vem do cache (e as páginas nem são lidas).
+    Os resumos parciais de cada parte são gerados em paralelo e, se necessário,
+    reduzidos em árvore para que o prompt final caiba no contexto do modelo.
+    Com uma tarefa em segundo plano, o cancelamento é verificado entre as partes
+    e o progresso da tarefa avança à medida que elas são resumidas.
+    """
+    tipo = tipo_documento.strip()
+    prompt_base = PROMPTS_PADRONIZADOS.get(tipo, PROMPTS_PADRONIZADOS["default"])
+
+    chunks = dividir_documento_com_cache(
+        doc_hash, como_paginas(texto), DIVISAO_MAX_TOKENS, DIVISAO_SOBREPOSICAO, modelo
+    ) if doc_hash else dividir_documento(como_paginas(texto), DIVISAO_MAX_TOKENS, DIVISAO_SOBREPOSICAO, modelo)
+    partes = (chunk.texto for chunk in chunks)
+    # A etapa map vale até 80% do progresso da tarefa; a redução, até 90% (o resto é o resumo final).
+    # Sem doc_hash os chunks são gerados sob demanda e o total só é conhecido no fim
+    resumos_parciais = mapear_sob_demanda(
+        lambda parte: resumir_parte(client, parte, modelo), partes, max_simultaneos, tarefa,
+        total=len(chunks) if isinstance(chunks, list) else None, ate=0.8
+    )
+    if not resumos_parciais:
+        resumos_parciais = [""]
+
+    resumos_parciais = reduzir_em_arvore(client, resumos_parciais, modelo, max_simultaneos=max_simultaneos, tarefa=tarefa)
+    if tarefa is not None:
+        tarefa.progresso = 0.9
 
     if len(resumos_parciais) == 1:
-        prompt_final = f"""
+        return f"""
 {prompt_base}
 
 Conteúdo resumido:
@@ -58,8 +141,7 @@ Conteúdo resumido:
 
 Gere um resumo final detalhado e estruturado, seguindo o modelo acima, com ao menos 20 linhas.
 """
-    else:
-        prompt_final = f"""
+    return f"""
 Você é um assistente técnico. Com base nos resumos parciais abaixo, gere um **resumo final detalhado e padronizado**, estruturado, sem repetições, seguindo este modelo:
 
 {prompt_base}
@@ -70,11 +152,27 @@ Resumos parciais:
 Gere um resumo final detalhado e estruturado, com ao menos 20 linhas.
 """
 
-    resposta_final = client.chat.completions.create(
-        model=modelo,
-        messages=[{"role": "user", "content": prompt_final}],
-        temperature=0.1,
-        max_tokens=1500
-    )
+def gerar_resumo_padronizado(texto, tipo_documento, modelo="gpt-3.5-turbo", max_simultaneos=RESUMO_MAX_SIMULTANEOS,
+                             doc_hash=None):
+    """
+    Gera um resumo detalhado e estruturado de um texto, adaptado ao tipo do documento.
+    Usa prompts padronizados por tipo para direcionar a geração.
+    Textos grandes seguem um fluxo map-reduce: os resumos parciais de cada parte
+    são gerados em paralelo e, se necessário, reduzidos em árvore antes do resumo final.
+    """
+    client = criar_cliente_openai()
+    prompt_final = preparar_prompt_final(client, texto, tipo_documento, modelo, max_simultaneos, doc_hash)
+    return completar(client, prompt_final, modelo, temperature=0.1, max_tokens=1500)
 
-    return resposta_final.choices[0].message.content.strip()
+def gerar_resumo_em_stream(texto, tipo_documento, modelo="gpt-3.5-turbo", max_simultaneos=RESUMO_MAX_SIMULTANEOS,
+                           doc_hash=None, tarefa=None):
+    """
+    Igual a gerar_resumo_padronizado, mas o resumo final é gerado em streaming:
+    devolve os pedaços de texto à medida que chegam da API.
+    O texto pode ser uma string ou um iterável de (página, texto), como extrair_paginas.
+    """
+    client = criar_cliente_openai()
+    prompt_final = preparar_prompt_final(client, texto, tipo_documento, modelo, max_simultaneos, doc_hash, tarefa)
+    yield from completar_em_stream_com_cache(
+        client, [{"role": "user", "content": prompt_final}], modelo, temperature=0.1, max_tokens=1500
+    )
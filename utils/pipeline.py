@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import asdict
+from io import BytesIO
+import pandas as pd
+from utils.classificacao import extrair_e_classificar
+from utils.extrair_texto import FORMATOS_SUPORTADOS, calcular_hash, extrair_texto, extrair_paginas
+from utils.ingestao_zip import expandir_zip
+from utils.llm import gerar_resumo_padronizado
+from utils.extracao_prazos import extrair_prazos_documento
+from utils.tabela_prazos import para_tabela, Prazo
+from utils.config import PIPELINE_DOCUMENTOS_SIMULTANEOS
+
+# ----- PROCESSAMENTO EM LOTE -----
+# Núcleo sem interface: extração, classificação, resumo e prazos de cada
+# documento, em paralelo, com um checkpoint em JSON por documento (por hash).
+# Uma execução interrompida retoma de onde parou; as etapas já concluídas não
+# são refeitas. Como os caches de extração, respostas do modelo e prazos são
+# os mesmos do app, as páginas do Streamlit reaproveitam o que o lote calculou.
+
+ETAPAS = ("extracao", "classificacao", "resumo", "prazos")
+
+
+def listar_entrada(caminho, avisos=None):
+    """
+    Gera (nome, conteúdo) dos documentos de um diretório (com subpastas) ou de um
+    arquivo .zip, um de cada vez. Arquivos .zip dentro do diretório também são abertos.
+    """
+    avisos = avisos if avisos is not None else []
+    if os.path.isfile(caminho):
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        nome = os.path.basename(caminho)
+        if nome.lower().endswith(".zip"):
+            yield from expandir_zip(conteudo, nome, avisos)
+        elif nome.split('.')[-1].lower() in FORMATOS_SUPORTADOS:
+            yield nome, conteudo
+        return
+
+    for raiz, pastas, arquivos in os.walk(caminho):
+        pastas.sort()
+        for arquivo in sorted(arquivos):
+            completo = os.path.join(raiz, arquivo)
+            nome = os.path.relpath(completo, caminho).replace(os.sep, "/")
+            ext = arquivo.split('.')[-1].lower()
+            if ext == "zip":
+                with open(completo, "rb") as f:
+                    yield from expandir_zip(f.read(), nome, avisos)
+            elif ext in FORMATOS_SUPORTADOS:
+                with open(completo, "rb") as f:
+                    yield nome, f.read()
+
+class Checkpoints:
+    """Resultados parciais de cada documento, gravados em saida/documentos/<hash>.json."""
+
+    def __init__(self, diretorio_saida):
+        self.diretorio = os.path.join(diretorio_saida, "documentos")
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho(self, doc_hash):
+        return os.path.join(self.diretorio, f"{doc_hash}.json")
+
+    def carregar(self, doc_hash):
+        try:
+            with open(self._caminho(doc_hash), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def salvar(self, resultado):
+        caminho = self._caminho(resultado["hash"])
+        temporario = f"{caminho}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(temporario, caminho)
+
+    def todos(self):
+        resultados = []
+        for nome in sorted(os.listdir(self.diretorio)):
+            if nome.endswith(".json"):
+                with open(os.path.join(self.diretorio, nome), encoding="utf-8") as f:
+                    resultados.append(json.load(f))
+        return resultados
+
+def processar_documento(nome, conteudo, checkpoints, etapas=ETAPAS, modelo="gpt-3.5-turbo", doc_hash=None):
+    """
+    Executa as etapas pedidas para um documento, gravando o checkpoint após cada uma.
+    Etapas já registradas no checkpoint são puladas. Um erro interrompe apenas
+    este documento e fica registrado em "erro" (a etapa é refeita na próxima execução).
+    """
+    doc_hash = doc_hash or calcular_hash(conteudo)
+    resultado = checkpoints.carregar(doc_hash) or {"nome": nome, "hash": doc_hash, "concluidas": []}
+    resultado["nome"] = nome
+    resultado.pop("erro", None)
+    concluidas = resultado["concluidas"]
+
+    def concluir(etapa, **campos):
+        resultado.update(campos)
+        concluidas.append(etapa)
+        checkpoints.salvar(resultado)
+
+    try:
+        if "extracao" not in concluidas:
+            texto = extrair_texto(BytesIO(conteudo), nome)
+            concluir("extracao", texto_vazio=not texto.strip(), caracteres=len(texto))
+
+        if "classificacao" in etapas and "classificacao" not in concluidas:
+            tipo = extrair_e_classificar({"name": nome, "content": conteudo, "hash": doc_hash})
+            concluir("classificacao", tipo=tipo)
+
+        # Sem texto não há o que resumir nem onde procurar prazos
+        if resultado.get("texto_vazio"):
+            return resultado
+
+        if "resumo" in etapas and "resumo" not in concluidas:
+            resumo = gerar_resumo_padronizado(
+                extrair_paginas(BytesIO(conteudo), nome), resultado.get("tipo", "default"), modelo, doc_hash=doc_hash
+            )
+            concluir("resumo", resumo=resumo)
+
+        if "prazos" in etapas and "prazos" not in concluidas:
+            prazos, erros = extrair_prazos_documento(conteudo, nome, modelo)
+            if erros:
+                raise RuntimeError("; ".join(erros))
+            concluir("prazos", prazos=[asdict(p) for p in prazos])
+    except Exception as e:
+        resultado["erro"] = f"{type(e).__name__}: {e}"
+        checkpoints.salvar(resultado)
+    return resultado
+
+def executar_lote(entrada, saida, etapas=ETAPAS, max_simultaneos=PIPELINE_DOCUMENTOS_SIMULTANEOS,
+                  modelo="gpt-3.5-turbo", ao_concluir=None):
+    """
+    Processa todos os documentos da entrada (diretório ou .zip) em paralelo,
+    lendo-os sob demanda (no máximo o dobro de max_simultaneos em memória).
+    ao_concluir(resultado) é chamado a cada documento terminado.
+    No fim grava os resultados consolidados em saida. Retorna os avisos da leitura.
+    """
+    checkpoints = Checkpoints(saida)
+    avisos = []
+    vistos = {}
+    with ThreadPoolExecutor(max_workers=max_simultaneos) as executor:
+        em_andamento = set()
+        for nome, conteudo in listar_entrada(entrada, avisos):
+            # Conteúdo repetido (mesmo hash) é processado uma vez só
+            doc_hash = calcular_hash(conteudo)
+            if doc_hash in vistos:
+                avisos.append(f"{nome}: mesmo conteúdo de {vistos[doc_hash]}; ignorado.")
+                continue
+            vistos[doc_hash] = nome
+
+            if len(em_andamento) >= 2 * max_simultaneos:
+                prontos, em_andamento = wait(em_andamento, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    if ao_concluir:
+                        ao_concluir(futuro.result())
+            em_andamento.add(executor.submit(processar_documento, nome, conteudo, checkpoints, etapas, modelo, doc_hash))
+        for futuro in em_andamento:
+            if ao_concluir:
+                ao_concluir(futuro.result())
+
+    gravar_saidas(checkpoints, saida)
+    return avisos
+
+def gravar_saidas(checkpoints, saida):
+    """
+    Consolida os checkpoints em:
+    resultados.json (tudo), documentos.parquet (um documento por linha) e prazos.parquet.
+    """
+    resultados = checkpoints.todos()
+    with open(os.path.join(saida, "resultados.json"), "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2, default=str)
+
+    pd.DataFrame(
+        [
+            {"nome": r["nome"], "hash": r["hash"], "tipo": r.get("tipo"), "resumo": r.get("resumo"),
+             "texto_vazio": r.get("texto_vazio"), "erro": r.get("erro"), "concluidas": ",".join(r["concluidas"])}
+            for r in resultados
+        ],
+        columns=["nome", "hash", "tipo", "resumo", "texto_vazio", "erro", "concluidas"]
+    ).to_parquet(os.path.join(saida, "documentos.parquet"), index=False)
+
+    prazos = [Prazo(**p) for r in resultados for p in r.get("prazos", [])]
+    para_tabela(prazos).to_parquet(os.path.join(saida, "prazos.parquet"), index=False)
@@ -1,81 +1,42 @@
 import streamlit as st
-from io import BytesIO
-from utils.classificar import classificar_documento, normalizar_tipo_documento, mostrar_classificacao_final
-from utils.extrair_texto import extrair_texto
-from utils.llm import contar_tokens, dividir_em_chunks
-from utils.classificar import criar_cliente_openai
-from prompts import PROMPT_PRAZOS
-
-
-def limitar_prazos(texto: str, max_itens: int = 10) -> list:
-    """
-    Filtra linhas que começam com marcadores típicos de tópicos de prazos.
-    Retorna até max_itens prazos encontrados.
-    """
-    linhas = [
-        linha.strip("-•– ").strip()
-        for linha in texto.splitlines()
-        if linha.strip().startswith(("-", "•", "–"))
-    ]
-    return linhas[:max_itens] if linhas else []
-
-@st.cache_data(show_spinner="Extraindo prazos...", ttl=3600)
-def extrair_prazos_importantes(file, filename, modelo="gpt-3.5-turbo") -> list:
+from utils.classificar import mostrar_classificacao_final
+from utils.extrair_texto import calcular_hash
+from utils.extracao_prazos import extrair_prazos_documento
+from utils.tabela_prazos import ler_data, carregar_prazos_documento, carregar_tabela, prazos_proximos
+from utils.tarefas import fila_tarefas, desenhar_com_atualizacao, CONCLUIDA, ERRO, CANCELADA
+
+
+def extrair_prazos_tarefa(tarefa, conteudo, nome, modelo):
+    """Tarefa em segundo plano que extrai os prazos de um documento. Retorna (prazos, erros)."""
+    tarefa.verificar_cancelamento()
+    return extrair_prazos_documento(conteudo, nome, modelo, tarefa)
+
+def mostrar_lista_prazos(prazos, erros=()):
+    """Desenha a lista de prazos de um arquivo."""
+    if not prazos and not erros:
+        st.warning("Nenhum prazo encontrado.")
+    for p in prazos:
+        data = f" ({p.data_absoluta:%d/%m/%Y})" if p.data_absoluta and not ler_data(p.prazo) else ""
+        st.markdown(f"- {p.evento}: {p.prazo}{data}" if p.evento else f"- {p.prazo}{data}")
+    for erro in erros:
+        st.error(erro)
+
+def mostrar_prazos_tipo(modelo="gpt-3.5-turbo"):
     """
-    Extrai os prazos importantes de um documento usando o prompt específico.
-    Divide texto em partes se for muito longo para evitar limite de tokens.
-    Retorna lista filtrada e sem duplicatas.
-    """
-    texto = extrair_texto(file, filename)
-
-    if contar_tokens(texto, modelo) > 10000:
-        partes = dividir_em_chunks(texto, max_tokens=3000, modelo=modelo)
-    else:
-        partes = [texto]
-
-    prazos_extraidos = []
-
-    for i, parte in enumerate(partes):
-        prompt = f"""{PROMPT_PRAZOS}
-
-Texto:
-\"\"\"{parte}\"\"\"
-"""
-        try:
-            client = criar_cliente_openai()
-            resposta = client.chat.completions.create(
-                model=modelo,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2
-            )
-            conteudo = resposta.choices[0].message.content.strip()
-
-            topicos = limitar_prazos(conteudo)
-            prazos_filtrados = [
-                t for t in topicos
-                if "não especificado" not in t.lower()
-                and "ver cláusula" not in t.lower()
-                and len(t.split(":")) > 1
-            ]
-            prazos_extraidos.extend(prazos_filtrados)
-
-        except Exception as e:
-            prazos_extraidos.append(f"Erro ao processar parte {i+1}: {e}")
-
-    # Remove duplicatas e limita a 10 prazos
-    return list(dict.fromkeys(prazos_extraidos))[:10]
-
-def mostrar_prazos_tipo():
-    """
-    Exibe interface Streamlit para mostrar prazos extraídos de documentos filtrados por tipo.
+    Exibe interface Streamlit para mostrar prazos extraídos dos documentos do tipo
+    confirmado na classificação. Cada documento é processado por uma tarefa em
+    segundo plano (que sobrevive a reruns e à navegação) e os prazos de cada um
+    aparecem assim que ficam prontos.
     """
     tipo = st.session_state.get("tipo_para_prazo", None)
-    arquivos = st.session_state.get("uploaded_files", None)
-
-    if not tipo or not arquivos:
+    if not tipo:
         st.warning("Não há documentos para extrair prazos.")
         return
 
+    # Obter classificação final confirmada
+    classificacoes = st.session_state.get("classificacao_final", {})
+    arquivos_selecionados = classificacoes.get(tipo, [])
+
     st.markdown(f"""
         <div style="
             background-color: rgba(255, 255, 255, 0.85);
@@ -89,25 +50,52 @@ def mostrar_prazos_tipo():
 
     st.markdown("<div style='margin-top: 10px;'></div>", unsafe_allow_html=True)
 
-    arquivos_selecionados = [
-        arq for arq in arquivos
-        if normalizar_tipo_documento(classificar_documento(arq["name"]), arq["name"]) == tipo
-    ]
-
     if not arquivos_selecionados:
         st.info(f"Nenhum documento do tipo **{tipo}** foi encontrado.")
-        return
-
-    for file in arquivos_selecionados:
-        st.markdown("---")
-        st.markdown(f"### 📎 {file['name']}")
-        with st.spinner("Extraindo prazos..."):
-            prazos = extrair_prazos_importantes(BytesIO(file["content"]), file["name"])
-        if not prazos:
-            st.warning("Nenhum prazo encontrado.")
-        else:
-            for p in prazos:
-                st.markdown(f"- {p}")
+    else:
+        # Agenda (ou reencontra) a tarefa de cada documento ainda não processado
+        fila = fila_tarefas()
+        prontos = {}
+        tarefas = {}
+        for file in arquivos_selecionados:
+            chave = calcular_hash(file["conteudo"])
+            prazos = carregar_prazos_documento(chave, modelo)
+            if prazos is not None:
+                prontos[chave] = prazos
+            else:
+                tarefas[chave] = fila.submeter(
+                    f"prazos:{chave}:{modelo}", extrair_prazos_tarefa, file["conteudo"], file["nome"], modelo,
+                    descricao=f"Prazos de {file['nome']}"
+                )
+
+        # Cada arquivo é mostrado assim que seus prazos ficam prontos
+        def desenhar():
+            for file in arquivos_selecionados:
+                st.markdown("---")
+                st.markdown(f"### 📎 {file['nome']}")
+                chave = calcular_hash(file["conteudo"])
+                tarefa = tarefas.get(chave)
+                if tarefa is None:
+                    mostrar_lista_prazos(prontos[chave])
+                elif tarefa.estado == CONCLUIDA:
+                    mostrar_lista_prazos(*tarefa.resultado)
+                elif tarefa.estado in (ERRO, CANCELADA):
+                    if tarefa.estado == ERRO:
+                        st.error(f"Erro ao extrair prazos: {tarefa.erro}")
+                    else:
+                        st.warning("Extração cancelada.")
+                    if st.button("Tentar novamente", key=f"repetir_{tarefa.id}_{file['nome']}"):
+                        fila.reenviar(tarefa.id, extrair_prazos_tarefa, file["conteudo"], file["nome"], modelo,
+                                      descricao=tarefa.descricao)
+                        st.rerun()
+                else:
+                    st.progress(tarefa.progresso, text="⏳ Extraindo prazos...")
+                    if st.button("Cancelar", key=f"cancelar_{tarefa.id}_{file['nome']}"):
+                        if not tarefa.cancelar():
+                            st.toast("Outra sessão ainda aguarda estes prazos; a extração continuará.")
+            return any(not t.terminou for t in tarefas.values())
+
+        desenhar_com_atualizacao(desenhar, any(not t.terminou for t in tarefas.values()))
 
     st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
@@ -158,3 +146,39 @@ def mostrar_prazos():
             st.session_state["tipo_para_prazo"] = tipo_escolhido
             st.session_state["page"] = "prazos_tipo"
             st.rerun()
+
+    st.markdown("<div style='margin-top: 50px;'></div>", unsafe_allow_html=True)
+
+    # 3. Próximos prazos de todos os documentos já processados (consulta local, sem API)
+    mostrar_proximos_prazos()
+
+def mostrar_proximos_prazos(modelo="gpt-3.5-turbo"):
+    """
+    Mostra, em uma tabela ordenada por data, os prazos dos documentos da sessão
+    que vencem nos próximos dias, a partir da tabela de prazos já extraídos.
+    """
+    st.markdown("### Próximos prazos")
+    arquivos = st.session_state.get("uploaded_files", [])
+    nomes = {arq["hash"]: arq["name"] for arq in arquivos}
+
+    tabela = carregar_tabela(hashes=set(nomes), modelo=modelo)
+    if tabela.empty:
+        st.info("Os prazos aparecem aqui depois de extraídos em algum tipo de documento.")
+        return
+
+    dias = st.number_input("Vencendo nos próximos (dias)", min_value=1, max_value=3650, value=30, step=1)
+    proximos = prazos_proximos(tabela, dias=int(dias))
+    if proximos.empty:
+        st.info(f"Nenhum prazo com data nos próximos {int(dias)} dias.")
+        return
+
+    # O nome exibido é o da sessão atual (o mesmo conteúdo pode ter sido enviado com outro nome)
+    proximos = proximos.assign(documento=proximos["hash"].map(nomes))
+    st.dataframe(
+        proximos[["data_absoluta", "documento", "evento", "prazo", "clausula"]].rename(columns={
+            "data_absoluta": "Data", "documento": "Documento", "evento": "Evento",
+            "prazo": "Prazo", "clausula": "Cláusula"
+        }),
+        hide_index=True,
+        column_config={"Data": st.column_config.DateColumn(format="DD/MM/YYYY")}
+    )
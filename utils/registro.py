@@ -0,0 +1,111 @@
+import streamlit as st
+from utils.extrair_texto import calcular_hash
+from utils.ingestao_zip import expandir_zip
+
+# ----- REGISTRO DE ARQUIVOS ENVIADOS -----
+# O registro guarda, por nome, o conteúdo e o hash de cada arquivo da sessão.
+# Adições e remoções são repassadas apenas como diferenças (deltas) para os
+# resultados derivados: classificação, índices do chat e cache de extração.
+
+
+def _inicializar():
+    st.session_state.setdefault("uploaded_files_bytes", {})
+    st.session_state.setdefault("uploaded_files_hashes", {})
+    st.session_state.setdefault("uploader_ids_vistos", set())
+
+def _publicar():
+    """Recria as listas de arquivos usadas pelas outras páginas a partir do registro."""
+    conteudos = st.session_state["uploaded_files_bytes"]
+    hashes = st.session_state["uploaded_files_hashes"]
+    st.session_state["uploaded_files"] = [
+        {"name": nome, "content": conteudo, "hash": hashes[nome]}
+        for nome, conteudo in conteudos.items()
+    ]
+    st.session_state["uploaded_files_names"] = list(conteudos.keys())
+
+def _remover_dos_resultados(nomes):
+    """Retira os arquivos informados da classificação e das conversas por arquivo e por tipo."""
+    nomes = set(nomes)
+    tipos = {d["classificacao"] for d in st.session_state.get("docs", []) if d["nome"] in nomes}
+    if "docs" in st.session_state:
+        st.session_state.docs = [d for d in st.session_state.docs if d["nome"] not in nomes]
+    if "classificacao_final" in st.session_state:
+        st.session_state["classificacao_final"] = {
+            tipo: restantes
+            for tipo, docs in st.session_state["classificacao_final"].items()
+            if (restantes := [d for d in docs if d["nome"] not in nomes])
+        }
+    # Conversas de cada arquivo (chave: nome) e dos tipos que ele tinha (chave: "tipo_<tipo>"),
+    # como criadas por utils.chat.mostrar_conversa
+    for chave in [*nomes, *(f"tipo_{tipo}" for tipo in tipos)]:
+        for prefixo in ("chat_", "input_individual_", "limpar_input_"):
+            st.session_state.pop(f"{prefixo}{chave}", None)
+
+def registrar_envios(uploaded_files):
+    """
+    Registra os arquivos vindos do st.file_uploader, processando cada envio uma única vez.
+    Arquivos .zip são abertos e cada documento dentro deles vira um arquivo próprio,
+    com o caminho das pastas no nome.
+    Um arquivo com o mesmo nome e conteúdo diferente substitui o anterior.
+    Retorna (arquivos realmente novos ({"name", "content", "hash"}), avisos).
+    """
+    _inicializar()
+    conteudos = st.session_state["uploaded_files_bytes"]
+    hashes = st.session_state["uploaded_files_hashes"]
+    vistos = st.session_state["uploader_ids_vistos"]
+
+    adicionados = []
+    substituidos = []
+    avisos = []
+    for f in uploaded_files:
+        if f.file_id in vistos:
+            continue
+        vistos.add(f.file_id)
+
+        if f.name.lower().endswith(".zip"):
+            itens = expandir_zip(f.getvalue(), f.name, avisos)
+        else:
+            itens = [(f.name, f.getvalue())]
+
+        for nome, conteudo in itens:
+            doc_hash = calcular_hash(conteudo)
+            if hashes.get(nome) == doc_hash:
+                continue
+            if nome in hashes:
+                substituidos.append(nome)
+
+            conteudos[nome] = conteudo
+            hashes[nome] = doc_hash
+            adicionados.append({"name": nome, "content": conteudo, "hash": doc_hash})
+
+    if substituidos:
+        _remover_dos_resultados(substituidos)
+    if adicionados:
+        _publicar()
+    return adicionados, avisos
+
+def remover_arquivos(nomes):
+    """Remove arquivos do registro e dos resultados derivados deles."""
+    _inicializar()
+    for nome in nomes:
+        st.session_state["uploaded_files_bytes"].pop(nome, None)
+        st.session_state["uploaded_files_hashes"].pop(nome, None)
+    _remover_dos_resultados(nomes)
+    _publicar()
+
+def limpar_registro():
+    """Remove todos os arquivos da sessão e tudo o que foi calculado a partir deles."""
+    nomes = list(st.session_state.get("uploaded_files_bytes", {}))
+    _remover_dos_resultados(nomes)
+    for chave in ("uploaded_files", "uploaded_files_names", "uploaded_files_bytes", "uploaded_files_hashes",
+                  "uploader_ids_vistos", "docs", "classificacao_final", "classificacao_versao_rotulos",
+                  "indice_todos", "indice_todos_hashes", "indice_todos_tipos", "indice_todos_bm25", "chat_todos"):
+        st.session_state.pop(chave, None)
+
+def pre_extrair(arquivos):
+    """
+    Extrai em paralelo o texto dos arquivos novos para já deixá-lo no cache em disco.
+    Retorna {nome: erro} com os arquivos que não puderam ser extraídos.
+    """
+    from utils.extracao_paralela import extrair_varios
+    return extrair_varios(arquivos)
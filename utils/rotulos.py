@@ -0,0 +1,138 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from utils.config import DIRETORIO_CACHE, ROTULOS_PADRAO_MINIMO
+
+# ----- CLASSIFICAÇÕES CONFIRMADAS -----
+# Guarda, por hash do documento, o tipo confirmado pelo usuário (em "Continuar"
+# ou "Finalizar ajustes") e as correções feitas em "Ajustar classificações",
+# junto com o padrão do nome do arquivo e o início do texto já normalizado.
+# Documentos já vistos (mesmo hash) são classificados na hora; o padrão do nome
+# de famílias conhecidas é só uma indicação, que precisa ser confirmada pelo
+# classificador local. Os exemplos treinam o classificador local e as correções
+# entram como exemplos no prompt de classificação.
+
+CAMINHO_ROTULOS = os.path.join(DIRETORIO_CACHE, "rotulos.sqlite3")
+
+# Palavras que não identificam uma família de documentos (ex.: "scan_12.pdf")
+PALAVRAS_GENERICAS = {
+    "scan", "scanner", "digitalizado", "digitalizacao", "documento", "doc", "docs", "arquivo",
+    "file", "img", "imagem", "image", "copia", "novo", "final", "versao", "pdf", "page", "pagina",
+}
+
+
+# Bancos cuja tabela já foi criada por este processo
+_criados = set()
+_trava = threading.Lock()
+
+
+def _criar_tabela():
+    """Cria o diretório, a tabela e o índice de rótulos, uma vez por processo."""
+    if CAMINHO_ROTULOS in _criados:
+        return
+    with _trava:
+        if CAMINHO_ROTULOS in _criados:
+            return
+        os.makedirs(os.path.dirname(CAMINHO_ROTULOS) or ".", exist_ok=True)
+        with closing(sqlite3.connect(CAMINHO_ROTULOS, timeout=30)) as con, con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS rotulos (
+                    hash TEXT PRIMARY KEY,
+                    nome TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    texto TEXT NOT NULL,
+                    atualizado REAL NOT NULL,
+                    padrao TEXT NOT NULL DEFAULT '',
+                    corrigido INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_rotulos_padrao ON rotulos (padrao)")
+        _criados.add(CAMINHO_ROTULOS)
+
+def _conectar():
+    _criar_tabela()
+    return sqlite3.connect(CAMINHO_ROTULOS, timeout=30)
+
+def padrao_nome(nome):
+    """
+    Padrão do nome do arquivo, para reconhecer famílias de documentos recorrentes:
+    sem pastas, acentos e maiúsculas, com cada sequência de dígitos trocada por "#"
+    (ex.: "Relatório_Mensal_2024-05.pdf" -> "relatorio_mensal_#-#.pdf").
+    Retorna "" (sem padrão) se o nome, sem a extensão, não tiver ao menos duas
+    palavras que não sejam genéricas (ex.: "scan_12.pdf", "documento_3.pdf").
+    """
+    base = nome.rsplit("/", 1)[-1]
+    base = unicodedata.normalize("NFKD", base).encode("ascii", "ignore").decode("ascii").lower().strip()
+    radical = base.rsplit(".", 1)[0] if "." in base else base
+    palavras = [p for p in re.findall(r"[a-z]{2,}", radical) if p not in PALAVRAS_GENERICAS]
+    if len(palavras) < 2:
+        return ""
+    return re.sub(r"\d+", "#", base)
+
+def salvar_rotulos(itens):
+    """
+    Grava (ou atualiza) os rótulos confirmados. Recebe tuplas (hash, nome, tipo, texto, corrigido).
+    Um documento corrigido pelo usuário continua marcado como correção nas gravações seguintes.
+    """
+    agora = time.time()
+    with closing(_conectar()) as con, con:
+        con.executemany(
+            """
+            INSERT INTO rotulos (hash, nome, tipo, texto, atualizado, padrao, corrigido)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET
+                nome = excluded.nome, tipo = excluded.tipo,
+                texto = CASE WHEN excluded.texto != '' THEN excluded.texto ELSE rotulos.texto END,
+                atualizado = excluded.atualizado, padrao = excluded.padrao,
+                corrigido = MAX(rotulos.corrigido, excluded.corrigido)
+            """,
+            [(doc_hash, nome, tipo, texto, agora, padrao_nome(nome), int(corrigido))
+             for doc_hash, nome, tipo, texto, corrigido in itens]
+        )
+
+def buscar_rotulo(doc_hash):
+    """Retorna o tipo já confirmado para o mesmo arquivo (pelo hash), ou None."""
+    if not doc_hash:
+        return None
+    with closing(_conectar()) as con:
+        linha = con.execute("SELECT tipo FROM rotulos WHERE hash = ?", (doc_hash,)).fetchone()
+    return linha[0] if linha else None
+
+def tipo_do_padrao(nome):
+    """
+    Retorna o tipo sugerido pelo padrão do nome, se ao menos ROTULOS_PADRAO_MINIMO
+    documentos com esse padrão foram confirmados e todos com o mesmo tipo; senão, None.
+    É só uma indicação: quem chama confirma com o conteúdo do documento.
+    """
+    padrao = padrao_nome(nome)
+    if not ROTULOS_PADRAO_MINIMO or not padrao:
+        return None
+    with closing(_conectar()) as con:
+        tipos = con.execute(
+            "SELECT tipo, COUNT(*) FROM rotulos WHERE padrao = ? GROUP BY tipo", (padrao,)
+        ).fetchall()
+    if len(tipos) == 1 and tipos[0][1] >= ROTULOS_PADRAO_MINIMO:
+        return tipos[0][0]
+    return None
+
+def listar_correcoes(limite=5):
+    """Retorna as correções mais recentes como (nome, texto, tipo), para usar como exemplos no prompt."""
+    with closing(_conectar()) as con:
+        return con.execute(
+            "SELECT nome, texto, tipo FROM rotulos WHERE corrigido = 1 ORDER BY atualizado DESC LIMIT ?",
+            (limite,)
+        ).fetchall()
+
+def listar_exemplos():
+    """Retorna os exemplos confirmados como lista de (texto, tipo)."""
+    with closing(_conectar()) as con:
+        return con.execute("SELECT texto, tipo FROM rotulos WHERE texto != ''").fetchall()
+
+def versao_rotulos():
+    """Identifica o estado atual dos rótulos (muda sempre que algum é gravado)."""
+    with closing(_conectar()) as con:
+        return con.execute("SELECT COUNT(*), MAX(atualizado) FROM rotulos").fetchone()
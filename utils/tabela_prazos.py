@@ -0,0 +1,247 @@
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from typing import Optional
+import numpy as np
+import pandas as pd
+from utils.candidatos_prazos import MESES, CANDIDATOS_VERSAO
+from utils.extrair_texto import EXTRATOR_VERSAO
+from utils.config import DIRETORIO_CACHE, PRAZOS_PRE_EXTRACAO, PRAZOS_JANELA_CARACTERES
+from prompts import PROMPTS_VERSAO
+
+# ----- TABELA DE PRAZOS -----
+# Os prazos extraídos viram registros estruturados (evento, cláusula, data ou
+# duração e data absoluta calculada) e são guardados em Parquet, um arquivo
+# por documento. Consultas entre documentos (ordenar, filtrar, "vence nos
+# próximos 30 dias") são feitas localmente com pandas, sem chamar a API.
+# A tabela com todos os documentos fica na memória e só é relida quando o
+# diretório muda (e, mesmo assim, só os arquivos alterados). O nome de cada
+# arquivo leva as versões dos prompts, do extrator de texto e da pré-extração:
+# prazos gravados com versões antigas deixam de ser usados.
+
+DIRETORIO_PRAZOS = os.path.join(DIRETORIO_CACHE, "prazos")
+
+# Tabela completa em memória: chave (versões, contador de gravações, mtime do diretório), tabela e,
+# por arquivo, (mtime, DataFrame) para reler só o que mudou
+_tabela_em_memoria = {"chave": None, "tabela": None, "arquivos": {}}
+_versao = 0
+_trava_tabela = threading.Lock()
+
+COLUNAS = ["documento", "hash", "clausula", "evento", "prazo", "quantidade", "unidade", "data_absoluta", "modelo"]
+
+NUMERO_MES = {
+    nome: i for i, nomes in enumerate(
+        ["janeiro", "fevereiro", "março|marco", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro"], start=1
+    ) for nome in nomes.split("|")
+}
+
+RE_DATA_NUMERICA = re.compile(r"(?<![\d/.,])(\d{1,2})([/.-])(\d{1,2})\2(\d{4}|\d{2})(?![\d/]|[.,]\d)")
+RE_DATA_EXTENSO = re.compile(rf"(\d{{1,2}})[º°]?\s+de\s+({MESES})\s+de\s+(\d{{4}})", re.IGNORECASE)
+RE_DURACAO = re.compile(
+    r"(\d{1,4})\s*(?:\([^)\n]{1,40}\)\s*)?(dias?|meses|m[eê]s|anos?|semanas?)\b(?:\s+(úteis|uteis|corridos))?",
+    re.IGNORECASE
+)
+RE_CLAUSULA = re.compile(r"cl[áa]usula\s+([\w.ºª-]+)", re.IGNORECASE)
+
+
+@dataclass
+class Prazo:
+    documento: str
+    hash: str
+    evento: str
+    prazo: str
+    clausula: Optional[str] = None
+    quantidade: Optional[int] = None
+    unidade: Optional[str] = None
+    data_absoluta: Optional[date] = None
+    modelo: str = ""
+
+
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii").lower()
+
+def ler_data(texto):
+    """Retorna a primeira data (dd/mm/aaaa ou "1º de abril de 2024") encontrada no texto, ou None."""
+    m = RE_DATA_NUMERICA.search(texto)
+    if m:
+        dia, mes, ano = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        ano += 2000 if ano < 100 else 0
+    else:
+        m = RE_DATA_EXTENSO.search(texto)
+        if not m:
+            return None
+        dia, mes, ano = int(m.group(1)), NUMERO_MES[m.group(2).lower()], int(m.group(3))
+    try:
+        return date(ano, mes, dia)
+    except ValueError:
+        return None
+
+def ler_duracao(texto):
+    """Retorna (quantidade, unidade) da primeira duração do texto, ex.: (30, "dias úteis"), ou (None, None)."""
+    m = RE_DURACAO.search(texto)
+    if not m:
+        return None, None
+    unidade = _sem_acentos(m.group(2))
+    unidade = {"dia": "dias", "mes": "meses", "ano": "anos", "semana": "semanas"}.get(unidade, unidade)
+    if unidade == "dias" and m.group(3) and _sem_acentos(m.group(3)) == "uteis":
+        unidade = "dias úteis"
+    return int(m.group(1)), unidade
+
+def somar_duracao(inicio, quantidade, unidade, sinal=1):
+    """Soma (ou subtrai, com sinal=-1) uma duração a uma data. Dias úteis ignoram feriados."""
+    if unidade == "dias úteis":
+        return np.busday_offset(np.datetime64(inicio, "D"), sinal * quantidade, roll="forward").astype(date)
+    if unidade == "dias":
+        return inicio + timedelta(days=sinal * quantidade)
+    if unidade == "semanas":
+        return inicio + timedelta(weeks=sinal * quantidade)
+    meses = quantidade * (12 if unidade == "anos" else 1) * sinal
+    ano, mes = divmod(inicio.month - 1 + meses, 12)
+    ano, mes = inicio.year + ano, mes + 1
+    # Dia 31 em mês de 30 dias (e 29/02) cai no último dia do mês
+    ultimo_dia = ((date(ano + mes // 12, mes % 12 + 1, 1)) - timedelta(days=1)).day
+    return date(ano, mes, min(inicio.day, ultimo_dia))
+
+def interpretar_prazo(linha, documento, doc_hash, modelo=""):
+    """
+    Converte uma linha "Evento: prazo" (formato do prompt de prazos) em um Prazo,
+    separando cláusula, data explícita e duração.
+    """
+    evento, _, prazo = linha.partition(":")
+    evento, prazo = evento.strip(), prazo.strip()
+    if not prazo:
+        evento, prazo = "", evento
+
+    clausula = RE_CLAUSULA.search(linha)
+    quantidade, unidade = ler_duracao(prazo)
+    return Prazo(
+        documento=documento,
+        hash=doc_hash,
+        evento=evento,
+        prazo=prazo,
+        clausula=clausula.group(1).rstrip(".") if clausula else None,
+        quantidade=quantidade,
+        unidade=unidade,
+        data_absoluta=ler_data(prazo),
+        modelo=modelo,
+    )
+
+def calcular_datas_relativas(prazos):
+    """
+    Preenche data_absoluta dos prazos relativos à assinatura ("até 30 dias após
+    a assinatura"), usando a data de assinatura encontrada no mesmo documento.
+    """
+    assinatura = next(
+        (p.data_absoluta for p in prazos if p.data_absoluta and "assinatura" in _sem_acentos(p.evento)),
+        None
+    )
+    if assinatura is None:
+        return prazos
+
+    for p in prazos:
+        texto = _sem_acentos(p.prazo)
+        if p.data_absoluta or not p.quantidade or "assinatura" not in texto:
+            continue
+        if "apos" in texto or "a partir" in texto or "contados" in texto:
+            p.data_absoluta = somar_duracao(assinatura, p.quantidade, p.unidade)
+        elif "antes" in texto:
+            p.data_absoluta = somar_duracao(assinatura, p.quantidade, p.unidade, sinal=-1)
+    return prazos
+
+def para_tabela(prazos):
+    """Monta o DataFrame (colunas de COLUNAS) a partir de uma lista de Prazo."""
+    tabela = pd.DataFrame([asdict(p) for p in prazos], columns=COLUNAS)
+    tabela["quantidade"] = tabela["quantidade"].astype("Int64")
+    tabela["data_absoluta"] = pd.to_datetime(tabela["data_absoluta"])
+    return tabela
+
+def _sufixo_versao():
+    """Versões de que dependem os prazos extraídos: prompts, extrator de texto e pré-extração (com a janela)."""
+    pre_extracao = f"r{CANDIDATOS_VERSAO}-{PRAZOS_JANELA_CARACTERES}" if PRAZOS_PRE_EXTRACAO else "r0"
+    return f"p{PROMPTS_VERSAO}-e{EXTRATOR_VERSAO}-{pre_extracao}"
+
+def _caminho_documento(doc_hash, modelo):
+    return os.path.join(DIRETORIO_PRAZOS, f"{doc_hash}-{modelo.replace('/', '_')}-{_sufixo_versao()}.parquet")
+
+def salvar_prazos_documento(doc_hash, modelo, prazos):
+    """Grava os prazos de um documento em Parquet (substituindo os anteriores)."""
+    os.makedirs(DIRETORIO_PRAZOS, exist_ok=True)
+    caminho = _caminho_documento(doc_hash, modelo)
+    temporario = f"{caminho}.tmp-{os.getpid()}-{threading.get_ident()}"
+    para_tabela(prazos).to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    # Além do mtime do diretório (que pode não mudar em sistemas de arquivos com pouca resolução)
+    global _versao
+    with _trava_tabela:
+        _versao += 1
+
+def _de_registro(registro):
+    registro = {coluna: (None if pd.isna(valor) else valor) for coluna, valor in registro.items()}
+    if registro["data_absoluta"] is not None:
+        registro["data_absoluta"] = registro["data_absoluta"].date()
+    if registro["quantidade"] is not None:
+        registro["quantidade"] = int(registro["quantidade"])
+    return Prazo(**registro)
+
+def carregar_prazos_documento(doc_hash, modelo):
+    """Lê os prazos já extraídos de um documento. Retorna None se ele nunca foi processado."""
+    caminho = _caminho_documento(doc_hash, modelo)
+    if not os.path.exists(caminho):
+        return None
+    return [_de_registro(registro) for registro in pd.read_parquet(caminho).to_dict("records")]
+
+def _tabela_completa():
+    """
+    Todos os prazos gravados com as versões atuais em um DataFrame, guardado em
+    memória. Quando o diretório muda (gravação deste ou de outro processo), relê
+    só os arquivos novos ou alterados.
+    """
+    try:
+        chave = (_sufixo_versao(), _versao, os.stat(DIRETORIO_PRAZOS).st_mtime_ns)
+    except FileNotFoundError:
+        return para_tabela([])
+
+    with _trava_tabela:
+        if _tabela_em_memoria["chave"] == chave:
+            return _tabela_em_memoria["tabela"]
+
+        anteriores, arquivos = _tabela_em_memoria["arquivos"], {}
+        final = f"-{chave[0]}.parquet"
+        for nome in sorted(os.listdir(DIRETORIO_PRAZOS)):
+            if not nome.endswith(final):
+                continue
+            caminho = os.path.join(DIRETORIO_PRAZOS, nome)
+            try:
+                mtime = os.stat(caminho).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            anterior = anteriores.get(nome)
+            arquivos[nome] = anterior if anterior and anterior[0] == mtime else (mtime, pd.read_parquet(caminho))
+
+        partes = [tabela for _, tabela in arquivos.values() if not tabela.empty]
+        tabela = pd.concat(partes, ignore_index=True) if partes else para_tabela([])
+        _tabela_em_memoria.update(chave=chave, tabela=tabela, arquivos=arquivos)
+        return tabela
+
+def carregar_tabela(hashes=None, modelo=None):
+    """
+    Retorna em um único DataFrame os prazos de todos os documentos já processados
+    (ou só dos hashes e do modelo informados). Os arquivos só são lidos de novo
+    quando algum prazo é gravado.
+    """
+    tabela = _tabela_completa()
+    if modelo:
+        tabela = tabela[tabela["modelo"] == modelo]
+    if hashes is not None:
+        tabela = tabela[tabela["hash"].isin(hashes)]
+    return tabela.reset_index(drop=True)
+
+def prazos_proximos(tabela, dias=30, hoje=None):
+    """Filtra os prazos com data absoluta entre hoje e hoje + dias, do mais próximo ao mais distante."""
+    hoje = pd.Timestamp(hoje or date.today())
+    filtro = tabela["data_absoluta"].between(hoje, hoje + pd.Timedelta(days=dias))
+    return tabela[filtro].sort_values("data_absoluta")
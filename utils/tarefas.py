@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.config import TAREFAS_TRABALHADORES, TAREFAS_INTERVALO_ATUALIZACAO, TAREFAS_RETENCAO_MINUTOS
+
+# ----- TAREFAS EM SEGUNDO PLANO -----
+# Operações demoradas (classificação, resumos, prazos, índices do chat) rodam
+# em threads do processo, fora da execução da página. Cada tarefa tem um id
+# determinístico (ex.: "resumo:<hash>:<tipo>"): reruns e outras sessões que
+# pedem a mesma tarefa recebem a que já existe, em vez de refazer o trabalho.
+# As páginas só desenham o estado (progresso, resultado parcial) e se
+# atualizam sozinhas enquanto houver tarefas em andamento.
+# Como a tarefa é compartilhada, o "Cancelar" de uma sessão só a interrompe
+# quando nenhuma outra sessão ativa está esperando por ela.
+
+PENDENTE, EXECUTANDO, CONCLUIDA, ERRO, CANCELADA = "pendente", "executando", "concluida", "erro", "cancelada"
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+def _sessao_atual():
+    """Id da sessão do Streamlit que está rodando o script (None fora de uma sessão)."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def _sessoes_ativas(sessoes):
+    """Descarta as sessões que já foram fechadas (abas fechadas não esperam mais a tarefa)."""
+    if not Runtime.exists():
+        return set(sessoes)
+    runtime = Runtime.instance()
+    return {sessao for sessao in sessoes if runtime.is_active_session(sessao)}
+
+
+class Tarefa:
+    """Estado de uma tarefa: situação, progresso (0 a 1), resultado parcial e final."""
+
+    def __init__(self, id, descricao=""):
+        self.id = id
+        self.descricao = descricao
+        self.estado = PENDENTE
+        self.progresso = 0.0
+        self.parcial = None
+        self.resultado = None
+        self.erro = None
+        self.terminada_em = None
+        self._cancelar = threading.Event()
+        self._sessoes = set()
+        self._desistiram = set()
+        self._trava = threading.Lock()
+
+    @property
+    def terminou(self):
+        return self.estado in (CONCLUIDA, ERRO, CANCELADA)
+
+    @property
+    def cancelada(self):
+        return self._cancelar.is_set()
+
+    def registrar_sessao(self, sessao):
+        """Anota que a sessão espera pela tarefa (a não ser que ela já tenha desistido)."""
+        if sessao is None:
+            return
+        with self._trava:
+            if sessao not in self._desistiram:
+                self._sessoes.add(sessao)
+
+    def cancelar(self, sessao=None):
+        """
+        A sessão (por padrão, a atual) desiste da tarefa. O cancelamento só é pedido
+        se nenhuma outra sessão ativa ainda espera por ela; a tarefa então para no
+        próximo ponto de verificação. Retorna se a tarefa foi cancelada.
+        """
+        sessao = sessao if sessao is not None else _sessao_atual()
+        with self._trava:
+            if sessao is not None:
+                self._sessoes.discard(sessao)
+                self._desistiram.add(sessao)
+            self._sessoes = _sessoes_ativas(self._sessoes)
+            if not self._sessoes:
+                self._cancelar.set()
+        return self._cancelar.is_set()
+
+    def verificar_cancelamento(self):
+        """Chamado pela função da tarefa entre etapas: interrompe a tarefa se ela foi cancelada."""
+        if self._cancelar.is_set():
+            raise TarefaCancelada()
+
+
+class FilaTarefas:
+    """Pool de threads do processo com o registro das tarefas por id."""
+
+    def __init__(self, max_trabalhadores=TAREFAS_TRABALHADORES):
+        self._executor = ThreadPoolExecutor(max_workers=max_trabalhadores, thread_name_prefix="tarefa")
+        self._tarefas = {}
+        self._trava = threading.Lock()
+
+    def submeter(self, id, funcao, *args, descricao=""):
+        """
+        Agenda funcao(tarefa, *args) e retorna a Tarefa. Se já existe uma tarefa com
+        esse id (em andamento ou terminada), ela é retornada e nada é agendado.
+        Em ambos os casos, a sessão atual passa a constar entre as que esperam a tarefa.
+        """
+        with self._trava:
+            self._descartar_antigas()
+            tarefa = self._tarefas.get(id)
+            if tarefa is not None:
+                tarefa.registrar_sessao(_sessao_atual())
+                return tarefa
+            tarefa = self._tarefas[id] = Tarefa(id, descricao)
+            tarefa.registrar_sessao(_sessao_atual())
+        self._executor.submit(self._executar, tarefa, funcao, args)
+        return tarefa
+
+    def reenviar(self, id, funcao, *args, descricao=""):
+        """Descarta a tarefa terminada com esse id (ex.: após um erro) e agenda de novo."""
+        with self._trava:
+            tarefa = self._tarefas.get(id)
+            if tarefa is not None and tarefa.terminou:
+                del self._tarefas[id]
+        return self.submeter(id, funcao, *args, descricao=descricao)
+
+    def obter(self, id):
+        with self._trava:
+            return self._tarefas.get(id)
+
+    def listar(self):
+        with self._trava:
+            return list(self._tarefas.values())
+
+    def _executar(self, tarefa, funcao, args):
+        if tarefa.cancelada:
+            tarefa.estado = CANCELADA
+        else:
+            tarefa.estado = EXECUTANDO
+            try:
+                tarefa.resultado = funcao(tarefa, *args)
+                tarefa.progresso = 1.0
+                tarefa.estado = CONCLUIDA
+            except TarefaCancelada:
+                tarefa.estado = CANCELADA
+            except Exception as e:
+                tarefa.erro = e
+                tarefa.estado = ERRO
+        tarefa.terminada_em = time.time()
+
+    def _descartar_antigas(self):
+        """Tira do registro as tarefas terminadas há mais tempo que a retenção (chamado com a trava)."""
+        limite = time.time() - TAREFAS_RETENCAO_MINUTOS * 60
+        for id in [id for id, t in self._tarefas.items() if t.terminou and t.terminada_em < limite]:
+            del self._tarefas[id]
+
+
+@st.cache_resource
+def fila_tarefas():
+    """Fila de tarefas compartilhada por todas as sessões do processo."""
+    return FilaTarefas()
+
+def desenhar_com_atualizacao(desenhar, em_andamento):
+    """
+    Executa desenhar() em um fragmento que se redesenha sozinho a cada
+    TAREFAS_INTERVALO_ATUALIZACAO segundos enquanto houver tarefas em andamento,
+    sem rodar a página inteira. desenhar() retorna se ainda há tarefas em andamento;
+    quando todas terminam, a página é rodada de novo uma vez com os resultados.
+    """
+    def fragmento():
+        if not desenhar() and em_andamento:
+            st.rerun()
+
+    st.fragment(fragmento, run_every=TAREFAS_INTERVALO_ATUALIZACAO if em_andamento else None)()
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+import tiktoken
+from utils.config import TOKENS_CACHE_ENTRADAS
+
+# ----- CONTAGEM DE TOKENS -----
+# Cada codificação do tiktoken é carregada uma vez por processo; as contagens
+# ficam na memória por hash do texto, então contar de novo o mesmo texto (ex.:
+# a mesma página a cada rerun) não tokeniza outra vez. tokenizar() devolve
+# também a posição de cada token no texto (calculada pelos tamanhos em bytes dos
+# tokens), para cortar o texto nos limites dos tokens sem codificar de novo nem
+# decodificar.
+
+_contagens = OrderedDict()
+_trava = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def obter_codificador(modelo="gpt-4o-mini"):
+    """Codificação do tiktoken para o modelo, carregada uma vez por processo."""
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        # Modelo desconhecido pelo tiktoken: usa a codificação dos modelos atuais
+        return tiktoken.get_encoding("o200k_base")
+
+@lru_cache(maxsize=None)
+def _tamanhos_tokens(enc):
+    """
+    Tamanho em bytes de cada token da codificação, indexado pelo id do token.
+    Calculado uma vez por codificação; ids sem token no vocabulário ficam com 0.
+    """
+    tamanhos = np.zeros(enc.n_vocab, dtype=np.int64)
+    for id in range(enc.n_vocab):
+        try:
+            tamanhos[id] = len(enc.decode_single_token_bytes(id))
+        except KeyError:
+            pass
+    return tamanhos
+
+def _posicoes(texto, ids, enc):
+    """
+    Índice do caractere em que cada token começa, calculado pelos tamanhos em
+    bytes dos tokens (sem decodificar). Um token que começa no meio de um
+    caractere acentuado fica com a posição do caractere seguinte.
+    """
+    if not ids:
+        return []
+    bytes_token = _tamanhos_tokens(enc)[np.asarray(ids)]
+    inicio_bytes = np.concatenate(([0], np.cumsum(bytes_token[:-1])))
+    # Bytes que iniciam um caractere em UTF-8 (os de continuação são 10xxxxxx);
+    # a posição de um token é a quantidade de caracteres iniciados antes dele
+    inicia_caractere = (np.frombuffer(texto.encode("utf-8"), dtype=np.uint8) & 0xC0) != 0x80
+    caracteres_antes = np.concatenate(([0], np.cumsum(inicia_caractere)))
+    return caracteres_antes[inicio_bytes].tolist()
+
+def _chave(texto, enc):
+    return enc.name, hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+
+def _guardar_contagem(chave, quantidade):
+    with _trava:
+        _contagens[chave] = quantidade
+        _contagens.move_to_end(chave)
+        while len(_contagens) > TOKENS_CACHE_ENTRADAS:
+            _contagens.popitem(last=False)
+
+def contar_tokens(texto, modelo="gpt-4o-mini"):
+    """Conta a quantidade de tokens de um texto dado um modelo."""
+    enc = obter_codificador(modelo)
+    chave = _chave(texto, enc)
+    with _trava:
+        quantidade = _contagens.get(chave)
+        if quantidade is not None:
+            _contagens.move_to_end(chave)
+            return quantidade
+    quantidade = len(enc.encode(texto, disallowed_special=()))
+    _guardar_contagem(chave, quantidade)
+    return quantidade
+
+def tokenizar(texto, modelo="gpt-4o-mini"):
+    """
+    Tokeniza o texto uma vez e retorna (ids, posições), onde posições[i] é o índice
+    do caractere em que o token i começa. texto[posições[i]:posições[j]] é o texto
+    dos tokens i a j-1. A contagem fica guardada para contar_tokens.
+    """
+    enc = obter_codificador(modelo)
+    ids = enc.encode(texto, disallowed_special=())
+    _guardar_contagem(_chave(texto, enc), len(ids))
+    return ids, _posicoes(texto, ids, enc)